@@ -0,0 +1,382 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
+from double_metaphone import DoubleMetaphoneMatcher, Threshold
+from instrumentation import Metrics
+from name_lookup_directory import NameLookupDirectory
+
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT = 0.002
+DEFAULT_MAX_PENDING = 10000
+DEFAULT_MAX_CONCURRENT_BATCHES = 1
+
+
+class AsyncNameMatcher(object):
+    """The AsyncNameMatcher class serves lookups of a NameLookupDirectory
+    to asyncio code without blocking the event loop. Lookups are queued
+    and coalesced into micro-batches, each batch being run by a single
+    lookup_many call per threshold on an executor, after which the
+    future of each lookup is resolved.
+
+    A batch is dispatched once it holds max_batch_size lookups or once
+    max_wait seconds have passed since its first lookup was taken from
+    the queue. Up to max_concurrent_batches batches run at once, which
+    should match the number of workers of the executor. Once that many
+    are running, the lookups queued meanwhile form the next batch,
+    dispatched as soon as one of them ends. Once max_pending lookups are
+    queued, callers wait for room in the queue before theirs is queued.
+
+    Once the matcher starts closing, new lookups and the callers still
+    waiting for room in the queue fail with a ValueError, while the
+    lookups already queued are answered.
+
+    The time each batch takes, from its first lookup being queued and
+    from its dispatch, is recorded in the matcher's Metrics as the
+    'batch_latency' and 'batch' stages, along with the 'batches' and
+    'requests' counters.
+
+    Parameters
+    ----------
+    directory : NameLookupDirectory
+        The directory to look the names up in.
+    max_batch_size : int, optional
+        The maximum number of lookups of a batch.
+    max_wait : float, optional
+        The maximum number of seconds a batch waits to be filled.
+    max_pending : int, optional
+        The maximum number of queued lookups.
+    executor : Executor, optional
+        The executor running the batches. By default a pool of
+        max_concurrent_batches threads owned by the matcher runs them.
+    metrics : Metrics, optional
+        The metrics to record the batches into. By default the matcher
+        records them into its own.
+    max_concurrent_batches : int, optional
+        The maximum number of batches running at once, 1 by default.
+        When an executor is given, it should be its number of workers.
+
+    Raises
+    ------
+    ValueError
+        If max_batch_size, max_pending or max_concurrent_batches are
+        lower than 1, or if max_wait is negative.
+    """
+    def __init__(self, directory, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait=DEFAULT_MAX_WAIT, max_pending=DEFAULT_MAX_PENDING,
+                 executor=None, metrics=None,
+                 max_concurrent_batches=DEFAULT_MAX_CONCURRENT_BATCHES):
+        if max_batch_size < 1:
+            raise ValueError('The maximum batch size must be at least 1.')
+        if max_wait < 0:
+            raise ValueError('The maximum wait cannot be negative.')
+        if max_pending < 1:
+            raise ValueError('The maximum number of pending lookups must be '
+                             'at least 1.')
+        if max_concurrent_batches < 1:
+            raise ValueError('The maximum number of concurrent batches must '
+                             'be at least 1.')
+
+        self.directory = directory
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.max_concurrent_batches = max_concurrent_batches
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._matcher = DoubleMetaphoneMatcher()
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue = None
+        self._room = None
+        self._worker = None
+        self._closed = False
+
+    @staticmethod
+    def with_processes(path, workers, **options):
+        """This method creates a matcher whose batches are run by a pool
+        of processes, each of which loads a directory saved to a file.
+        The file is memory-mapped so that its pages are shared by the
+        processes.
+
+        Parameters
+        ----------
+        path : str
+            The path of a file written by NameLookupDirectory.save.
+        workers : int
+            The number of worker processes.
+        **options
+            The other parameters of the AsyncNameMatcher class.
+
+        Returns
+        -------
+        AsyncNameMatcher
+            Returns a matcher owning its pool of processes.
+        """
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_lookup_worker,
+            initargs=(path,)
+        )
+        options.setdefault('max_concurrent_batches', workers)
+        matcher = AsyncNameMatcher(None, executor=executor, **options)
+        matcher._owns_executor = True
+
+        return matcher
+
+    async def lookup(self, name, threshold=Threshold.STRONG):
+        """This method returns the identifiers of the names matching a
+        given name, as returned by NameLookupDirectory.lookup.
+
+        Parameters
+        ----------
+        name : str
+            A name to find the matches of.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the name.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+        Returns
+        -------
+        list of obj
+            Returns the ranked identifiers of the matching names.
+
+        Raises
+        ------
+        ValueError
+            If the matcher is closed, or if the value contained by the
+            threshold parameter is not implemented by the Threshold
+            Enum class.
+        """
+        if self._closed:
+            raise ValueError('The matcher is closed.')
+
+        # Thresholds are checked before queueing so that an invalid one
+        # cannot fail the other lookups of its batch
+        threshold = self._matcher._ensure_threshold_is_enum(threshold)
+        self._start()
+        await self._room.acquire()
+        # The matcher may have been closed while waiting for room, and
+        # nothing is taken from the queue once the worker stopped
+        if self._closed:
+            self._room.release()
+            raise ValueError('The matcher is closed.')
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((name, threshold, future, perf_counter()))
+
+        return await future
+
+    async def lookup_many(self, names, threshold=Threshold.STRONG):
+        """This method looks each of the given names up concurrently.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            An iterable of names to find the matches of.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the names.
+
+        Returns
+        -------
+        list of list of obj
+            Returns, for each of the names and in the same order, the
+            ranked identifiers of the matching names.
+        """
+        return list(await asyncio.gather(
+            *(self.lookup(name, threshold) for name in names)
+        ))
+
+    async def close(self):
+        """This method stops the matcher once the queued lookups are
+        answered, and shuts down the executor it owns. The lookups left
+        in the queue if the worker stopped early fail with a
+        ValueError."""
+        if self._closed:
+            return
+
+        self._closed = True
+        if self._worker is not None:
+            # The queue is only bounded by the room taken by lookups, so
+            # that the stop request is queued after them without waiting
+            self._queue.put_nowait(None)
+            try:
+                await self._worker
+            finally:
+                self._fail_queued_lookups()
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    def _start(self):
+        """Starts the task batching the queued lookups."""
+        if self._worker is not None:
+            return
+
+        self._queue = asyncio.Queue()
+        self._room = asyncio.Semaphore(self.max_pending)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent_batches
+            )
+        self._worker = asyncio.get_running_loop().create_task(
+            self._run_batches()
+        )
+
+    def _fail_queued_lookups(self):
+        """Fails the lookups left in the queue, freeing their room so
+        that the callers waiting for it are woken up."""
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            if request is not None:
+                self._room.release()
+                future = request[2]
+                if not future.done():
+                    future.set_exception(
+                        ValueError('The matcher is closed.')
+                    )
+
+    def _take(self, request):
+        """Frees the room of a lookup taken from the queue."""
+        if request is not None:
+            self._room.release()
+
+        return request
+
+    async def _run_batches(self):
+        """Takes batches of lookups from the queue and runs them as
+        tasks, at most max_concurrent_batches at once, until the matcher
+        is closed. A slot is taken before the first lookup of a batch,
+        so that the lookups queued while every slot is taken join the
+        next batch."""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        running = set()
+        stopping = False
+        while not stopping:
+            await slots.acquire()
+            request = self._take(await self._queue.get())
+            if request is None:
+                break
+
+            batch = [request]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    request = self._take(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = self._take(await asyncio.wait_for(
+                            self._queue.get(), timeout
+                        ))
+                    except asyncio.TimeoutError:
+                        break
+
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            task = loop.create_task(self._run_batch(loop, batch))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        await asyncio.gather(*running)
+
+    async def _run_batch(self, loop, batch):
+        """This method runs a batch of lookups on the executor and
+        resolves their futures.
+
+        Parameters
+        ----------
+        loop : AbstractEventLoop
+            The running event loop.
+        batch : list of tuple
+            The names, thresholds, futures and queueing times of the
+            lookups.
+        """
+        groups = {}
+        for name, threshold, _, _ in batch:
+            groups.setdefault(threshold, []).append(name)
+
+        dispatched = perf_counter()
+        try:
+            if self.directory is not None:
+                results = await loop.run_in_executor(
+                    self._executor, _lookup_groups, self.directory, groups
+                )
+            else:
+                results = await loop.run_in_executor(
+                    self._executor, _lookup_groups_in_worker, groups
+                )
+        except Exception as e:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            positions = dict.fromkeys(groups, 0)
+            for _, threshold, future, _ in batch:
+                name_ids = results[threshold][positions[threshold]]
+                positions[threshold] += 1
+                if not future.done():
+                    future.set_result(name_ids)
+
+        finished = perf_counter()
+        self.metrics.record('batch', finished - dispatched)
+        self.metrics.record('batch_latency', finished - batch[0][3])
+        self.metrics.increment('batches')
+        self.metrics.increment('requests', len(batch))
+
+
+def _lookup_groups(directory, groups):
+    """This function looks the names of a batch up in a directory.
+
+    Parameters
+    ----------
+    directory : NameLookupDirectory
+        The directory to look the names up in.
+    groups : dict {obj: list of str}
+        The names of the batch grouped by threshold.
+
+    Returns
+    -------
+    dict {obj: list of list of obj}
+        Returns the matches of the names of each threshold.
+    """
+    return {
+        threshold: directory.lookup_many(names, threshold)
+        for threshold, names in groups.items()
+    }
+
+
+_worker_directory = None
+
+
+def _init_lookup_worker(path):
+    """Loads the directory used by a worker process to look names up."""
+    global _worker_directory
+    _worker_directory = NameLookupDirectory()
+    _worker_directory.load(path)
+
+
+def _lookup_groups_in_worker(groups):
+    """Looks the names of a batch up in a worker process' directory."""
+    return _lookup_groups(_worker_directory, groups)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,169 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+from threading import Lock
+import time
+import unittest
+
+from async_name_matcher import AsyncNameMatcher
+from name_lookup_directory import NameLookupDirectory
+
+
+class TestAsyncNameMatcher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = NameLookupDirectory()
+        self.directory.add_names(
+            ['Led Zeppelin', 'John Doe', 'Jane Doe', 'Janis Doe'],
+            [0, 1, 2, 3]
+        )
+
+    def test_init_with_invalid_max_batch_size(self):
+        with self.assertRaises(ValueError) as _:
+            AsyncNameMatcher(self.directory, max_batch_size=0)
+
+    async def test_lookup(self):
+        async with AsyncNameMatcher(self.directory) as matcher:
+            output = await matcher.lookup('Jane Doe')
+
+        self.assertEqual(output, [1, 2])
+
+    async def test_lookup_many_with_batches(self):
+        names = ['Jane Doe', 'Led Zeppelin', 'Nobody'] * 10
+
+        async with AsyncNameMatcher(self.directory, max_batch_size=8,
+                                    max_wait=0.01) as matcher:
+            output = await matcher.lookup_many(names)
+            counters = matcher.metrics.snapshot()['counters']
+
+        self.assertEqual(output, self.directory.lookup_many(names))
+        self.assertEqual(counters['requests'], 30)
+        self.assertEqual(counters['batches'], 4)
+
+    async def test_lookup_with_mixed_thresholds(self):
+        async with AsyncNameMatcher(self.directory) as matcher:
+            output = await asyncio.gather(
+                matcher.lookup('Jane Doe', 'strong'),
+                matcher.lookup('Jane Doe', 'weak'),
+                matcher.lookup('Janis Doe', 'strong'),
+            )
+
+        self.assertEqual(output, [
+            self.directory.lookup('Jane Doe', 'strong'),
+            self.directory.lookup('Jane Doe', 'weak'),
+            self.directory.lookup('Janis Doe', 'strong'),
+        ])
+
+    async def test_lookup_with_invalid_threshold(self):
+        async with AsyncNameMatcher(self.directory) as matcher:
+            with self.assertRaises(ValueError) as _:
+                await matcher.lookup('Jane Doe', 'foo')
+
+            output = await matcher.lookup('Jane Doe')
+
+        self.assertEqual(output, [1, 2])
+
+    async def test_lookup_with_closed_matcher(self):
+        matcher = AsyncNameMatcher(self.directory)
+        await matcher.close()
+
+        with self.assertRaises(ValueError) as _:
+            await matcher.lookup('Jane Doe')
+
+    async def test_lookup_with_backpressure(self):
+        async with AsyncNameMatcher(self.directory, max_batch_size=2,
+                                    max_pending=1) as matcher:
+            output = await matcher.lookup_many(['Jane Doe'] * 5)
+
+        self.assertEqual(output, [[1, 2]] * 5)
+
+    async def test_lookup_many_with_concurrent_batches(self):
+        directory = SlowDirectory(self.directory, 0.05)
+        executor = ThreadPoolExecutor(max_workers=4)
+
+        async with AsyncNameMatcher(directory, max_batch_size=1,
+                                    executor=executor,
+                                    max_concurrent_batches=4) as matcher:
+            output = await matcher.lookup_many(['Jane Doe'] * 8)
+        executor.shutdown()
+
+        self.assertEqual(output, [[1, 2]] * 8)
+        self.assertEqual(directory.max_running, 4)
+
+    async def test_lookup_many_with_default_executor(self):
+        directory = SlowDirectory(self.directory, 0.05)
+
+        async with AsyncNameMatcher(directory, max_batch_size=1,
+                                    max_concurrent_batches=2) as matcher:
+            output = await matcher.lookup_many(['Jane Doe'] * 4)
+
+        self.assertEqual(output, [[1, 2]] * 4)
+        self.assertEqual(directory.max_running, 2)
+
+    async def test_close_with_lookups_waiting_for_room(self):
+        directory = SlowDirectory(self.directory, 0.05)
+        matcher = AsyncNameMatcher(directory, max_batch_size=1,
+                                   max_pending=1)
+        lookups = [asyncio.ensure_future(matcher.lookup('Jane Doe'))
+                   for _ in range(5)]
+        await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(matcher.close(), 1)
+        output = await asyncio.wait_for(
+            asyncio.gather(*lookups, return_exceptions=True), 1
+        )
+
+        # The first lookup is running and the second one is queued
+        self.assertEqual(output[:2], [[1, 2], [1, 2]])
+        for result in output[2:]:
+            self.assertIsInstance(result, ValueError)
+        with self.assertRaises(ValueError) as _:
+            await matcher.lookup('Jane Doe')
+
+    def test_init_with_invalid_max_concurrent_batches(self):
+        with self.assertRaises(ValueError) as _:
+            AsyncNameMatcher(self.directory, max_concurrent_batches=0)
+
+    async def test_with_processes(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            self.directory.save(path)
+            async with AsyncNameMatcher.with_processes(
+                path, 2, max_batch_size=1
+            ) as matcher:
+                output = await matcher.lookup_many(['Jane Doe', 'Nobody'] * 4)
+                counters = matcher.metrics.snapshot()['counters']
+        finally:
+            os.remove(path)
+
+        self.assertEqual(matcher.max_concurrent_batches, 2)
+        self.assertEqual(output, [[1, 2], []] * 4)
+        self.assertEqual(counters['batches'], 8)
+
+
+class SlowDirectory(object):
+    """Wraps a directory, making each of its lookup_many calls take a
+    given time and recording the number of calls running at once."""
+
+    def __init__(self, directory, delay):
+        self.directory = directory
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self._lock = Lock()
+
+    def lookup_many(self, names, threshold):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+
+        return self.directory.lookup_many(names, threshold)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,369 @@
+from argparse import ArgumentParser
+from bisect import bisect
+from itertools import accumulate
+from json import dump, load
+import platform
+import random
+import sys
+from time import perf_counter, strftime
+
+from double_metaphone import DoubleMetaphoneMatcher
+from name_lookup_directory import NameLookupDirectory
+from name_normalizer import NameNormalizer
+
+
+SCALES = (10000, 1000000, 10000000)
+FORMAT_VERSION = 2
+
+
+class SyntheticNameGenerator(object):
+    """The SyntheticNameGenerator class generates reproducible names for
+    benchmarking. Name components are drawn from a vocabulary of made-up
+    tokens following a Zipf distribution, so that a few tokens, and so
+    their metaphones, are shared by many names like common surnames are.
+
+    Parameters
+    ----------
+    seed : int, optional
+        The seed making the generated names reproducible.
+    min_tokens : int, optional
+        The minimum number of components of a name.
+    max_tokens : int, optional
+        The maximum number of components of a name.
+    accent_density : float, optional
+        The probability for each vowel to be accentuated.
+    title_frequency : float, optional
+        The probability for a name to start with a title.
+    abbreviation_frequency : float, optional
+        The probability for a component to be an abbreviation.
+    collision_skew : float, optional
+        The exponent of the Zipf distribution the tokens are drawn
+        from. 0 draws them uniformly, higher values make the most
+        common tokens, and so metaphone collisions, more frequent.
+    vocabulary_size : int, optional
+        The number of distinct tokens.
+
+    Raises
+    ------
+    ValueError
+        If the token bounds are invalid.
+    """
+    CONSONANTS = 'bcdfghjklmnprstvwxz'
+    VOWELS = 'aeiouy'
+    ACCENTS = {
+        'a': 'àáâäå', 'e': 'èéêë', 'i': 'ìíîï', 'o': 'òóôöø', 'u': 'ùúûü',
+        'y': 'ýÿ',
+    }
+    TITLES = ('Dr.', 'Mr', 'Mme', 'Prof.', 'Mlle')
+    ABBREVIATIONS = ('Max',)
+
+    def __init__(self, seed=0, min_tokens=1, max_tokens=4,
+                 accent_density=0.05, title_frequency=0.05,
+                 abbreviation_frequency=0.01, collision_skew=1.0,
+                 vocabulary_size=50000):
+        if min_tokens < 1 or max_tokens < min_tokens:
+            raise ValueError('The token bounds you gave are invalid.')
+
+        self._random = random.Random(seed)
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.accent_density = accent_density
+        self.title_frequency = title_frequency
+        self.abbreviation_frequency = abbreviation_frequency
+
+        self._vocabulary = [self._token() for _ in range(vocabulary_size)]
+        self._cumulative_weights = list(accumulate(
+            1.0 / (rank ** collision_skew)
+            for rank in range(1, vocabulary_size + 1)
+        ))
+
+    def names(self, count):
+        """This method generates names.
+
+        Parameters
+        ----------
+        count : int
+            The number of names to generate.
+
+        Returns
+        -------
+        list of str
+            Returns the generated names.
+        """
+        return [self.name() for _ in range(count)]
+
+    def name(self):
+        """Generates a name."""
+        rand = self._random
+        components = []
+
+        if rand.random() < self.title_frequency:
+            components.append(rand.choice(SyntheticNameGenerator.TITLES))
+
+        for _ in range(rand.randint(self.min_tokens, self.max_tokens)):
+            if rand.random() < self.abbreviation_frequency:
+                components.append(
+                    rand.choice(SyntheticNameGenerator.ABBREVIATIONS)
+                )
+            else:
+                components.append(self._accentuate(self._draw_token()))
+
+        return ' '.join(components)
+
+    def _draw_token(self):
+        """Draws a token of the vocabulary following the Zipf
+        distribution."""
+        total = self._cumulative_weights[-1]
+        i = bisect(self._cumulative_weights, self._random.random() * total)
+
+        return self._vocabulary[min(i, len(self._vocabulary) - 1)]
+
+    def _token(self):
+        """Makes up a capitalized token alternating consonants and
+        vowels."""
+        rand = self._random
+        letters = []
+        for i in range(rand.randint(2, 5)):
+            letters.append(rand.choice(SyntheticNameGenerator.CONSONANTS))
+            letters.append(rand.choice(SyntheticNameGenerator.VOWELS))
+
+        return ''.join(letters).capitalize()
+
+    def _accentuate(self, token):
+        """Accentuates the vowels of a token given the accent density."""
+        if self.accent_density <= 0:
+            return token
+
+        rand = self._random
+        return ''.join(
+            rand.choice(SyntheticNameGenerator.ACCENTS[letter])
+            if letter in SyntheticNameGenerator.ACCENTS
+            and rand.random() < self.accent_density else letter
+            for letter in token
+        )
+
+
+def measure(function, items, repeats=3):
+    """This function times a function over items and keeps the median
+    of several repeats.
+
+    Parameters
+    ----------
+    function : Callable
+        Called with each of the items.
+    items : list
+        The items the function is called with.
+    repeats : int, optional
+        The number of times the items are processed.
+
+    Returns
+    -------
+    dict {str: float}
+        Returns the median number of seconds taken to process the
+        items, the operations per second and the nanoseconds per
+        operation.
+    """
+    timings = []
+    for _ in range(repeats):
+        started = perf_counter()
+        for item in items:
+            function(item)
+        timings.append(perf_counter() - started)
+
+    elapsed = sorted(timings)[len(timings) // 2]
+
+    return _rates(elapsed, len(items))
+
+
+def _rates(elapsed, operations):
+    """Returns the rates of a number of operations taking a time."""
+    return {
+        'seconds': elapsed,
+        'ops_per_second': operations / elapsed if elapsed > 0 else 0.0,
+        'ns_per_op': elapsed * 1e9 / operations if operations else 0.0,
+    }
+
+
+def run_benchmarks(scale, seed=0, repeats=3, measure_memory=True,
+                   generator_options=None):
+    """This function benchmarks the normalizer, the metaphone matcher
+    and the lookup directory over synthetic names.
+
+    Parameters
+    ----------
+    scale : int
+        The number of names the directory is built from. Per-name
+        operations are measured over at most 100000 of them.
+    seed : int, optional
+        The seed of the synthetic names.
+    repeats : int, optional
+        The number of repeats of the per-name measurements.
+    measure_memory : bool, optional
+        Whether the memory footprint of the directory is estimated, see
+        NameLookupDirectory.memory_usage.
+    generator_options : dict, optional
+        Options of the SyntheticNameGenerator.
+
+    Returns
+    -------
+    dict
+        Returns the machine-readable benchmark results.
+    """
+    options = dict(generator_options or {})
+    names = SyntheticNameGenerator(seed, **options).names(scale)
+    sample = names[:100000]
+    name_ids = list(range(scale))
+
+    normalizer = NameNormalizer()
+    matcher = DoubleMetaphoneMatcher()
+    normalized = [normalizer.normalize_name(name) for name in sample]
+    pairs = list(zip(normalized, normalized[1:] + normalized[:1]))
+
+    results = {
+        'normalize_name': measure(normalizer.normalize_name, sample,
+                                  repeats),
+        'double_metaphone': measure(matcher.double_metaphone, normalized,
+                                    repeats),
+        'is_weak_match': measure(lambda p: matcher.is_weak_match(*p), pairs,
+                                 repeats),
+        'is_normal_match': measure(lambda p: matcher.is_normal_match(*p),
+                                   pairs, repeats),
+        'is_strong_match': measure(lambda p: matcher.is_strong_match(*p),
+                                   pairs, repeats),
+    }
+
+    directory = NameLookupDirectory()
+    started = perf_counter()
+    directory.add_names(names, name_ids)
+    results['add_names'] = _rates(perf_counter() - started, scale)
+    results['lookup'] = measure(directory.lookup, sample, repeats)
+
+    # The postings are counted in place rather than copied by the
+    # strong_matches and weak_matches methods
+    strong_matches, weak_matches = directory._directory._lookup_dict
+    results['index'] = {
+        'strong_keys': len(strong_matches),
+        'weak_keys': len(weak_matches),
+        'postings': sum(map(len, strong_matches.values()))
+        + sum(map(len, weak_matches.values())),
+    }
+
+    if measure_memory:
+        results['index']['memory_bytes'] = directory.memory_usage()['total']
+
+    return {
+        'format_version': FORMAT_VERSION,
+        'created': strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': scale,
+        'seed': seed,
+        'generator': options,
+        'results': results,
+    }
+
+
+def compare_results(baseline, candidate, tolerance=0.1):
+    """This function compares the results of two benchmark runs.
+
+    Parameters
+    ----------
+    baseline : dict
+        The results of the reference run.
+    candidate : dict
+        The results of the run compared with the reference.
+    tolerance : float, optional
+        The relative slowdown, or memory growth, above which a
+        measurement is reported as a regression.
+
+    Returns
+    -------
+    dict {str: dict}
+        Returns, for each measurement of both runs, the baseline and
+        candidate values, their ratio and whether it regressed.
+    """
+    # The memory of the runs of earlier formats was measured otherwise
+    metrics = ('ns_per_op', 'memory_bytes')
+    if baseline.get('format_version') != candidate.get('format_version'):
+        metrics = ('ns_per_op',)
+
+    comparison = {}
+    for name, measurement in candidate['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+
+        for metric in metrics:
+            if metric in measurement and metric in base and base[metric]:
+                ratio = measurement[metric] / base[metric]
+                comparison['{}.{}'.format(name, metric)] = {
+                    'baseline': base[metric],
+                    'candidate': measurement[metric],
+                    'ratio': ratio,
+                    'regression': ratio > 1 + tolerance,
+                }
+
+    return comparison
+
+
+def main(argv=None):
+    """Runs or compares benchmarks from the command line."""
+    parser = ArgumentParser(description='Benchmark name matching.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='run the benchmarks')
+    run.add_argument('--scale', type=int, default=SCALES[0],
+                     help='the number of names, e.g. {}'.format(
+                         ', '.join(str(s) for s in SCALES)))
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--repeats', type=int, default=3)
+    run.add_argument('--skip-memory', action='store_true')
+    run.add_argument('--min-tokens', type=int, default=1)
+    run.add_argument('--max-tokens', type=int, default=4)
+    run.add_argument('--accent-density', type=float, default=0.05)
+    run.add_argument('--title-frequency', type=float, default=0.05)
+    run.add_argument('--abbreviation-frequency', type=float, default=0.01)
+    run.add_argument('--collision-skew', type=float, default=1.0)
+    run.add_argument('--output', help='the JSON file to write, or stdout')
+
+    compare = subparsers.add_parser('compare', help='compare two runs')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.add_argument('--tolerance', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run_benchmarks(
+            args.scale, args.seed, args.repeats, not args.skip_memory, {
+                'min_tokens': args.min_tokens,
+                'max_tokens': args.max_tokens,
+                'accent_density': args.accent_density,
+                'title_frequency': args.title_frequency,
+                'abbreviation_frequency': args.abbreviation_frequency,
+                'collision_skew': args.collision_skew,
+            }
+        )
+        if args.output:
+            with open(args.output, 'w') as f:
+                dump(report, f, indent=2)
+        else:
+            dump(report, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = load(f)
+    with open(args.candidate) as f:
+        candidate = load(f)
+
+    comparison = compare_results(baseline, candidate, args.tolerance)
+    dump(comparison, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+    return 1 if any(c['regression'] for c in comparison.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
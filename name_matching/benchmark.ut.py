@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+
+from benchmark import (SyntheticNameGenerator, compare_results, measure,
+                       run_benchmarks)
+from name_lookup_directory import NameLookupDirectory
+
+
+class TestSyntheticNameGenerator(unittest.TestCase):
+
+    def test_names_with_same_seed(self):
+        names1 = SyntheticNameGenerator(seed=5).names(50)
+        names2 = SyntheticNameGenerator(seed=5).names(50)
+
+        self.assertEqual(names1, names2)
+
+    def test_names_with_token_bounds(self):
+        generator = SyntheticNameGenerator(min_tokens=2, max_tokens=3,
+                                           title_frequency=0)
+
+        counts = {len(name.split(' ')) for name in generator.names(200)}
+
+        self.assertEqual(counts, {2, 3})
+
+    def test_names_with_accents_and_titles(self):
+        generator = SyntheticNameGenerator(accent_density=1.0,
+                                           title_frequency=1.0,
+                                           abbreviation_frequency=0)
+
+        names = generator.names(20)
+
+        self.assertTrue(all(not name.isascii() for name in names))
+        self.assertTrue(all(name.split(' ')[0] in
+                            SyntheticNameGenerator.TITLES for name in names))
+
+    def test_names_with_collision_skew(self):
+        skewed = SyntheticNameGenerator(collision_skew=2.0, accent_density=0,
+                                        min_tokens=1, max_tokens=1,
+                                        title_frequency=0).names(500)
+        uniform = SyntheticNameGenerator(collision_skew=0.0, accent_density=0,
+                                         min_tokens=1, max_tokens=1,
+                                         title_frequency=0).names(500)
+
+        self.assertLess(len(set(skewed)), len(set(uniform)))
+
+    def test_init_with_invalid_token_bounds(self):
+        with self.assertRaises(ValueError) as _:
+            SyntheticNameGenerator(min_tokens=3, max_tokens=2)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_measure_with_items(self):
+        output = measure(str.lower, ['A'] * 10, repeats=1)
+
+        self.assertEqual(set(output), {'seconds', 'ops_per_second',
+                                       'ns_per_op'})
+
+    def test_run_benchmarks_with_small_scale(self):
+        output = run_benchmarks(50, repeats=1,
+                                generator_options={'vocabulary_size': 100})
+
+        self.assertEqual(output['scale'], 50)
+        self.assertIn('memory_bytes', output['results']['index'])
+        self.assertGreater(output['results']['add_names']['ops_per_second'],
+                           0)
+
+    def test_run_benchmarks_without_copying_index(self):
+        names = SyntheticNameGenerator(0, vocabulary_size=100).names(50)
+        directory = NameLookupDirectory()
+        directory.add_names(names, range(50))
+        strong_matches = directory.strong_matches()
+        weak_matches = directory.weak_matches()
+
+        with mock.patch.object(NameLookupDirectory, 'strong_matches') as \
+                copy_strong, \
+                mock.patch.object(NameLookupDirectory, 'weak_matches') as \
+                copy_weak:
+            output = run_benchmarks(50, repeats=1,
+                                    generator_options={'vocabulary_size': 100})
+
+        copy_strong.assert_not_called()
+        copy_weak.assert_not_called()
+        self.assertEqual(output['results']['index']['postings'],
+                         sum(map(len, strong_matches.values()))
+                         + sum(map(len, weak_matches.values())))
+        self.assertEqual(output['results']['index']['memory_bytes'],
+                         directory.memory_usage()['total'])
+
+    def test_compare_results_with_other_format_version(self):
+        baseline = {'format_version': 1,
+                    'results': {'index': {'memory_bytes': 100}}}
+        candidate = {'format_version': 2,
+                     'results': {'index': {'memory_bytes': 150}}}
+
+        self.assertEqual(compare_results(baseline, candidate), {})
+
+    def test_compare_results_with_regression(self):
+        baseline = {'results': {'lookup': {'ns_per_op': 100.0}}}
+        candidate = {'results': {'lookup': {'ns_per_op': 150.0},
+                                 'new': {'ns_per_op': 1.0}}}
+
+        output = compare_results(baseline, candidate, tolerance=0.2)
+
+        self.assertEqual(list(output), ['lookup.ns_per_op'])
+        self.assertTrue(output['lookup.ns_per_op']['regression'])
+
+
+if __name__ == "__main__":
+    unittest.main()
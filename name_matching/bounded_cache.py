@@ -0,0 +1,259 @@
+from collections import OrderedDict
+from enum import Enum
+import sys
+from threading import Lock
+
+
+class Eviction(Enum):
+    LRU = 0
+    CLOCK = 1
+
+    @staticmethod
+    def from_string(eviction):
+        if eviction is None or not isinstance(eviction, str):
+            raise NotImplementedError()
+
+        if eviction.upper() == 'LRU':
+            return Eviction.LRU
+        elif eviction.upper() == 'CLOCK':
+            return Eviction.CLOCK
+
+        raise NotImplementedError()
+
+
+def entry_size(key, value):
+    """Returns the number of bytes held by a cache entry's key and
+    value, and by the items of a tuple value."""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(sys.getsizeof(item) for item in value)
+
+    return size
+
+
+class BoundedCache(object):
+    """The BoundedCache class is a thread-safe cache holding at most
+    a given number of entries, and optionally at most a given number of
+    bytes. When full, entries are evicted either by LRU, which evicts
+    the least recently used entry, or by CLOCK, which sweeps the
+    entries in insertion order and evicts the first one that was not
+    used since the last sweep. CLOCK approximates LRU without
+    reordering the entries on every hit.
+
+    Parameters
+    ----------
+    max_entries : int
+        The maximum number of entries held by the cache. None means no
+        limit, in which case max_bytes must be given.
+    eviction : Union[Eviction, str], optional
+        The eviction policy, LRU or CLOCK.
+    max_bytes : int, optional
+        The maximum number of bytes held by the entries, as measured by
+        the sizeof function. An entry larger than this is not cached.
+        None means no limit.
+    sizeof : Callable, optional
+        Called with the key and the value of an entry to measure the
+        number of bytes it holds. Only called if max_bytes is given.
+
+    Raises
+    ------
+    ValueError
+        If neither limit is given, if max_entries or max_bytes are
+        lower than 1 or if the eviction policy is not implemented by
+        the Eviction Enum class.
+    """
+    _MISSING = object()
+
+    def __init__(self, max_entries, eviction=Eviction.LRU, max_bytes=None,
+                 sizeof=entry_size):
+        if max_entries is None and max_bytes is None:
+            raise ValueError('The cache must be bounded.')
+        if max_entries is not None and max_entries < 1:
+            raise ValueError('The cache must hold at least 1 entry.')
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError('The cache must hold at least 1 byte.')
+
+        if not isinstance(eviction, Eviction):
+            try:
+                eviction = Eviction.from_string(eviction)
+            except NotImplementedError:
+                raise ValueError('The eviction value you gave is invalid.')
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self._sizeof = sizeof
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        # The size of each entry is kept so that it can be subtracted
+        # when the entry is evicted
+        self._sizes = {}
+        self._bytes = 0
+        # CLOCK keeps a reference bit per entry, the entries' order
+        # being the clock's face and its first entry the clock's hand
+        self._referenced = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, key, compute):
+        """This method returns the value cached for a key, computing
+        and caching it on a miss. The value is computed outside of the
+        cache's lock, so concurrent misses on the same key may each
+        compute it.
+
+        Parameters
+        ----------
+        key : obj
+            A hashable key.
+        compute : Callable
+            Called with the key to compute its value on a miss.
+
+        Returns
+        -------
+        obj
+            Returns the value associated with the key.
+        """
+        value = self.get(key, BoundedCache._MISSING)
+        if value is BoundedCache._MISSING:
+            value = compute(key)
+            self.put(key, value)
+
+        return value
+
+    def get(self, key, default=None):
+        """This method returns the value cached for a key and counts
+        the lookup as a hit or a miss.
+
+        Parameters
+        ----------
+        key : obj
+            A hashable key.
+        default : obj, optional
+            The value returned when the key is not cached.
+
+        Returns
+        -------
+        obj
+            Returns the value cached for the key or the default value.
+        """
+        with self._lock:
+            value = self._entries.get(key, BoundedCache._MISSING)
+            if value is BoundedCache._MISSING:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            if self.eviction == Eviction.LRU:
+                self._entries.move_to_end(key)
+            else:
+                self._referenced[key] = True
+
+            return value
+
+    def put(self, key, value):
+        """This method caches a value for a key, evicting an entry
+        if the cache is full.
+
+        Parameters
+        ----------
+        key : obj
+            A hashable key.
+        value : obj
+            The value to cache.
+        """
+        size = 0
+        if self.max_bytes is not None:
+            size = self._sizeof(key, value)
+            if size > self.max_bytes:
+                return
+
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = value
+                if self.max_bytes is not None:
+                    self._bytes += size - self._sizes[key]
+                    self._sizes[key] = size
+                    self._evict_bytes(key)
+                return
+
+            if self.max_entries is not None and \
+                    len(self._entries) >= self.max_entries:
+                self._evict()
+
+            self._entries[key] = value
+            if self.eviction == Eviction.CLOCK:
+                self._referenced[key] = False
+            if self.max_bytes is not None:
+                self._sizes[key] = size
+                self._bytes += size
+                self._evict_bytes(key)
+
+    def clear(self):
+        """Removes every entry from the cache, keeping its counters."""
+        with self._lock:
+            self._entries.clear()
+            self._referenced.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """This method returns the cache's counters.
+
+        Returns
+        -------
+        dict {str: int}
+            Returns the number of hits, misses and evictions of the
+            cache along with its number of entries and its capacity
+            and, if it is bounded in bytes, the number of bytes held
+            by its entries and its capacity in bytes.
+        """
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+            if self.max_bytes is not None:
+                stats['bytes'] = self._bytes
+                stats['max_bytes'] = self.max_bytes
+
+            return stats
+
+    def _evict(self, keep=_MISSING):
+        """Evicts one entry according to the eviction policy, other
+        than the entry of the key to keep, if any."""
+        if self.eviction == Eviction.LRU:
+            if keep is not BoundedCache._MISSING:
+                self._entries.move_to_end(keep)
+            key, _ = self._entries.popitem(last=False)
+        else:
+            # Referenced entries get a second chance: they are moved
+            # behind the hand with their reference bit cleared
+            key = next(iter(self._entries))
+            while key == keep or self._referenced[key]:
+                self._referenced[key] = False
+                self._entries.move_to_end(key)
+                key = next(iter(self._entries))
+
+            del self._entries[key]
+            del self._referenced[key]
+
+        if self.max_bytes is not None:
+            self._bytes -= self._sizes.pop(key)
+        self.evictions += 1
+
+    def _evict_bytes(self, key):
+        """Evicts entries until the cache holds at most max_bytes,
+        other than the entry of the given, just written, key."""
+        while self._bytes > self.max_bytes:
+            self._evict(key)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,105 @@
+import unittest
+
+from bounded_cache import Eviction, BoundedCache
+
+
+class TestEviction(unittest.TestCase):
+
+    def test_from_string_with_implemented_enum(self):
+        self.assertIs(Eviction.from_string('clock'), Eviction.CLOCK)
+
+    def test_from_string_with_unimplemented_enum(self):
+        with self.assertRaises(NotImplementedError) as _:
+            Eviction.from_string('FIFO')
+
+
+class TestBoundedCache(unittest.TestCase):
+
+    def test_init_with_invalid_max_entries(self):
+        with self.assertRaises(ValueError) as _:
+            BoundedCache(0)
+
+    def test_init_with_invalid_eviction(self):
+        with self.assertRaises(ValueError) as _:
+            BoundedCache(2, 'foo')
+
+    def test_get_or_compute_with_repeated_keys(self):
+        computed = []
+        cache = BoundedCache(2)
+
+        for key in ['a', 'b', 'a', 'a']:
+            cache.get_or_compute(key, lambda k: computed.append(k) or k * 2)
+
+        self.assertEqual(computed, ['a', 'b'])
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 2,
+                                         'evictions': 0, 'entries': 2,
+                                         'max_entries': 2})
+
+    def test_put_with_lru_eviction(self):
+        cache = BoundedCache(2, Eviction.LRU)
+
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_put_with_clock_eviction(self):
+        cache = BoundedCache(3, 'clock')
+
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('c', 3)
+        cache.get('a')
+        cache.get('c')
+        cache.put('d', 4)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(k) for k in 'acd'], [1, 3, 4])
+        self.assertEqual(len(cache), 3)
+
+    def test_init_without_bounds(self):
+        with self.assertRaises(ValueError) as _:
+            BoundedCache(None)
+
+    def test_put_with_max_bytes(self):
+        cache = BoundedCache(None, max_bytes=10,
+                             sizeof=lambda key, value: value)
+
+        cache.put('a', 4)
+        cache.put('b', 4)
+        cache.get('a')
+        cache.put('c', 4)
+        cache.put('d', 11)
+
+        self.assertEqual([cache.get(k) for k in 'abcd'], [4, None, 4, None])
+        self.assertEqual(cache.stats()['bytes'], 8)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_put_with_max_bytes_and_clock_eviction(self):
+        cache = BoundedCache(10, 'clock', max_bytes=10,
+                             sizeof=lambda key, value: value)
+
+        cache.put('a', 4)
+        cache.put('b', 4)
+        cache.get('a')
+        cache.get('b')
+        cache.put('a', 9)
+
+        self.assertEqual([cache.get(k) for k in 'ab'], [9, None])
+        self.assertEqual(cache.stats()['bytes'], 9)
+
+    def test_clear_with_cached_entries(self):
+        cache = BoundedCache(2)
+        cache.put('a', 1)
+
+        cache.clear()
+
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+from argparse import ArgumentParser
+from itertools import islice
+from json import dumps
+import sys
+from time import perf_counter
+
+from combination_policy import CombinationPolicy, CombinationStrategy
+from double_metaphone import Threshold
+from file_ingest import RecordReader
+from name_lookup_directory import NameLookupDirectory
+
+
+QUERY_BATCH_SIZE = 1000
+ID_TYPES = {'str': None, 'int': int}
+
+
+def build_parser():
+    """This function builds the command-line parser of the name-matching
+    tool and of its build, query, dedupe and bench subcommands.
+
+    Returns
+    -------
+    ArgumentParser
+        Returns the command-line parser.
+    """
+    parser = ArgumentParser(
+        prog='name-matching',
+        description='Build, query and benchmark name lookup directories.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser(
+        'build', help='stream a file of names into a directory and save it'
+    )
+    build.add_argument('input', help='the CSV or JSON Lines file of names')
+    build.add_argument('output', help='the file to save the directory to')
+    _add_ingest_arguments(build)
+
+    query = subparsers.add_parser(
+        'query', help='match the names read from stdin, one per line'
+    )
+    query.add_argument('index', help='a directory saved by build')
+    _add_threshold_argument(query)
+    query.add_argument('--no-mmap', action='store_true',
+                       help='read the directory into memory')
+    query.add_argument('--max-distance', type=int, default=None,
+                       help='also match the names whose metaphones are '
+                            'within this edit distance')
+
+    dedupe = subparsers.add_parser(
+        'dedupe', help='output the groups of duplicate names of a directory'
+    )
+    dedupe.add_argument('index', help='a directory saved by build')
+    _add_threshold_argument(dedupe)
+    dedupe.add_argument('--max-posting-size', type=int, default=None,
+                        help='skip metaphones shared by more names')
+    dedupe.add_argument('--min-size', type=int, default=2,
+                        help='the minimum size of a group')
+
+    bench = subparsers.add_parser(
+        'bench', help='measure ingest and query throughput and latency'
+    )
+    bench.add_argument('input', help='the CSV or JSON Lines file of names')
+    _add_ingest_arguments(bench)
+    _add_threshold_argument(bench)
+    bench.add_argument('--queries', type=int, default=10000,
+                       help='the number of names queried')
+
+    return parser
+
+
+def _add_ingest_arguments(parser):
+    """Adds the arguments describing the ingested file and the
+    directory's combination policy to a subcommand's parser."""
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--name-field', default='name')
+    parser.add_argument('--id-field', default='id')
+    parser.add_argument('--id-type', choices=sorted(ID_TYPES), default='str')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--strategy', default='all',
+                        choices=[s.name.lower() for s in CombinationStrategy])
+    parser.add_argument('--max-components', type=int, default=None)
+    parser.add_argument('--max-combinations', type=int, default=None)
+    parser.add_argument('--drop-initials', action='store_true')
+    parser.add_argument('--compact', action='store_true',
+                        help='store the directory compactly while building')
+
+
+def _add_threshold_argument(parser):
+    """Adds the threshold argument to a subcommand's parser."""
+    parser.add_argument('--threshold', default='strong',
+                        choices=[t.name.lower() for t in Threshold])
+
+
+def _create_directory(args):
+    """Creates a directory with the combination policy of the
+    arguments."""
+    return NameLookupDirectory(CombinationPolicy(
+        args.strategy, args.max_components, args.max_combinations,
+        args.drop_initials
+    ), compact=args.compact)
+
+
+def _load_directory(path, use_mmap=True, approximate=False):
+    """Loads a directory saved by the build subcommand."""
+    directory = NameLookupDirectory(approximate=approximate)
+    directory.load(path, mmap=use_mmap)
+
+    return directory
+
+
+def _ingest(directory, args, stderr):
+    """Streams the input file of the arguments into a directory,
+    reporting the progress on stderr."""
+    def report(stats):
+        stderr.write('\r{rows} rows, {rows_skipped} skipped, '
+                     '{bytes_read} bytes, {rows_per_second:.0f} rows/s'
+                     .format(**stats.as_dict()))
+        stderr.flush()
+
+    stats = directory.ingest_file(
+        args.input, args.name_field, args.id_field, args.format,
+        args.batch_size, ID_TYPES[args.id_type], args.workers, report
+    )
+    stderr.write('\n')
+
+    return stats
+
+
+def run_build(args, stdin, stdout, stderr):
+    """Streams a file into a directory and saves it."""
+    directory = _create_directory(args)
+    _ingest(directory, args, stderr)
+    directory.save(args.output)
+
+    return 0
+
+
+def run_query(args, stdin, stdout, stderr):
+    """Matches the names read from stdin, one per line, and writes a
+    JSON line holding each name and its matching ids to stdout. With a
+    maximum distance, the line also holds the distance of each id's
+    closest metaphone."""
+    approximate = args.max_distance is not None
+    directory = _load_directory(args.index, not args.no_mmap, approximate)
+    names = (line.rstrip('\r\n') for line in stdin)
+
+    while True:
+        batch = list(islice(names, QUERY_BATCH_SIZE))
+        if not batch:
+            break
+
+        if approximate:
+            lines = []
+            for name in batch:
+                matches = directory.lookup_approximate(
+                    name, args.max_distance, args.threshold
+                )
+                lines.append(dumps({
+                    'name': name,
+                    'ids': [name_id for name_id, _ in matches],
+                    'distances': [distance for _, distance in matches],
+                }) + '\n')
+            stdout.write(''.join(lines))
+            continue
+
+        matches = directory.lookup_many(batch, args.threshold)
+        stdout.write(''.join(
+            dumps({'name': name, 'ids': name_ids}) + '\n'
+            for name, name_ids in zip(batch, matches)
+        ))
+
+    return 0
+
+
+def run_dedupe(args, stdin, stdout, stderr):
+    """Writes a JSON line holding the size and the ids of each group of
+    duplicate names of a directory to stdout."""
+    directory = _load_directory(args.index)
+    groups = directory.find_duplicate_groups(
+        args.threshold, args.max_posting_size, args.min_size
+    )
+
+    for group in groups:
+        stdout.write(dumps({'size': len(group), 'ids': group}) + '\n')
+
+    return 0
+
+
+def run_bench(args, stdin, stdout, stderr):
+    """Ingests a file, queries a sample of its names one at a time and
+    writes the ingest and query throughput and latency percentiles to
+    stdout as JSON."""
+    directory = _create_directory(args)
+    stats = _ingest(directory, args, stderr)
+
+    reader = RecordReader(args.input, args.name_field, args.id_field,
+                          args.format)
+    queries = []
+    for names, _ in reader.batches(args.batch_size):
+        queries.extend(names[:args.queries - len(queries)])
+        if len(queries) >= args.queries:
+            break
+
+    latencies = []
+    started = perf_counter()
+    for name in queries:
+        query_started = perf_counter()
+        directory.lookup(name, args.threshold)
+        latencies.append(perf_counter() - query_started)
+    elapsed = perf_counter() - started
+
+    latencies.sort()
+    stdout.write(dumps({
+        'ingest': stats.as_dict(),
+        'query': {
+            'queries': len(latencies),
+            'elapsed': elapsed,
+            'queries_per_second': len(latencies) / elapsed
+            if elapsed > 0 else 0.0,
+            'latency_seconds': {
+                'p50': percentile(latencies, 50),
+                'p90': percentile(latencies, 90),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            },
+        },
+    }, indent=2) + '\n')
+
+    return 0
+
+
+def percentile(sorted_values, p):
+    """This function returns a percentile of sorted values using the
+    nearest-rank method.
+
+    Parameters
+    ----------
+    sorted_values : list of float
+        Values sorted in ascending order.
+    p : float
+        The percentile, between 0 and 100.
+
+    Returns
+    -------
+    float
+        Returns the percentile, or None if there are no values.
+    """
+    if not sorted_values:
+        return None
+
+    rank = max(1, -(-len(sorted_values) * p // 100))
+
+    return sorted_values[int(rank) - 1]
+
+
+COMMANDS = {
+    'build': run_build,
+    'query': run_query,
+    'dedupe': run_dedupe,
+    'bench': run_bench,
+}
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """This function runs the name-matching command-line tool.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        The command-line arguments, sys.argv[1:] by default.
+    stdin, stdout, stderr : file, optional
+        The streams of the tool, the process' streams by default.
+
+    Returns
+    -------
+    int
+        Returns the exit status of the tool.
+    """
+    stdin = stdin if stdin is not None else sys.stdin
+    stdout = stdout if stdout is not None else sys.stdout
+    stderr = stderr if stderr is not None else sys.stderr
+
+    args = build_parser().parse_args(argv)
+    try:
+        return COMMANDS[args.command](args, stdin, stdout, stderr)
+    except (OSError, ValueError) as e:
+        stderr.write('name-matching: error: {}\n'.format(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
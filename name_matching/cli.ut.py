@@ -0,0 +1,85 @@
+from io import StringIO
+from json import loads
+import os
+import shutil
+import tempfile
+import unittest
+
+from cli import main, percentile
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, 'names.csv')
+        self.index = os.path.join(self.directory, 'names.idx')
+        with open(self.input, 'w') as f:
+            f.write('id,name\n1,Jane Doe\n2,John Doe\n3,Jimmy Page\n4,Page\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, argv, stdin=''):
+        stdout, stderr = StringIO(), StringIO()
+        status = main(argv, StringIO(stdin), stdout, stderr)
+
+        return status, stdout.getvalue()
+
+    def test_main_with_build_and_query(self):
+        build_status, _ = self._run(['build', self.input, self.index,
+                                     '--id-type', 'int'])
+        query_status, output = self._run(['query', self.index],
+                                         'Jane Doe\nnobody\n')
+
+        self.assertEqual((build_status, query_status), (0, 0))
+        self.assertEqual([loads(line) for line in output.splitlines()],
+                         [{'name': 'Jane Doe', 'ids': [1, 2]},
+                          {'name': 'nobody', 'ids': []}])
+
+    def test_main_with_approximate_query(self):
+        self._run(['build', self.input, self.index, '--id-type', 'int'])
+
+        status, output = self._run(['query', self.index, '--max-distance',
+                                    '1'], 'Jimmy Pag\n')
+
+        self.assertEqual(status, 0)
+        self.assertEqual(loads(output), {'name': 'Jimmy Pag', 'ids': [3],
+                                         'distances': [1]})
+
+    def test_main_with_dedupe(self):
+        self._run(['build', self.input, self.index, '--id-type', 'int'])
+
+        status, output = self._run(['dedupe', self.index])
+
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(loads(line)['ids']
+                                for line in output.splitlines()),
+                         [[1, 2], [3, 4]])
+
+    def test_main_with_bench(self):
+        status, output = self._run(['bench', self.input, '--queries', '2'])
+        report = loads(output)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(report['ingest']['rows'], 4)
+        self.assertEqual(report['query']['queries'], 2)
+
+    def test_main_with_missing_index(self):
+        status, _ = self._run(['query', self.index])
+
+        self.assertEqual(status, 1)
+
+    def test_percentile_with_values(self):
+        values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+
+        output = [percentile(values, p) for p in (0, 50, 90, 99, 100)]
+
+        self.assertEqual(output, [1, 5, 9, 10, 10])
+
+    def test_percentile_without_values(self):
+        self.assertIsNone(percentile([], 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+from enum import Enum
+from itertools import combinations, islice
+
+
+class CombinationStrategy(Enum):
+    ALL = 0
+    CONTIGUOUS = 1
+    FIRST_LAST = 2
+
+    @staticmethod
+    def from_string(strategy):
+        if strategy is None or not isinstance(strategy, str):
+            raise NotImplementedError()
+
+        if strategy.upper() == 'ALL':
+            return CombinationStrategy.ALL
+        elif strategy.upper() == 'CONTIGUOUS':
+            return CombinationStrategy.CONTIGUOUS
+        elif strategy.upper() == 'FIRST_LAST':
+            return CombinationStrategy.FIRST_LAST
+
+        raise NotImplementedError()
+
+
+class CombinationPolicy(object):
+    """The CombinationPolicy class bounds the name combinations
+    that are generated from a name's components before they are
+    added to a NameLookupDirectory. The complete name is always
+    the first combination generated, the strategy then decides
+    which subsets of its components follow:
+        - ALL yields every subset, from the largest to the smallest
+        - CONTIGUOUS yields the runs of adjacent components, from
+          the longest to the shortest
+        - FIRST_LAST yields the first and last components together,
+          followed by each component on its own
+
+    The components of a normalized name are sorted alphabetically, so
+    CONTIGUOUS and FIRST_LAST take the order the components were written
+    in when it is given, see NameNormalizer.normalize_name_in_order. The
+    components of each combination are then put back in the normalized
+    order.
+
+    Parameters
+    ----------
+    strategy : Union[CombinationStrategy, str], optional
+        The strategy used to pick the subsets of components.
+    max_components : int, optional
+        The maximum number of components of a subset. The complete
+        name is not affected by this limit. None means no limit.
+    max_combinations : int, optional
+        The maximum number of combinations generated per name,
+        including the complete name. None means no limit.
+    drop_initials : bool, optional
+        Whether single letter components are removed before the
+        combinations are generated. A name only made of initials
+        is kept as is.
+
+    Raises
+    ------
+    ValueError
+        If the strategy is not implemented by the CombinationStrategy
+        Enum class or if one of the limits is lower than 1.
+    """
+    def __init__(self, strategy=CombinationStrategy.ALL,
+                 max_components=None, max_combinations=None,
+                 drop_initials=False):
+        if not isinstance(strategy, CombinationStrategy):
+            try:
+                strategy = CombinationStrategy.from_string(strategy)
+            except NotImplementedError:
+                raise ValueError('The strategy value you gave is invalid.')
+
+        for limit in (max_components, max_combinations):
+            if limit is not None and limit < 1:
+                raise ValueError('The combination limits must be at least 1.')
+
+        self.strategy = strategy
+        self.max_components = max_components
+        self.max_combinations = max_combinations
+        self.drop_initials = drop_initials
+
+    @property
+    def ordered(self):
+        """Whether the combinations depend on the order the components
+        were written in."""
+        return self.strategy in (CombinationStrategy.CONTIGUOUS,
+                                 CombinationStrategy.FIRST_LAST)
+
+    def generate(self, name_tuple, order=None):
+        """This method generates the combinations of a name's
+        components allowed by the policy.
+
+        Parameters
+        ----------
+        name_tuple : tuple of str
+            The components of a name.
+        order : tuple of int, optional
+            The positions of the components in name_tuple, in the order
+            they were written in. None means they were written in the
+            order of name_tuple.
+
+        Returns
+        -------
+        list of tuple
+            Returns a list of tuples where each tuple is a name
+            combination.
+        """
+        if order is not None and self.ordered:
+            return [
+                tuple(name_tuple[i] for i in sorted(comb))
+                for comb in self._generate(order, name_tuple)
+            ]
+
+        return self._generate(name_tuple)
+
+    def _generate(self, name_tuple, names=None):
+        """Generates the combinations of the items of a name tuple,
+        which are the components of a name or, when names is given,
+        their positions in names."""
+        if self.drop_initials:
+            name_tuple = self._drop_initials(name_tuple, names)
+
+        if self.strategy == CombinationStrategy.CONTIGUOUS:
+            combs = self._contiguous_combinations(name_tuple)
+        elif self.strategy == CombinationStrategy.FIRST_LAST:
+            combs = self._first_last_combinations(name_tuple)
+        else:
+            combs = self._all_combinations(name_tuple)
+
+        return list(islice(combs, self.max_combinations))
+
+    @staticmethod
+    def count_all_combinations(name_tuple):
+        """Returns the number of combinations of the ALL strategy."""
+        return 2 ** len(name_tuple) - 1
+
+    def _largest_subset_size(self, name_tuple):
+        """Returns the size of the largest subset to generate."""
+        size = len(name_tuple) - 1
+        if self.max_components is not None:
+            size = min(size, self.max_components)
+
+        return size
+
+    def _all_combinations(self, name_tuple):
+        """This method yields the complete name followed by every
+        subset of its components, from the largest to the smallest.
+        """
+        yield name_tuple
+
+        i = self._largest_subset_size(name_tuple)
+        while i > 0:
+            yield from combinations(name_tuple, i)
+
+            i -= 1
+
+    def _contiguous_combinations(self, name_tuple):
+        """This method yields the complete name followed by the runs
+        of adjacent components, from the longest to the shortest.
+        """
+        yield name_tuple
+
+        i = self._largest_subset_size(name_tuple)
+        while i > 0:
+            for start in range(len(name_tuple) - i + 1):
+                yield name_tuple[start:start + i]
+
+            i -= 1
+
+    def _first_last_combinations(self, name_tuple):
+        """This method yields the complete name followed by its first
+        and last components and then by each component on its own.
+        """
+        yield name_tuple
+
+        if len(name_tuple) > 2 and self._largest_subset_size(name_tuple) > 1:
+            yield (name_tuple[0], name_tuple[-1])
+
+        if len(name_tuple) > 1:
+            for name in name_tuple:
+                yield (name,)
+
+    def _drop_initials(self, name_tuple, names=None):
+        """This method removes single letter components from a name
+        unless the name is only made of them. The name tuple holds
+        either the components or, when names is given, their positions
+        in names.
+        """
+        if names is not None:
+            kept = tuple(i for i in name_tuple if len(names[i]) > 1)
+        else:
+            kept = tuple(name for name in name_tuple if len(name) > 1)
+
+        return kept if kept else name_tuple
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,124 @@
+import unittest
+
+from combination_policy import CombinationStrategy, CombinationPolicy
+
+
+class TestCombinationStrategy(unittest.TestCase):
+
+    def test_from_string_with_implemented_enum(self):
+        self.assertIs(CombinationStrategy.from_string('first_last'),
+                      CombinationStrategy.FIRST_LAST)
+
+    def test_from_string_with_unimplemented_enum(self):
+        with self.assertRaises(NotImplementedError) as _:
+            CombinationStrategy.from_string('SOME')
+
+
+class TestCombinationPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.name_tuple = ('a', 'bb', 'cc', 'dd')
+
+    def test_generate_with_default_policy(self):
+        expected = [('Jane', 'J', 'Doe',), ('Jane', 'J',), ('Jane', 'Doe',),
+                    ('J', 'Doe',), ('Jane',), ('J',), ('Doe',)]
+
+        output = CombinationPolicy().generate(('Jane', 'J', 'Doe'))
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_max_components(self):
+        expected = [('bb', 'cc', 'dd'), ('bb', 'cc'), ('bb', 'dd'),
+                    ('cc', 'dd'), ('bb',), ('cc',), ('dd',)]
+
+        policy = CombinationPolicy(max_components=2)
+        output = policy.generate(('bb', 'cc', 'dd'))
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_max_combinations(self):
+        policy = CombinationPolicy(max_combinations=3)
+        output = policy.generate(self.name_tuple)
+
+        self.assertEqual(output, [self.name_tuple, ('a', 'bb', 'cc'),
+                                  ('a', 'bb', 'dd')])
+
+    def test_generate_with_contiguous_strategy(self):
+        expected = [('a', 'bb', 'cc'), ('a', 'bb'), ('bb', 'cc'),
+                    ('a',), ('bb',), ('cc',)]
+
+        policy = CombinationPolicy('contiguous')
+        output = policy.generate(('a', 'bb', 'cc'))
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_first_last_strategy(self):
+        expected = [self.name_tuple, ('a', 'dd'), ('a',), ('bb',),
+                    ('cc',), ('dd',)]
+
+        policy = CombinationPolicy(CombinationStrategy.FIRST_LAST)
+        output = policy.generate(self.name_tuple)
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_first_last_strategy_and_written_order(self):
+        # Zoe Anne Smith, whose components are normalized to anne smith zoe
+        expected = [('anne', 'smith', 'zoe'), ('smith', 'zoe'), ('zoe',),
+                    ('anne',), ('smith',)]
+
+        policy = CombinationPolicy(CombinationStrategy.FIRST_LAST)
+        output = policy.generate(('anne', 'smith', 'zoe'), (2, 0, 1))
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_contiguous_strategy_and_written_order(self):
+        expected = [('anne', 'smith', 'zoe'), ('anne', 'zoe'),
+                    ('anne', 'smith'), ('zoe',), ('anne',), ('smith',)]
+
+        policy = CombinationPolicy('contiguous', drop_initials=True)
+        output = policy.generate(('anne', 'b', 'smith', 'zoe'), (3, 1, 0, 2))
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_default_policy_and_written_order(self):
+        policy = CombinationPolicy()
+
+        self.assertEqual(policy.generate(self.name_tuple, (3, 2, 1, 0)),
+                         policy.generate(self.name_tuple))
+
+    def test_generate_with_first_last_strategy_and_one_component(self):
+        policy = CombinationPolicy(CombinationStrategy.FIRST_LAST)
+        output = policy.generate(('a',))
+
+        self.assertEqual(output, [('a',)])
+
+    def test_generate_with_dropped_initials(self):
+        expected = [('bb', 'cc'), ('bb',), ('cc',)]
+
+        policy = CombinationPolicy(drop_initials=True)
+        output = policy.generate(('a', 'bb', 'cc'))
+
+        self.assertEqual(output, expected)
+
+    def test_generate_with_dropped_initials_and_only_initials(self):
+        policy = CombinationPolicy(drop_initials=True)
+        output = policy.generate(('a',))
+
+        self.assertEqual(output, [('a',)])
+
+    def test_init_with_invalid_strategy(self):
+        with self.assertRaises(ValueError) as _:
+            CombinationPolicy('foo')
+
+    def test_init_with_invalid_limit(self):
+        with self.assertRaises(ValueError) as _:
+            CombinationPolicy(max_combinations=0)
+
+    def test_count_all_combinations(self):
+        output = CombinationPolicy.count_all_combinations(self.name_tuple)
+
+        self.assertEqual(output, 15)
+
+
+if __name__ == "__main__":
+    unittest.main()
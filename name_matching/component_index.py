@@ -0,0 +1,238 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from heapq import merge
+from itertools import groupby, repeat
+import sys
+
+
+# Number of ordinals freed by removals, in a ComponentIndex or in a
+# compact NameLookupDirectory, before the oldest of them is assigned
+# again
+MIN_FREE_ORDINALS = 1024
+
+
+class ComponentIndex(object):
+    """The ComponentIndex class is an inverted index mapping the
+    primary metaphone of each component of a name to the identifiers
+    of the names holding a component sounding like it, along with that
+    component's position in the name. Unlike the combinations of a
+    NameLookupDirectory, its size grows linearly with the number of
+    components of the names.
+
+    Name ids are mapped to dense integers, or ordinals, in the order
+    they are first added. The ordinals of removed name ids are reused,
+    oldest first, once more than MIN_FREE_ORDINALS of them are free, so
+    that the index does not grow under removals while a query still
+    walking a posting rarely maps an ordinal to the name id it was
+    reused for. A posting is a pair of arrays holding the ordinals and
+    the positions of its entries, sorted by ordinal and then by
+    position, so that postings can be intersected by galloping through
+    them rather than by hashing their entries.
+    """
+    def __init__(self):
+        self._postings = {}
+        self._ids = []
+        self._ordinals = {}
+        self._free_ordinals = deque()
+        # The metaphones and positions posted under each ordinal, from
+        # which its postings are found again when it is removed
+        self._components = []
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def add(self, name_id, components):
+        """This method posts a name id under the metaphones of a name's
+        components. An entry already posted for the name id is skipped.
+
+        Parameters
+        ----------
+        name_id : obj
+            The identifier of the name.
+        components : Iterable of tuple of str, int
+            The primary metaphones of the name's components and their
+            positions in the name.
+        """
+        components = list(dict.fromkeys(components))
+        if not components:
+            return
+
+        ordinal = self._ordinals.get(name_id)
+        if ordinal is None:
+            if len(self._free_ordinals) > MIN_FREE_ORDINALS:
+                ordinal = self._free_ordinals.popleft()
+                self._ids[ordinal] = name_id
+            else:
+                ordinal = len(self._ids)
+                self._ids.append(name_id)
+                self._components.append(())
+            self._ordinals[name_id] = ordinal
+
+        known = set(self._components[ordinal])
+        components = [c for c in components if c not in known]
+        self._components[ordinal] += tuple(components)
+
+        for metaphone, position in components:
+            postings = self._postings.get(metaphone)
+            if postings is None:
+                self._postings[sys.intern(metaphone)] = (
+                    array('q', (ordinal,)), array('q', (position,))
+                )
+                continue
+
+            # An entry is appended when its ordinal is the largest one,
+            # which is the case of the ordinals which are not reused
+            # unless their name id was added before, and inserted
+            # otherwise
+            ordinals, positions = postings
+            if ordinals[-1] < ordinal or (ordinals[-1] == ordinal and
+                                          positions[-1] < position):
+                ordinals.append(ordinal)
+                positions.append(position)
+                continue
+
+            lo = bisect_left(ordinals, ordinal)
+            i = bisect_right(positions, position, lo,
+                             bisect_right(ordinals, ordinal, lo))
+            ordinals.insert(i, ordinal)
+            positions.insert(i, position)
+
+    def remove(self, name_id):
+        """This method removes a name id from the postings of its
+        components' metaphones, each being found by bisection.
+
+        Parameters
+        ----------
+        name_id : obj
+            The identifier of the name.
+
+        Returns
+        -------
+        bool
+            Returns whether the name id was in the index.
+        """
+        ordinal = self._ordinals.pop(name_id, None)
+        if ordinal is None:
+            return False
+
+        for metaphone in {m for m, _ in self._components[ordinal]}:
+            ordinals, positions = self._postings[metaphone]
+            lo = bisect_left(ordinals, ordinal)
+            hi = bisect_right(ordinals, ordinal, lo)
+            del ordinals[lo:hi]
+            del positions[lo:hi]
+            if not ordinals:
+                del self._postings[metaphone]
+
+        self._ids[ordinal] = None
+        self._components[ordinal] = ()
+        self._free_ordinals.append(ordinal)
+
+        return True
+
+    def merge(self, other):
+        """This method adds the name ids of another component index,
+        in the order they were added to it.
+
+        Parameters
+        ----------
+        other : ComponentIndex
+            The index to merge.
+        """
+        for name_id, components in zip(other._ids, other._components):
+            if components:
+                self.add(name_id, components)
+
+    def query(self, metaphones, min_shared):
+        """This method returns the name ids posted under at least
+        min_shared of the given metaphones.
+
+        An id posted under min_shared of n postings is posted under at
+        least one of any n - min_shared + 1 of them. The candidates are
+        thus the entries of the n - min_shared + 1 shortest postings,
+        merged in ordinal order, and only those are searched for in the
+        longer postings, smallest first. Each longer posting is
+        galloped through from where the previous candidate was found,
+        and a candidate is dropped as soon as the postings left cannot
+        make it reach min_shared. When min_shared is n, this is the
+        intersection of the postings, smallest first.
+
+        Parameters
+        ----------
+        metaphones : Iterable of str
+            The metaphones to search for.
+        min_shared : int
+            The minimum number of metaphones an id must be posted
+            under.
+
+        Returns
+        -------
+        list of tuple of obj, int, tuple of int
+            Returns the matching name ids in the order of their
+            ordinals, which is the order they were first added unless
+            their ordinal was reused, each with the number of metaphones
+            it is posted under and the positions of the matching
+            components.
+        """
+        metaphones = list(dict.fromkeys(metaphones))
+        postings = sorted(
+            (self._postings[m] for m in metaphones if m in self._postings),
+            key=lambda p: len(p[0])
+        )
+        if min_shared < 1 or len(postings) < min_shared:
+            return []
+
+        # Metaphones without postings are the shortest ones
+        short_count = len(postings) - min_shared + 1
+        candidates = merge(*(
+            zip(ordinals, positions, repeat(i))
+            for i, (ordinals, positions) in enumerate(postings[:short_count])
+        ))
+        long_postings = postings[short_count:]
+        cursors = [0] * len(long_postings)
+
+        matches = []
+        for ordinal, entries in groupby(candidates, key=lambda e: e[0]):
+            entries = list(entries)
+            shared = len({i for _, _, i in entries})
+            positions = [position for _, position, _ in entries]
+
+            for i, (ordinals, long_positions) in enumerate(long_postings):
+                if shared + len(long_postings) - i < min_shared:
+                    break
+
+                lo = cursors[i] = _gallop(ordinals, ordinal, cursors[i])
+                hi = lo
+                while hi < len(ordinals) and ordinals[hi] == ordinal:
+                    hi += 1
+                if hi > lo:
+                    shared += 1
+                    positions.extend(long_positions[lo:hi])
+
+            # The ordinal may have been freed since it was read
+            name_id = self._ids[ordinal]
+            if shared >= min_shared and name_id is not None:
+                matches.append((name_id, shared,
+                                tuple(sorted(set(positions)))))
+
+        return matches
+
+
+def _gallop(ordinals, ordinal, lo):
+    """Returns the index of the first ordinal from lo that is not lower
+    than a given one, probing 1, 2, 4... entries ahead before
+    bisecting."""
+    size = len(ordinals)
+    hi = lo
+    step = 1
+    while hi < size and ordinals[hi] < ordinal:
+        lo = hi + 1
+        hi += step
+        step *= 2
+
+    return bisect_left(ordinals, ordinal, lo, min(hi, size))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,103 @@
+import random
+import unittest
+
+from component_index import MIN_FREE_ORDINALS, ComponentIndex
+
+
+class TestComponentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ComponentIndex()
+        self.index.add('a', [('JN', 0), ('T', 1)])
+        self.index.add('b', [('JN', 0), ('SM0', 1)])
+        self.index.add('c', [('T', 0), ('SM0', 1), ('JN', 2)])
+
+    def test_query_with_all_metaphones(self):
+        output = self.index.query(['JN', 'T'], 2)
+
+        self.assertEqual(output, [('a', 2, (0, 1)), ('c', 2, (0, 2))])
+
+    def test_query_with_min_shared(self):
+        output = self.index.query(['JN', 'T', 'SM0', 'KRN'], 2)
+
+        self.assertEqual([name_id for name_id, _, _ in output],
+                         ['a', 'b', 'c'])
+        self.assertEqual(output[2], ('c', 3, (0, 1, 2)))
+
+    def test_query_with_missing_metaphones(self):
+        self.assertEqual(self.index.query(['KRN', 'JN'], 2), [])
+
+    def test_add_with_existing_name_id(self):
+        self.index.add('a', [('SM0', 0), ('JN', 0)])
+
+        self.assertEqual(self.index.query(['SM0', 'T'], 2),
+                         [('a', 2, (0, 1)), ('c', 2, (0, 1))])
+        self.assertEqual(len(self.index), 3)
+
+    def test_remove(self):
+        removed = self.index.remove('b')
+
+        self.assertTrue(removed)
+        self.assertFalse(self.index.remove('b'))
+        self.assertEqual(self.index.query(['SM0'], 1), [('c', 1, (1,))])
+
+    def test_remove_with_reused_ordinals(self):
+        self.index.remove('a')
+        for name_id in range(MIN_FREE_ORDINALS + 1):
+            self.index.add(name_id, [('K', 0)])
+        for name_id in range(MIN_FREE_ORDINALS + 1):
+            self.index.remove(name_id)
+        size = len(self.index._ids)
+
+        self.index.add('d', [('JN', 1), ('SM0', 0)])
+        self.index.add('e', [('T', 0)])
+
+        self.assertEqual(len(self.index._ids), size)
+        self.assertEqual(len(self.index), 4)
+        self.assertNotIn('K', self.index._postings)
+        self.assertEqual(self.index.query(['JN', 'SM0'], 2),
+                         [('d', 2, (0, 1)), ('b', 2, (0, 1)),
+                          ('c', 2, (1, 2))])
+        self.assertEqual(self.index.query(['T'], 1),
+                         [('c', 1, (0,)), ('e', 1, (0,))])
+        for ordinals, _ in self.index._postings.values():
+            self.assertEqual(list(ordinals), sorted(ordinals))
+
+    def test_merge(self):
+        other = ComponentIndex()
+        other.add('d', [('JN', 0)])
+        other.add('a', [('SM0', 2)])
+
+        self.index.merge(other)
+
+        self.assertEqual([name_id for name_id, _, _
+                          in self.index.query(['JN', 'SM0'], 2)],
+                         ['a', 'b', 'c'])
+        self.assertEqual(self.index.query(['JN'], 1)[-1], ('d', 1, (0,)))
+
+    def test_query_against_counting(self):
+        rand = random.Random(0)
+        metaphones = ['K{}'.format(i) for i in range(8)]
+        components = {}
+        for name_id in range(300):
+            components[name_id] = [
+                (rand.choice(metaphones[:rand.randint(1, 8)]), position)
+                for position in range(rand.randint(1, 5))
+            ]
+            self.index.add(name_id, components[name_id])
+
+        for min_shared in (1, 2, 3):
+            query = rand.sample(metaphones, 4)
+            expected = [
+                name_id for name_id, pairs in components.items()
+                if len({m for m, _ in pairs} & set(query)) >= min_shared
+            ]
+
+            output = self.index.query(query, min_shared)
+
+            self.assertEqual([name_id for name_id, _, _ in output
+                              if name_id in components], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
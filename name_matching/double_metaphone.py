@@ -1,7 +1,16 @@
 from enum import Enum
+from heapq import nlargest
 
 from metaphone import doublemetaphone
 
+from bounded_cache import BoundedCache, Eviction
+from metaphone_engine import double_metaphone
+
+
+# Scores of the pairs of positions in two metaphone tuples, from the
+# primary metaphones matching to the alternate metaphones matching
+PAIR_SCORES = (((0, 0), 1.0), ((0, 1), 0.75), ((1, 0), 0.75), ((1, 1), 0.5))
+
 
 class Threshold(Enum):
     WEAK = 0
@@ -34,13 +43,72 @@ class Threshold(Enum):
         raise NotImplementedError()
 
 
+class MetaphoneBackend(Enum):
+    LIBRARY = 0
+    NATIVE = 1
+
+    @staticmethod
+    def from_string(backend):
+        if backend is None or not isinstance(backend, str):
+            raise NotImplementedError()
+
+        if backend.upper() == 'LIBRARY':
+            return MetaphoneBackend.LIBRARY
+        elif backend.upper() == 'NATIVE':
+            return MetaphoneBackend.NATIVE
+
+        raise NotImplementedError()
+
+
 class DoubleMetaphoneMatcher(object):
     """The DoubleMetaphoneMatcher class is designed to provide
     a means to compare names using the double metaphone matching
     algorithm.
+
+    Parameters
+    ----------
+    cache_size : int, optional
+        The maximum number of double metaphones memoized by the
+        matcher. None disables the cache.
+    cache_eviction : Union[Eviction, str], optional
+        The eviction policy of the cache, LRU or CLOCK.
+    backend : Union[MetaphoneBackend, str, Callable], optional
+        The implementation producing the double metaphones. NATIVE, the
+        default, is the metaphone_engine module's, which produces the
+        same metaphones as the metaphone package's doublemetaphone
+        function, used by LIBRARY, in a fraction of the time. A
+        callable taking a name and returning its primary and alternate
+        metaphones may also be given; it must be picklable for
+        directories adding names with more than one worker.
+
+    Raises
+    ------
+    ValueError
+        If cache_size is lower than 1, if the eviction policy is not
+        implemented by the Eviction Enum class or if the backend is not
+        implemented by the MetaphoneBackend Enum class.
     """
-    def __init__(self):
-        pass
+    def __init__(self, cache_size=None, cache_eviction=Eviction.LRU,
+                 backend=MetaphoneBackend.NATIVE):
+        if not isinstance(backend, MetaphoneBackend) and \
+                not callable(backend):
+            try:
+                backend = MetaphoneBackend.from_string(backend)
+            except NotImplementedError:
+                raise ValueError('The backend value you gave is invalid.')
+
+        self.backend = backend
+        if backend == MetaphoneBackend.NATIVE:
+            self._compute = double_metaphone
+        elif backend == MetaphoneBackend.LIBRARY:
+            self._compute = doublemetaphone
+        else:
+            self._compute = backend
+
+        self.cache_size = cache_size
+        self._cache = None
+        if cache_size is not None:
+            self._cache = BoundedCache(cache_size, cache_eviction)
 
     def is_double_metaphone_match(self, name1, name2,
                                   threshold=Threshold.STRONG):
@@ -137,6 +205,255 @@ class DoubleMetaphoneMatcher(object):
         """
         return self.is_double_metaphone_match(name1, name2, Threshold.STRONG)
 
+    def match_one_to_many(self, name, candidates,
+                          threshold=Threshold.STRONG):
+        """This method compares a name with each of the candidate names
+        given a leniency threshold. The double metaphones of the name
+        and of each distinct candidate are only produced once.
+
+        Parameters
+        ----------
+        name : str
+            A name to compare the candidates against.
+        candidates : Iterable of str
+            The names to compare the name with.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when comparing the names.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+        Returns
+        -------
+        list of bool
+            Returns, for each candidate and in the same order, True if
+            it matches the name; False otherwise.
+
+        Raises
+        ------
+        ValueError
+            If the name or any of the candidates are None or if the
+            value contained by the threshold parameter is not
+            implemented by the Threshold Enum class.
+        """
+        if name is None:
+            raise ValueError('Neither of the name parameters can be None.')
+
+        thresh = self._ensure_threshold_is_enum(threshold)
+
+        metaphone = self.double_metaphone(name)
+        probes = [
+            (metaphone[i], k) for i, k in self._metaphone_pairs(thresh)
+        ]
+
+        return [
+            any(m == candidate_metaphone[k] for m, k in probes)
+            for candidate_metaphone in self._double_metaphones(candidates)
+        ]
+
+    def score(self, name1, name2):
+        """This method scores how closely two names sound alike given
+        which of their metaphones match:
+            - 1.0 if their primary metaphones match
+            - 0.75 if the primary metaphone of one matches the
+              alternate metaphone of the other
+            - 0.5 if their alternate metaphones match
+            - 0.0 otherwise
+        Empty metaphones never match.
+
+        Parameters
+        ----------
+        name1 : str
+            A name to compare.
+        name2 : str
+            A name to compare.
+
+        Returns
+        -------
+        float
+            Returns the score of the best matching pair of metaphones.
+
+        Raises
+        ------
+        ValueError
+            If either of the names are None.
+        """
+        if name1 is None or name2 is None:
+            raise ValueError('Neither of the name parameters can be None.')
+
+        return self._score_metaphones(self.double_metaphone(name1),
+                                      self.double_metaphone(name2))
+
+    def rank_candidates(self, name, candidates, k=None):
+        """This method scores each of the candidate names against a
+        name, see the score method, and returns the best scoring ones.
+        Only the k best candidates are kept in a heap rather than all
+        of them being sorted.
+
+        Parameters
+        ----------
+        name : str
+            A name to compare the candidates against.
+        candidates : Iterable of str
+            The names to compare the name with.
+        k : int, optional
+            The maximum number of candidates returned. None returns
+            every matching candidate.
+
+        Returns
+        -------
+        list of tuple of int, float
+            Returns the positions of the candidates matching the name
+            and their scores, best first. Ties are kept in the order of
+            the candidates.
+
+        Raises
+        ------
+        ValueError
+            If the name or any of the candidates are None.
+        """
+        if name is None:
+            raise ValueError('Neither of the name parameters can be None.')
+
+        metaphone = self.double_metaphone(name)
+        scores = (
+            (i, self._score_metaphones(metaphone, candidate_metaphone))
+            for i, candidate_metaphone
+            in enumerate(self._double_metaphones(candidates))
+        )
+        matches = [(i, score) for i, score in scores if score > 0]
+
+        if k is None:
+            return sorted(matches, key=lambda match: -match[1])
+
+        return nlargest(k, matches, key=lambda match: match[1])
+
+    @staticmethod
+    def _score_metaphones(m1, m2):
+        """Returns the score of the best matching pair of non-empty
+        metaphones of two metaphone tuples, or 0.0."""
+        for (i, j), score in PAIR_SCORES:
+            if m1[i] and m1[i] == m2[j]:
+                return score
+
+        return 0.0
+
+    def match_matrix(self, names_a, names_b, threshold=Threshold.STRONG):
+        """This method compares every name of a list with every name
+        of another list given a leniency threshold. Rather than
+        comparing every pair of names, the names of the second list
+        are indexed by their metaphones, which the metaphones of the
+        first list's names are then looked up in, so that the cost
+        grows with the number of names and matches rather than with
+        the number of pairs.
+
+        Parameters
+        ----------
+        names_a : Iterable of str
+            The names to compare against.
+        names_b : Iterable of str
+            The names to compare with.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when comparing the names.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+        Returns
+        -------
+        list of tuple of int, int
+            Returns the sorted (i, j) index pairs for which the i-th
+            name of names_a matches the j-th name of names_b.
+
+        Raises
+        ------
+        ValueError
+            If any of the names are None or if the value contained by
+            the threshold parameter is not implemented by the Threshold
+            Enum class.
+        """
+        thresh = self._ensure_threshold_is_enum(threshold)
+        pairs = self._metaphone_pairs(thresh)
+
+        metaphones_a = self._double_metaphones(names_a)
+        metaphones_b = self._double_metaphones(names_b)
+
+        indexes = {}
+        for _, k in pairs:
+            if k not in indexes:
+                index = {}
+                for j, metaphone in enumerate(metaphones_b):
+                    index.setdefault(metaphone[k], []).append(j)
+                indexes[k] = index
+
+        matches = []
+        for i, metaphone in enumerate(metaphones_a):
+            if len(pairs) == 1:
+                m, k = pairs[0]
+                matches.extend(
+                    (i, j) for j in indexes[k].get(metaphone[m], ())
+                )
+            else:
+                matching = set()
+                for m, k in pairs:
+                    matching.update(indexes[k].get(metaphone[m], ()))
+                matches.extend((i, j) for j in sorted(matching))
+
+        return matches
+
+    def _double_metaphones(self, names):
+        """This method returns the double metaphones of names, producing
+        those of repeated names only once.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            The names to produce the double metaphones of.
+
+        Returns
+        -------
+        list of tuple of str, str
+            The double metaphones of the names, in the same order.
+
+        Raises
+        ------
+        ValueError
+            If any of the names are None.
+        """
+        metaphones = {}
+        results = []
+        for name in names:
+            if name is None:
+                raise ValueError('None of the names can be None.')
+
+            metaphone = metaphones.get(name)
+            if metaphone is None:
+                metaphone = metaphones[name] = self.double_metaphone(name)
+            results.append(metaphone)
+
+        return results
+
+    @staticmethod
+    def _metaphone_pairs(threshold):
+        """This method returns the positions of the metaphones that the
+        _compare_metaphones method compares given a threshold.
+
+        Parameters
+        ----------
+        threshold : Threshold
+            The threshold value to use for comparing metaphones.
+
+        Returns
+        -------
+        list of tuple of int, int
+            Returns pairs of positions in the first and in the second
+            metaphone tuples; metaphones match if any pair is equal.
+        """
+        if threshold == Threshold.WEAK:
+            return [(1, 1)]
+        elif threshold == Threshold.NORMAL:
+            return [(0, 1), (1, 0)]
+
+        return [(0, 0)]
+
     def _ensure_threshold_is_enum(self, threshold):
         """This method ensures that the threshold parameter
         supplied to the is_double_metaphone_match method is
@@ -184,9 +501,10 @@ class DoubleMetaphoneMatcher(object):
 
     def double_metaphone(self, name):
         """This method returns the metaphone values
-        associated with a name as a tuple. See the
-        metaphone.doublemetaphone method for implementation
-        details.
+        associated with a name as a tuple, produced by the
+        matcher's backend. See the metaphone.doublemetaphone
+        method for implementation details. When the matcher's
+        cache is enabled, the metaphone values are memoized.
 
         Parameters
         ----------
@@ -199,7 +517,29 @@ class DoubleMetaphoneMatcher(object):
             The metaphone values associated with the
             name parameter.
         """
-        return doublemetaphone(name)
+        if self._cache is None:
+            return self._double_metaphone(name)
+
+        return self._cache.get_or_compute(name, self._double_metaphone)
+
+    def cache_info(self):
+        """This method returns the counters of the matcher's cache.
+
+        Returns
+        -------
+        dict {str: int}
+            Returns the number of hits, misses and evictions of the
+            cache along with its number of entries and its capacity,
+            or None if the cache is disabled.
+        """
+        if self._cache is None:
+            return None
+
+        return self._cache.stats()
+
+    def _double_metaphone(self, name):
+        """Computes the metaphone values of a name without caching."""
+        return self._compute(name)
 
     def _compare_metaphones(self, m1, m2, threshold):
         """This method compares the metaphones associated
@@ -1,6 +1,10 @@
+import random
 import unittest
 
-from double_metaphone import Threshold, DoubleMetaphoneMatcher
+from metaphone import doublemetaphone
+
+from double_metaphone import (Threshold, DoubleMetaphoneMatcher,
+                              MetaphoneBackend)
 
 
 class TestThreshold(unittest.TestCase):
@@ -28,6 +32,17 @@ class TestThreshold(unittest.TestCase):
             Threshold.from_int(7)
 
 
+class TestMetaphoneBackend(unittest.TestCase):
+
+    def test_from_string_with_implemented_enum(self):
+        self.assertIs(MetaphoneBackend.from_string('library'),
+                      MetaphoneBackend.LIBRARY)
+
+    def test_from_string_with_unimplemented_enum(self):
+        with self.assertRaises(NotImplementedError) as _:
+            MetaphoneBackend.from_string('compiled')
+
+
 class TestDoubleMetaphoneMatcher(unittest.TestCase):
 
     def setUp(self):
@@ -104,6 +119,27 @@ class TestDoubleMetaphoneMatcher(unittest.TestCase):
 
         self.assertEqual(output, expected)
 
+    def test_double_metaphone_with_cache(self):
+        matcher = DoubleMetaphoneMatcher(cache_size=10)
+
+        for name in ['John', 'Jane', 'John', 'John']:
+            matcher.double_metaphone(name)
+        output = matcher.cache_info()
+
+        self.assertEqual((output['hits'], output['misses']), (2, 2))
+        self.assertEqual(matcher.double_metaphone('John'), ('JN', 'AN'))
+
+    def test_cache_info_without_cache(self):
+        self.assertIsNone(self.matcher.cache_info())
+
+    def test_is_double_metaphone_match_with_cache(self):
+        matcher = DoubleMetaphoneMatcher(cache_size=1, cache_eviction='clock')
+
+        output = [matcher.is_strong_match('John', 'Jane') for _ in range(3)]
+
+        self.assertEqual(output, [True, True, True])
+        self.assertEqual(matcher.cache_info()['evictions'], 5)
+
     def test_compare_metaphones_with_different_metaphones_for_weak_threshold(self):
         metaphone1 = ('JRE', 'JTE')
         metaphone2 = ('ALS', 'AL0')
@@ -158,6 +194,84 @@ class TestDoubleMetaphoneMatcher(unittest.TestCase):
 
         self.assertTrue(output)
 
+    def test_match_one_to_many_with_each_threshold(self):
+        candidates = ['Jane', 'Schmidt', 'Johannes', 'Smyth', 'Jane']
+
+        for threshold in Threshold:
+            expected = [
+                self.matcher.is_double_metaphone_match('Smith', candidate,
+                                                       threshold)
+                for candidate in candidates
+            ]
+            output = self.matcher.match_one_to_many('Smith', candidates,
+                                                    threshold)
+
+            self.assertEqual(output, expected)
+
+    def test_match_one_to_many_with_none_candidate(self):
+        with self.assertRaises(ValueError) as _:
+            self.matcher.match_one_to_many('Smith', ['Smyth', None])
+
+    def test_score_with_each_metaphone_pair(self):
+        self.assertEqual(self.matcher.score('Smith', 'Smyth'), 1.0)
+        self.assertEqual(self.matcher.score('Smith', 'Schmidt'), 0.75)
+        self.assertEqual(self.matcher.score('Schmidt', 'Smith'), 0.75)
+        self.assertEqual(self.matcher._score_metaphones(('A', 'B'),
+                                                        ('C', 'B')), 0.5)
+        self.assertEqual(self.matcher._score_metaphones(('A', ''),
+                                                        ('C', '')), 0.0)
+        self.assertEqual(self.matcher.score('Smith', 'Jane'), 0.0)
+
+    def test_rank_candidates_with_k(self):
+        candidates = ['Jane', 'Schmidt', 'Smyth', 'Smith', 'Jones']
+
+        output = self.matcher.rank_candidates('Smith', candidates, k=2)
+        all_output = self.matcher.rank_candidates('Smith', candidates)
+
+        self.assertEqual(output, [(2, 1.0), (3, 1.0)])
+        self.assertEqual(all_output, [(2, 1.0), (3, 1.0), (1, 0.75)])
+
+    def test_match_matrix_with_each_threshold(self):
+        rand = random.Random(3)
+        syllables = ['jo', 'ja', 'ne', 'smi', 'th', 'sch', 'mid', 'an', 'x']
+        names = [''.join(rand.choice(syllables)
+                         for _ in range(rand.randint(1, 3)))
+                 for _ in range(60)]
+        names_a, names_b = names[:25], names[25:]
+
+        for threshold in Threshold:
+            expected = [
+                (i, j)
+                for i, name_a in enumerate(names_a)
+                for j, name_b in enumerate(names_b)
+                if self.matcher.is_double_metaphone_match(name_a, name_b,
+                                                          threshold)
+            ]
+            output = self.matcher.match_matrix(names_a, names_b, threshold)
+
+            self.assertEqual(output, expected)
+
+    def test_match_matrix_with_invalid_threshold(self):
+        with self.assertRaises(ValueError) as _:
+            self.matcher.match_matrix(['John'], ['Jane'], 'foo')
+
+    def test_init_with_each_backend(self):
+        names = ['John Doe', 'Schmidt', 'Ceaser', 'Xavier Gonzalez']
+        native = DoubleMetaphoneMatcher(backend='native')
+        library = DoubleMetaphoneMatcher(backend=MetaphoneBackend.LIBRARY)
+
+        self.assertEqual([native.double_metaphone(n) for n in names],
+                         [library.double_metaphone(n) for n in names])
+
+    def test_init_with_callable_backend(self):
+        matcher = DoubleMetaphoneMatcher(backend=doublemetaphone)
+
+        self.assertEqual(matcher.double_metaphone('John'), ('JN', 'AN'))
+
+    def test_init_with_invalid_backend(self):
+        with self.assertRaises(ValueError) as _:
+            DoubleMetaphoneMatcher(backend='compiled')
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,227 @@
+import csv
+from enum import Enum
+from json import loads
+from time import perf_counter
+
+
+class RecordFormat(Enum):
+    CSV = 0
+    JSONL = 1
+
+    @staticmethod
+    def from_string(record_format):
+        if record_format is None or not isinstance(record_format, str):
+            raise NotImplementedError()
+
+        if record_format.upper() == 'CSV':
+            return RecordFormat.CSV
+        elif record_format.upper() == 'JSONL':
+            return RecordFormat.JSONL
+
+        raise NotImplementedError()
+
+
+class IngestStats(object):
+    """The IngestStats class holds the progress of a file ingestion:
+    the number of rows ingested and skipped, the number of bytes read
+    and the time elapsed since the ingestion started.
+    """
+    def __init__(self):
+        self.rows = 0
+        self.rows_skipped = 0
+        self.bytes_read = 0
+        self._started = perf_counter()
+        self._finished = None
+
+    @property
+    def elapsed(self):
+        """The number of seconds elapsed since the ingestion started,
+        up to its end once finished."""
+        end = self._finished if self._finished is not None else perf_counter()
+
+        return end - self._started
+
+    @property
+    def rows_per_second(self):
+        """The number of rows ingested per second."""
+        elapsed = self.elapsed
+
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        """Returns the progress as a dictionary."""
+        return {
+            'rows': self.rows,
+            'rows_skipped': self.rows_skipped,
+            'bytes_read': self.bytes_read,
+            'elapsed': self.elapsed,
+            'rows_per_second': self.rows_per_second,
+        }
+
+    def _finish(self):
+        """Marks the end of the ingestion."""
+        self._finished = perf_counter()
+
+
+class RecordReader(object):
+    """The RecordReader class streams the names and name ids of the
+    records of a CSV file, whose first row holds the field names, or of
+    a JSON Lines file, holding one object per line. Records are read
+    line by line and handed out in batches, so that at most one batch
+    of records is held in memory.
+
+    Records missing the name or the name id, holding an empty name id,
+    whose name id cannot be parsed or is not hashable, such as a JSON
+    array, or, for JSON Lines files, which are not valid JSON objects,
+    are skipped, as are the lines which cannot be decoded.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file.
+    name_field : str
+        The field holding the names.
+    id_field : str
+        The field holding the name ids.
+    record_format : Union[RecordFormat, str], optional
+        The format of the file, CSV or JSONL.
+    id_type : Callable, optional
+        Parses the name ids read from the file, int for instance. None
+        keeps them as they are read.
+    encoding : str, optional
+        The encoding of the file.
+
+    Raises
+    ------
+    ValueError
+        If the format is not implemented by the RecordFormat Enum class.
+    """
+    def __init__(self, path, name_field, id_field,
+                 record_format=RecordFormat.CSV, id_type=None,
+                 encoding='utf-8'):
+        if not isinstance(record_format, RecordFormat):
+            try:
+                record_format = RecordFormat.from_string(record_format)
+            except NotImplementedError:
+                raise ValueError('The format value you gave is invalid.')
+
+        self.path = path
+        self.name_field = name_field
+        self.id_field = id_field
+        self.record_format = record_format
+        self.id_type = id_type
+        self.encoding = encoding
+        self.stats = IngestStats()
+
+    def batches(self, batch_size):
+        """This method yields the names and name ids of the file's
+        records in batches, updating the reader's stats as it goes.
+        The rows of a batch are counted when it is yielded.
+
+        Parameters
+        ----------
+        batch_size : int
+            The maximum number of records of a batch.
+
+        Yields
+        ------
+        tuple of list of str, list of obj
+            A batch of names and their corresponding name ids.
+
+        Raises
+        ------
+        ValueError
+            If batch_size is lower than 1.
+        """
+        if batch_size < 1:
+            raise ValueError('The batch size must be at least 1.')
+
+        names, name_ids = [], []
+        with open(self.path, 'rb') as f:
+            for record in self._records(self._lines(f)):
+                name_and_id = self._parse(record)
+                if name_and_id is None:
+                    self.stats.rows_skipped += 1
+                    continue
+
+                names.append(name_and_id[0])
+                name_ids.append(name_and_id[1])
+                if len(names) == batch_size:
+                    self.stats.rows += len(names)
+                    yield names, name_ids
+
+                    names, name_ids = [], []
+
+        if names:
+            self.stats.rows += len(names)
+            yield names, name_ids
+
+        self.stats._finish()
+
+    def _lines(self, f):
+        """Yields the decoded lines of a binary file, counting the bytes
+        read. The lines which cannot be decoded are counted as skipped
+        rows."""
+        for line in f:
+            self.stats.bytes_read += len(line)
+            try:
+                yield line.decode(self.encoding)
+            except UnicodeDecodeError:
+                self.stats.rows_skipped += 1
+
+    def _records(self, lines):
+        """Yields the records of the file as dictionaries, or None for
+        lines which are not JSON objects."""
+        if self.record_format == RecordFormat.CSV:
+            yield from csv.DictReader(lines)
+            return
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            try:
+                record = loads(line)
+            except ValueError:
+                record = None
+
+            yield record if isinstance(record, dict) else None
+
+    def _parse(self, record):
+        """This method extracts the name and the name id of a record.
+
+        Parameters
+        ----------
+        record : dict
+            A record of the file.
+
+        Returns
+        -------
+        tuple of str, obj
+            Returns the name and the parsed name id of the record, or
+            None if the record must be skipped.
+        """
+        if record is None:
+            return None
+
+        name = record.get(self.name_field)
+        name_id = record.get(self.id_field)
+        if name is None or name_id is None or name_id == '':
+            return None
+
+        if self.id_type is not None:
+            try:
+                name_id = self.id_type(name_id)
+            except (TypeError, ValueError):
+                return None
+
+        try:
+            hash(name_id)
+        except TypeError:
+            return None
+
+        return name, name_id
+
+
+if __name__ == "__main__":
+    pass
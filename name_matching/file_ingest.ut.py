@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from file_ingest import RecordFormat, RecordReader
+
+
+class TestRecordFormat(unittest.TestCase):
+
+    def test_from_string_with_implemented_enum(self):
+        self.assertIs(RecordFormat.from_string('jsonl'), RecordFormat.JSONL)
+
+    def test_from_string_with_unimplemented_enum(self):
+        with self.assertRaises(NotImplementedError) as _:
+            RecordFormat.from_string('parquet')
+
+
+class TestRecordReader(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _write(self, content):
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+
+    def test_batches_with_csv_file(self):
+        self._write('id,name\r\n1,Jane Doe\r\n2,"Doe,\nJöhn"\r\n'
+                    ',No Id\r\n3\r\nx,Bad Id\r\n4,Janis\r\n')
+
+        reader = RecordReader(self.path, 'name', 'id', id_type=int)
+        output = list(reader.batches(2))
+
+        self.assertEqual(output, [(['Jane Doe', 'Doe,\nJöhn'], [1, 2]),
+                                  (['Janis'], [4])])
+        self.assertEqual((reader.stats.rows, reader.stats.rows_skipped),
+                         (3, 3))
+        self.assertEqual(reader.stats.bytes_read,
+                         os.path.getsize(self.path))
+
+    def test_batches_with_jsonl_file(self):
+        self._write('{"id": "a", "name": "Jane Doe"}\n\n[1, 2]\n'
+                    '{"id": "b", "name": "John\n{"id": "c"}\n'
+                    '{"id": "d", "name": "Janis"}\n')
+
+        reader = RecordReader(self.path, 'name', 'id', 'jsonl')
+        output = list(reader.batches(10))
+
+        self.assertEqual(output, [(['Jane Doe', 'Janis'], ['a', 'd'])])
+        self.assertEqual(reader.stats.rows_skipped, 3)
+        self.assertEqual(reader.stats.as_dict()['rows'], 2)
+
+    def test_batches_with_undecodable_lines(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'id,name\r\n1,Jane Doe\r\n2,J\xf6hn\r\n3,Janis\r\n')
+
+        reader = RecordReader(self.path, 'name', 'id', id_type=int)
+        output = list(reader.batches(10))
+
+        self.assertEqual(output, [(['Jane Doe', 'Janis'], [1, 3])])
+        self.assertEqual(reader.stats.rows_skipped, 1)
+
+    def test_batches_with_unhashable_ids(self):
+        self._write('{"id": [1], "name": "Jane Doe"}\n'
+                    '{"id": {"a": 1}, "name": "John"}\n'
+                    '{"id": 2, "name": "Janis"}\n')
+
+        reader = RecordReader(self.path, 'name', 'id', 'jsonl')
+        output = list(reader.batches(10))
+
+        self.assertEqual(output, [(['Janis'], [2])])
+        self.assertEqual(reader.stats.rows_skipped, 2)
+
+    def test_batches_with_invalid_batch_size(self):
+        reader = RecordReader(self.path, 'name', 'id')
+
+        with self.assertRaises(ValueError) as _:
+            list(reader.batches(0))
+
+    def test_init_with_invalid_format(self):
+        with self.assertRaises(ValueError) as _:
+            RecordReader(self.path, 'name', 'id', 'xml')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,686 @@
+from array import array
+from collections.abc import Mapping
+from io import BytesIO
+from itertools import chain
+from json import dumps, loads
+import mmap
+import shutil
+import struct
+import tempfile
+import zlib
+
+
+class FrozenPostings(Mapping):
+    """The FrozenPostings class is a read-only mapping of metaphones
+    to the name ids posted under them, laid out as a sorted metaphone
+    key table, an offset array and a flat id array inside of a buffer.
+    Probing a metaphone is a binary search over the key table and the
+    postings of integer name ids are returned as zero-copy views of
+    the buffer.
+
+    Parameters
+    ----------
+    buffer : Union[bytes, mmap.mmap]
+        The buffer containing the postings.
+    key_count : int
+        The number of metaphones.
+    key_offsets : memoryview
+        The offsets of the metaphones inside of the key blob.
+    key_blob_start : int
+        The position of the key blob inside of the buffer.
+    posting_offsets : memoryview
+        The offsets of the postings inside of the id array.
+    ids : memoryview
+        The flat id array.
+    id_table : list of obj, optional
+        The name ids indexed by the values of the id array. None when
+        the id array holds the name ids themselves.
+    """
+    def __init__(self, buffer, key_count, key_offsets, key_blob_start,
+                 posting_offsets, ids, id_table=None):
+        self._buffer = buffer
+        self._key_count = key_count
+        self._key_offsets = key_offsets
+        self._key_blob_start = key_blob_start
+        self._posting_offsets = posting_offsets
+        self._ids = ids
+        self._id_table = id_table
+
+    def __getitem__(self, metaphone):
+        i = self._find(metaphone)
+        if i < 0:
+            raise KeyError(metaphone)
+
+        return self._posting(i)
+
+    def __iter__(self):
+        for i in range(self._key_count):
+            yield self._key(i).decode('ascii')
+
+    def __len__(self):
+        return self._key_count
+
+    def items(self):
+        """Yields the metaphones and their postings in key order."""
+        for i in range(self._key_count):
+            yield self._key(i).decode('ascii'), self._posting(i)
+
+    def _key(self, i):
+        """Returns the i-th metaphone of the key table as bytes."""
+        start = self._key_blob_start + self._key_offsets[i]
+        end = self._key_blob_start + self._key_offsets[i + 1]
+
+        return self._buffer[start:end]
+
+    def _posting(self, i):
+        """Returns the name ids posted under the i-th metaphone."""
+        posting = self._ids[
+            self._posting_offsets[i]:self._posting_offsets[i + 1]
+        ]
+        if self._id_table is None:
+            return posting
+
+        return tuple(self._id_table[ordinal] for ordinal in posting)
+
+    def _find(self, metaphone):
+        """This method binary searches the key table for a metaphone.
+
+        Parameters
+        ----------
+        metaphone : str
+            The metaphone to search for.
+
+        Returns
+        -------
+        int
+            Returns the position of the metaphone in the key table,
+            or -1 if the metaphone is not present.
+        """
+        if not isinstance(metaphone, str) or not metaphone.isascii():
+            return -1
+
+        key = metaphone.encode('ascii')
+        low, high = 0, self._key_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+
+        if low < self._key_count and self._key(low) == key:
+            return low
+
+        return -1
+
+
+class FrozenIndex(object):
+    """The FrozenIndex class holds the strong and weak matches of a
+    NameLookupDirectory in a compact, read-only binary layout that can
+    be written to a file and memory-mapped back, so that processes
+    loading the same file share a single copy of it in the page cache.
+
+    The layout is a 16 bytes header, holding a magic number, a format
+    version, flags and a CRC32 checksum of the payload, followed by the
+    payload:
+        - the id table as JSON, empty when every name id is an integer
+        - the skipped combinations as JSON
+        - the strong matches then the weak matches, each made of their
+          key and id counts, key offset array, posting offset array,
+          flat id array and key blob
+    Every section starts on an 8 bytes boundary.
+
+    Parameters
+    ----------
+    buffer : Union[bytes, mmap.mmap]
+        The buffer holding the index in its binary layout.
+    verify : bool, optional
+        Whether the checksum of the payload is verified.
+
+    Raises
+    ------
+    ValueError
+        If the buffer does not hold an index, if its format version is
+        not supported or if its checksum does not match its payload.
+    """
+    MAGIC = b'NLDX'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHII')
+    COUNTS = struct.Struct('<QQ')
+    LENGTH = struct.Struct('<Q')
+    FLAG_INTEGER_IDS = 1
+    INT64_BOUNDS = (-2 ** 63, 2 ** 63 - 1)
+
+    def __init__(self, buffer, verify=True):
+        self._buffer = buffer
+
+        if len(buffer) < FrozenIndex.HEADER.size:
+            raise ValueError('The buffer does not hold a name index.')
+
+        magic, version, flags, checksum, _ = \
+            FrozenIndex.HEADER.unpack_from(buffer, 0)
+        if magic != FrozenIndex.MAGIC:
+            raise ValueError('The buffer does not hold a name index.')
+        if version != FrozenIndex.VERSION:
+            raise ValueError(
+                'The name index format version {} is not supported.'.format(
+                    version
+                )
+            )
+
+        view = memoryview(buffer)
+        if verify and zlib.crc32(view[FrozenIndex.HEADER.size:]) != checksum:
+            raise ValueError('The name index checksum does not match.')
+
+        offset = FrozenIndex.HEADER.size
+        id_table, offset = FrozenIndex._read_json(view, offset)
+        if flags & FrozenIndex.FLAG_INTEGER_IDS:
+            id_table = None
+        self._id_table = id_table
+        skipped, offset = FrozenIndex._read_json(view, offset)
+
+        self.skipped_combinations = {
+            id_table[ordinal] if id_table is not None else ordinal: count
+            for ordinal, count in skipped
+        }
+
+        postings = []
+        for _ in range(2):
+            sub_directory, offset = self._read_postings(view, offset,
+                                                        id_table)
+            postings.append(sub_directory)
+        self.lookup_dict = tuple(postings)
+
+    @staticmethod
+    def build(lookup_dict, skipped_combinations):
+        """This method lays out the strong and weak matches of a
+        directory in the binary layout of the index.
+
+        Parameters
+        ----------
+        lookup_dict : tuple of Mapping, Mapping
+            The strong and weak matches of a directory, where name ids
+            are mapped to metaphones.
+        skipped_combinations : dict {obj: int}
+            The skipped combinations of the directory.
+
+        Returns
+        -------
+        FrozenIndex
+            Returns the index laid out in memory.
+
+        Raises
+        ------
+        ValueError
+            If a name id is neither an integer, a float nor a string.
+        """
+        id_ordinals = {}
+        integer_ids = True
+        for sub_directory in lookup_dict:
+            for name_ids in sub_directory.values():
+                for name_id in name_ids:
+                    if name_id not in id_ordinals:
+                        id_ordinals[name_id] = len(id_ordinals)
+                        integer_ids = integer_ids and \
+                            FrozenIndex._is_int64(name_id)
+        for name_id in skipped_combinations:
+            if name_id not in id_ordinals:
+                id_ordinals[name_id] = len(id_ordinals)
+                integer_ids = integer_ids and FrozenIndex._is_int64(name_id)
+
+        FrozenIndex._check_ids(id_ordinals)
+
+        if integer_ids:
+            def encode(name_id):
+                return name_id
+        else:
+            encode = id_ordinals.__getitem__
+
+        payload = bytearray()
+        FrozenIndex._write_json(
+            payload, [] if integer_ids else list(id_ordinals)
+        )
+        FrozenIndex._write_json(payload, [
+            [encode(name_id), count]
+            for name_id, count in skipped_combinations.items()
+        ])
+        for sub_directory in lookup_dict:
+            FrozenIndex._write_postings(payload, sub_directory, encode)
+
+        buffer = bytearray(FrozenIndex.HEADER.pack(
+            FrozenIndex.MAGIC, FrozenIndex.VERSION,
+            FrozenIndex.FLAG_INTEGER_IDS if integer_ids else 0,
+            zlib.crc32(payload), 0
+        ))
+        buffer.extend(payload)
+
+        return FrozenIndex(bytes(buffer), verify=False)
+
+    @staticmethod
+    def merge(base, lookup_dict, skipped_combinations, removed, path=None):
+        """This method merges the strong and weak matches of a small
+        directory into an index, without the name ids removed from the
+        index, and lays the result out as a new index.
+
+        The key tables of the index being sorted, each sub name
+        directory is streamed key by key along with the sorted
+        metaphones of the directory, so that the index is never turned
+        into dictionaries. The postings of the index are copied as they
+        are unless they hold a removed name id, and the id array is
+        written to a temporary file rather than held in memory. The
+        postings of a metaphone are those of the index followed by the
+        name ids of the directory which they do not hold yet.
+
+        The name ids of an index holding only integer name ids are
+        stored as they are. Otherwise, the removed name ids which the
+        directory does not post again are dropped from its id table.
+        An index of integer name ids merged with a directory holding
+        other name ids has its distinct name ids gathered to build the
+        id table.
+
+        Parameters
+        ----------
+        base : FrozenIndex
+            The index to merge the directory into.
+        lookup_dict : tuple of Mapping, Mapping
+            The strong and weak matches of the directory, where name
+            ids are mapped to metaphones.
+        skipped_combinations : dict {obj: int}
+            The skipped combinations of the directory, replacing those
+            of the index for the same name ids.
+        removed : set of obj
+            The name ids whose postings and skipped combinations are
+            removed from the index.
+        path : str, optional
+            The path of the file the new index is written to and then
+            memory-mapped from. None lays it out in memory.
+
+        Returns
+        -------
+        FrozenIndex
+            Returns the merged index.
+
+        Raises
+        ------
+        ValueError
+            If a name id is neither an integer, a float nor a string.
+        """
+        delta_ids = {}
+        for sub_directory in lookup_dict:
+            for name_ids in sub_directory.values():
+                delta_ids.update(dict.fromkeys(name_ids))
+        delta_ids.update(dict.fromkeys(skipped_combinations))
+        FrozenIndex._check_ids(delta_ids)
+
+        skipped = {
+            name_id: count
+            for name_id, count in base.skipped_combinations.items()
+            if name_id not in removed
+        }
+        skipped.update(skipped_combinations)
+
+        integer_ids = base._id_table is None and \
+            all(FrozenIndex._is_int64(name_id) for name_id in delta_ids)
+        if integer_ids:
+            id_table = []
+            hidden = {name_id for name_id in removed
+                      if FrozenIndex._is_int64(name_id)}
+            remap = None
+
+            def encode(name_id):
+                return name_id
+        else:
+            id_table, hidden, remap, ordinals = FrozenIndex._merge_id_table(
+                base, delta_ids, skipped, removed
+            )
+            encode = ordinals.__getitem__
+
+        with (open(path, 'w+b') if path is not None else BytesIO()) as f:
+            f.write(bytes(FrozenIndex.HEADER.size))
+            payload = _PayloadWriter(f)
+            FrozenIndex._write_json(payload, id_table)
+            FrozenIndex._write_json(payload, [
+                [encode(name_id), count]
+                for name_id, count in skipped.items()
+            ])
+            for base_postings, sub_directory in zip(base.lookup_dict,
+                                                    lookup_dict):
+                FrozenIndex._merge_postings(payload, base_postings,
+                                            sub_directory, hidden, remap,
+                                            encode)
+
+            f.seek(0)
+            f.write(FrozenIndex.HEADER.pack(
+                FrozenIndex.MAGIC, FrozenIndex.VERSION,
+                FrozenIndex.FLAG_INTEGER_IDS if integer_ids else 0,
+                payload.checksum, 0
+            ))
+            if path is None:
+                return FrozenIndex(f.getvalue(), verify=False)
+
+        return FrozenIndex.load(path, verify=False)
+
+    @staticmethod
+    def load(path, use_mmap=True, verify=True):
+        """This method loads an index from a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        use_mmap : bool, optional
+            Whether the file is memory-mapped rather than read into
+            memory.
+        verify : bool, optional
+            Whether the checksum of the payload is verified.
+
+        Returns
+        -------
+        FrozenIndex
+            Returns the loaded index.
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold an index, if its format version is
+            not supported or if its checksum does not match its payload.
+        """
+        with open(path, 'rb') as f:
+            if use_mmap:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+
+        return FrozenIndex(buffer, verify)
+
+    def save(self, path):
+        """Writes the index to a file."""
+        with open(path, 'wb') as f:
+            f.write(self._buffer)
+
+    @staticmethod
+    def _check_ids(name_ids):
+        """Raises a ValueError if a name id cannot be saved."""
+        for name_id in name_ids:
+            if isinstance(name_id, bool) or \
+                    not isinstance(name_id, (int, float, str)):
+                raise ValueError(
+                    'Only integer, float and string name ids can be saved.'
+                )
+
+    @staticmethod
+    def _merge_id_table(base, delta_ids, skipped_combinations, removed):
+        """This method builds the id table of an index merged with a
+        directory, see the merge method.
+
+        Parameters
+        ----------
+        base : FrozenIndex
+            The index the directory is merged into.
+        delta_ids : dict {obj: None}
+            The name ids of the directory, in the order they were met.
+        skipped_combinations : dict {obj: int}
+            The skipped combinations of the merged index.
+        removed : set of obj
+            The name ids removed from the index.
+
+        Returns
+        -------
+        tuple of list, set, Union[array, dict], dict
+            Returns the id table of the merged index, the values of the
+            index's id arrays standing for removed name ids, the mapping
+            of those values to the merged index's ordinals, or None if
+            they are unchanged, and the ordinals of the name ids of the
+            directory and of the skipped combinations.
+        """
+        if base._id_table is not None:
+            source = base._id_table
+            remap = array('q')
+        else:
+            source = list(dict.fromkeys(chain(
+                chain.from_iterable(postings._ids
+                                    for postings in base.lookup_dict),
+                base.skipped_combinations
+            )))
+            remap = {}
+
+        wanted = set(delta_ids).union(skipped_combinations)
+        id_table = []
+        hidden = set()
+        ordinals = {}
+        dropped = False
+        for value, name_id in enumerate(source):
+            if base._id_table is None:
+                value = name_id
+            if name_id in removed:
+                hidden.add(value)
+                if name_id not in delta_ids:
+                    dropped = True
+                    if base._id_table is not None:
+                        remap.append(-1)
+                    continue
+
+            ordinal = len(id_table)
+            id_table.append(name_id)
+            if base._id_table is not None:
+                remap.append(ordinal)
+            else:
+                remap[name_id] = ordinal
+            if name_id in wanted:
+                ordinals[name_id] = ordinal
+
+        for name_id in delta_ids:
+            if name_id not in ordinals:
+                ordinals[name_id] = len(id_table)
+                id_table.append(name_id)
+
+        if base._id_table is not None and not dropped:
+            remap = None
+
+        return id_table, hidden, remap, ordinals
+
+    @staticmethod
+    def _is_int64(name_id):
+        """Returns whether a name id can be stored in the id array."""
+        return isinstance(name_id, int) and not isinstance(name_id, bool) \
+            and FrozenIndex.INT64_BOUNDS[0] <= name_id \
+            <= FrozenIndex.INT64_BOUNDS[1]
+
+    @staticmethod
+    def _pad(payload):
+        """Pads the payload so that the next section is aligned."""
+        payload.extend(bytes(-(FrozenIndex.HEADER.size + len(payload)) % 8))
+
+    @staticmethod
+    def _write_json(payload, obj):
+        """Appends a JSON section to the payload."""
+        data = dumps(obj, separators=(',', ':')).encode('utf-8')
+        payload.extend(FrozenIndex.LENGTH.pack(len(data)))
+        payload.extend(data)
+        FrozenIndex._pad(payload)
+
+    @staticmethod
+    def _read_json(view, offset):
+        """Reads a JSON section and returns it with the next offset."""
+        length, = FrozenIndex.LENGTH.unpack_from(view, offset)
+        start = offset + FrozenIndex.LENGTH.size
+        obj = loads(bytes(view[start:start + length]).decode('utf-8'))
+
+        return obj, FrozenIndex._align(start + length)
+
+    @staticmethod
+    def _align(offset):
+        """Returns the next 8 bytes boundary from an offset."""
+        return offset + (-offset % 8)
+
+    @staticmethod
+    def _write_postings(payload, sub_directory, encode):
+        """This method appends a sub name directory to the payload with
+        its metaphones sorted.
+
+        Parameters
+        ----------
+        payload : bytearray
+            The payload of the index.
+        sub_directory : Mapping
+            A mapping of metaphones to the name ids posted under them.
+        encode : Callable
+            Returns the value stored in the id array for a name id.
+        """
+        keys = sorted(sub_directory)
+        key_offsets = array('Q', [0])
+        posting_offsets = array('Q', [0])
+        ids = array('q')
+        key_blob = bytearray()
+        for metaphone in keys:
+            key_blob.extend(metaphone.encode('ascii'))
+            key_offsets.append(len(key_blob))
+            ids.extend(encode(name_id) for name_id in sub_directory[metaphone])
+            posting_offsets.append(len(ids))
+
+        payload.extend(FrozenIndex.COUNTS.pack(len(keys), len(ids)))
+        payload.extend(key_offsets.tobytes())
+        payload.extend(posting_offsets.tobytes())
+        payload.extend(ids.tobytes())
+        payload.extend(key_blob)
+        FrozenIndex._pad(payload)
+
+    @staticmethod
+    def _merge_postings(payload, base_postings, sub_directory, hidden,
+                        remap, encode):
+        """This method appends a sub name directory of an index merged
+        with a sub name directory of a small directory to the payload,
+        see the merge method.
+
+        Parameters
+        ----------
+        payload : _PayloadWriter
+            The payload of the merged index.
+        base_postings : FrozenPostings
+            The sub name directory of the index.
+        sub_directory : Mapping
+            The sub name directory of the directory.
+        hidden : set of int
+            The values of the index's id array to skip.
+        remap : Union[array, dict]
+            Maps the values of the index's id array to those of the
+            merged index. None keeps them as they are.
+        encode : Callable
+            Returns the value stored in the id array for a name id of
+            the directory.
+        """
+        delta_keys = sorted(metaphone.encode('ascii')
+                            for metaphone in sub_directory)
+        key_count = base_postings._key_count
+        base_ids = base_postings._ids
+        base_offsets = base_postings._posting_offsets
+        key_offsets = array('Q', [0])
+        posting_offsets = array('Q', [0])
+        key_blob = bytearray()
+        id_count = 0
+
+        with tempfile.TemporaryFile() as ids:
+            i = j = 0
+            while i < key_count or j < len(delta_keys):
+                base_key = base_postings._key(i) if i < key_count else None
+                delta_key = delta_keys[j] if j < len(delta_keys) else None
+
+                posting = ()
+                if delta_key is None or \
+                        (base_key is not None and base_key <= delta_key):
+                    key = base_key
+                    posting = base_ids[base_offsets[i]:base_offsets[i + 1]]
+                    i += 1
+                    if hidden and not hidden.isdisjoint(posting):
+                        posting = array('q', [value for value in posting
+                                              if value not in hidden])
+                    if remap is not None:
+                        posting = array('q', map(remap.__getitem__, posting))
+                else:
+                    key = delta_key
+
+                delta_posting = ()
+                if key == delta_key:
+                    j += 1
+                    delta_posting = [
+                        encode(name_id)
+                        for name_id in sub_directory[key.decode('ascii')]
+                    ]
+                    if posting:
+                        held = set(posting)
+                        delta_posting = [value for value in delta_posting
+                                         if value not in held]
+
+                if not posting and not delta_posting:
+                    continue
+
+                if posting:
+                    ids.write(posting)
+                if delta_posting:
+                    ids.write(array('q', delta_posting))
+                id_count += len(posting) + len(delta_posting)
+                key_blob.extend(key)
+                key_offsets.append(len(key_blob))
+                posting_offsets.append(id_count)
+
+            payload.extend(FrozenIndex.COUNTS.pack(len(key_offsets) - 1,
+                                                   id_count))
+            payload.extend(key_offsets.tobytes())
+            payload.extend(posting_offsets.tobytes())
+            ids.seek(0)
+            shutil.copyfileobj(ids, payload)
+            payload.extend(key_blob)
+            FrozenIndex._pad(payload)
+
+    def _read_postings(self, view, offset, id_table):
+        """Reads a sub name directory and returns it with the next
+        offset."""
+        key_count, id_count = FrozenIndex.COUNTS.unpack_from(view, offset)
+        offset += FrozenIndex.COUNTS.size
+
+        offsets_size = (key_count + 1) * 8
+        key_offsets = view[offset:offset + offsets_size].cast('Q')
+        offset += offsets_size
+        posting_offsets = view[offset:offset + offsets_size].cast('Q')
+        offset += offsets_size
+        ids = view[offset:offset + id_count * 8].cast('q')
+        offset += id_count * 8
+
+        postings = FrozenPostings(self._buffer, key_count, key_offsets,
+                                  offset, posting_offsets, ids, id_table)
+
+        return postings, FrozenIndex._align(offset + key_offsets[-1])
+
+
+class _PayloadWriter(object):
+    """The _PayloadWriter class writes the payload of an index to a
+    file, keeping its length and its checksum, in place of the
+    bytearray the build method lays the payload out in.
+
+    Parameters
+    ----------
+    f : file object
+        The binary file the payload is written to.
+    """
+    def __init__(self, f):
+        self._file = f
+        self._length = 0
+        self.checksum = 0
+
+    def __len__(self):
+        return self._length
+
+    def extend(self, data):
+        """Appends bytes to the payload."""
+        self._file.write(data)
+        self._length += memoryview(data).nbytes
+        self.checksum = zlib.crc32(data, self.checksum)
+
+    def write(self, data):
+        """Appends bytes to the payload, so that it can be copied to
+        like a file."""
+        self.extend(data)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,134 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from frozen_index import FrozenIndex
+
+
+class TestFrozenIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.lookup_dict = ({'TJN': {1: None, 2: None}, 'T': {1: None},
+                             'JN': {2: None, 1: None}},
+                            {'THN': {2: None, 1: None}, '': {1: None}})
+        self.skipped_combinations = {2: 3}
+
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_build_with_integer_ids(self):
+        index = FrozenIndex.build(self.lookup_dict, self.skipped_combinations)
+        strong_matches, weak_matches = index.lookup_dict
+
+        self.assertEqual(list(strong_matches), ['JN', 'T', 'TJN'])
+        self.assertEqual(list(strong_matches['JN']), [2, 1])
+        self.assertEqual(list(weak_matches['']), [1])
+        self.assertEqual(index.skipped_combinations, {2: 3})
+
+    def test_build_with_string_ids(self):
+        lookup_dict = ({'TJN': {'a': None, 'b': None}}, {'THN': {'b': None}})
+
+        index = FrozenIndex.build(lookup_dict, {'b': 1})
+
+        self.assertEqual(list(index.lookup_dict[0]['TJN']), ['a', 'b'])
+        self.assertEqual(index.skipped_combinations, {'b': 1})
+
+    def test_build_with_unsupported_ids(self):
+        lookup_dict = ({'TJN': {('a', 1): None}}, {})
+
+        with self.assertRaises(ValueError) as _:
+            FrozenIndex.build(lookup_dict, {})
+
+    def test_merge_with_integer_ids(self):
+        base = FrozenIndex.build(self.lookup_dict, self.skipped_combinations)
+        lookup_dict = ({'JN': {3: None, 1: None}, 'A': {3: None}},
+                       {'THN': {3: None}})
+
+        index = FrozenIndex.merge(base, lookup_dict, {3: 1}, {2})
+        strong_matches, weak_matches = index.lookup_dict
+
+        self.assertEqual(list(strong_matches), ['A', 'JN', 'T', 'TJN'])
+        self.assertEqual(list(strong_matches['JN']), [1, 3])
+        self.assertEqual(list(strong_matches['TJN']), [1])
+        self.assertEqual(list(weak_matches['THN']), [1, 3])
+        self.assertEqual(index.skipped_combinations, {3: 1})
+
+    def test_merge_with_string_ids(self):
+        base = FrozenIndex.build(
+            ({'TJN': {'a': None, 'b': None}, 'XMT': {'c': None}},
+             {'THN': {'b': None}}),
+            {'b': 1}
+        )
+        lookup_dict = ({'TJN': {'b': None}, 'SM0': {1: None}}, {})
+
+        index = FrozenIndex.merge(base, lookup_dict, {}, {'b', 'c'},
+                                  self.path)
+        strong_matches, weak_matches = index.lookup_dict
+
+        self.assertEqual(list(strong_matches), ['SM0', 'TJN'])
+        self.assertEqual(list(strong_matches['TJN']), ['a', 'b'])
+        self.assertEqual(list(strong_matches['SM0']), [1])
+        self.assertEqual(list(weak_matches), [])
+        self.assertEqual(index.skipped_combinations, {})
+        self.assertEqual(
+            FrozenIndex.load(self.path).lookup_dict[0]['TJN'], ('a', 'b')
+        )
+        del index
+
+    def test_merge_with_unsupported_ids(self):
+        base = FrozenIndex.build(self.lookup_dict, self.skipped_combinations)
+
+        with self.assertRaises(ValueError) as _:
+            FrozenIndex.merge(base, ({'TJN': {('a', 1): None}}, {}), {},
+                              set())
+
+    def test_get_with_missing_metaphone(self):
+        index = FrozenIndex.build(self.lookup_dict, self.skipped_combinations)
+
+        self.assertIsNone(index.lookup_dict[0].get('XYZ'))
+        self.assertNotIn('TJ', index.lookup_dict[0])
+
+    def test_load_with_memory_mapped_file(self):
+        FrozenIndex.build(self.lookup_dict,
+                          self.skipped_combinations).save(self.path)
+
+        index = FrozenIndex.load(self.path, use_mmap=True)
+
+        self.assertEqual(list(index.lookup_dict[1]['THN']), [2, 1])
+
+    def test_load_with_corrupted_file(self):
+        FrozenIndex.build(self.lookup_dict,
+                          self.skipped_combinations).save(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last_byte = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last_byte[0] ^ 0xFF]))
+
+        with self.assertRaises(ValueError) as _:
+            FrozenIndex.load(self.path)
+
+    def test_load_with_unsupported_version(self):
+        FrozenIndex.build(self.lookup_dict,
+                          self.skipped_combinations).save(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(4)
+            f.write(struct.pack('<H', FrozenIndex.VERSION + 1))
+
+        with self.assertRaises(ValueError) as _:
+            FrozenIndex.load(self.path, use_mmap=False)
+
+    def test_load_with_non_index_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'name,id\n')
+
+        with self.assertRaises(ValueError) as _:
+            FrozenIndex.load(self.path, use_mmap=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+from heapq import nlargest
+from threading import Lock
+
+
+POSTING_LENGTH_BUCKETS = (1, 2, 5, 10, 100, 1000, 10000, 100000)
+LARGEST_POSTINGS = 10
+
+
+class Metrics(object):
+    """The Metrics class records the time spent in each stage of the
+    matching pipeline and counts the events happening in it. A Metrics
+    instance is only fed when given to a NameLookupDirectory, so that
+    directories without one pay a single None check per operation.
+    The same instance may be shared by several directories.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._stages = {}
+        self._counters = {}
+
+    def record(self, stage, seconds):
+        """This method records the time spent in a stage once.
+
+        Parameters
+        ----------
+        stage : str
+            The name of the stage.
+        seconds : float
+            The time spent in the stage.
+        """
+        with self._lock:
+            timing = self._stages.get(stage)
+            if timing is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                if seconds > timing[2]:
+                    timing[2] = seconds
+
+    def increment(self, counter, amount=1):
+        """This method increments a counter.
+
+        Parameters
+        ----------
+        counter : str
+            The name of the counter.
+        amount : int, optional
+            The amount to increment the counter by.
+        """
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def reset(self):
+        """Resets every stage timing and counter."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """This method returns a copy of the recorded timings and
+        counters.
+
+        Returns
+        -------
+        dict
+            Returns the number of calls, total and maximum seconds of
+            each stage under 'stages', and the counters under
+            'counters'.
+        """
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {'calls': calls, 'seconds': seconds,
+                            'max_seconds': max_seconds}
+                    for stage, (calls, seconds, max_seconds)
+                    in self._stages.items()
+                },
+                'counters': dict(self._counters),
+            }
+
+
+def posting_statistics(sub_directory, buckets=POSTING_LENGTH_BUCKETS,
+                       largest=LARGEST_POSTINGS):
+    """This function describes the lengths of the postings of a sub
+    name directory.
+
+    Parameters
+    ----------
+    sub_directory : Mapping
+        A mapping of metaphones to the name ids posted under them.
+    buckets : tuple of int, optional
+        The upper bounds of the histogram's buckets.
+    largest : int, optional
+        The number of largest postings to report.
+
+    Returns
+    -------
+    dict
+        Returns the cumulative histogram of the posting lengths, as
+        (upper bound, count) pairs ending with an infinite bound, the
+        sum and count of the lengths, and the largest postings as
+        (metaphone, length) pairs.
+    """
+    lengths = [(metaphone, len(name_ids))
+               for metaphone, name_ids in list(sub_directory.items())]
+
+    counts = [0] * (len(buckets) + 1)
+    for _, length in lengths:
+        for i, bound in enumerate(buckets):
+            if length <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+
+    histogram = []
+    cumulative = 0
+    for bound, count in zip(buckets + (float('inf'),), counts):
+        cumulative += count
+        histogram.append((bound, cumulative))
+
+    return {
+        'histogram': histogram,
+        'sum': sum(length for _, length in lengths),
+        'count': len(lengths),
+        'largest': nlargest(largest, lengths, key=lambda item: item[1]),
+    }
+
+
+def to_prometheus(snapshot, prefix='name_matching'):
+    """This function formats a directory's metrics snapshot in the
+    Prometheus text exposition format.
+
+    Parameters
+    ----------
+    snapshot : dict
+        A snapshot returned by NameLookupDirectory.metrics_snapshot.
+    prefix : str, optional
+        The prefix of the metric names.
+
+    Returns
+    -------
+    str
+        Returns the metrics in the Prometheus text format.
+    """
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+        lines.append('# TYPE {}_{} {}'.format(prefix, name, metric_type))
+        for suffix, labels, value in samples:
+            label_text = ','.join(
+                '{}="{}"'.format(key, _escape(label_value))
+                for key, label_value in labels
+            )
+            lines.append('{}_{}{}{} {}'.format(
+                prefix, name, suffix,
+                '{' + label_text + '}' if label_text else '',
+                _format_value(value)
+            ))
+
+    stages = snapshot.get('stages', {})
+    metric('stage_seconds_total', 'counter',
+           'Time spent in each pipeline stage.',
+           [('', [('stage', stage)], timing['seconds'])
+            for stage, timing in sorted(stages.items())])
+    metric('stage_calls_total', 'counter',
+           'Number of times each pipeline stage ran.',
+           [('', [('stage', stage)], timing['calls'])
+            for stage, timing in sorted(stages.items())])
+
+    for counter, value in sorted(snapshot.get('counters', {}).items()):
+        metric(counter + '_total', 'counter', 'Number of ' +
+               counter.replace('_', ' ') + '.', [('', [], value)])
+
+    for name in ('metaphone_cache', 'normalizer_cache', 'key_cache'):
+        cache = snapshot.get(name)
+        if cache is None:
+            continue
+
+        title = name.replace('_', ' ')
+        for counter in ('hits', 'misses', 'evictions'):
+            metric('{}_{}_total'.format(name, counter), 'counter',
+                   '{} {}.'.format(title.capitalize(), counter),
+                   [('', [], cache[counter])])
+        metric(name + '_entries', 'gauge',
+               'Entries held by the {}.'.format(title),
+               [('', [], cache['entries'])])
+        if 'bytes' in cache:
+            metric(name + '_bytes', 'gauge',
+                   'Bytes held by the entries of the {}.'.format(title),
+                   [('', [], cache['bytes'])])
+
+    postings = snapshot.get('postings', {})
+    samples = []
+    for index, statistics in sorted(postings.items()):
+        for bound, count in statistics['histogram']:
+            samples.append(('_bucket', [('index', index), ('le', bound)],
+                            count))
+        samples.append(('_sum', [('index', index)], statistics['sum']))
+        samples.append(('_count', [('index', index)], statistics['count']))
+    if samples:
+        metric('posting_length', 'histogram',
+               'Number of name ids posted under each metaphone.', samples)
+        metric('largest_posting_length', 'gauge',
+               'Length of the largest posting.',
+               [('', [('index', index)],
+                 statistics['largest'][0][1] if statistics['largest'] else 0)
+                for index, statistics in sorted(postings.items())])
+
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    """Escapes a Prometheus label value."""
+    if isinstance(value, float):
+        return _format_value(value)
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _format_value(value):
+    """Formats a Prometheus sample value."""
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+if __name__ == "__main__":
+    pass
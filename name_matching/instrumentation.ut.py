@@ -0,0 +1,83 @@
+import unittest
+
+from instrumentation import Metrics, posting_statistics, to_prometheus
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_record_with_repeated_stage(self):
+        metrics = Metrics()
+
+        metrics.record('normalize', 0.5)
+        metrics.record('normalize', 1.5)
+
+        self.assertEqual(metrics.snapshot()['stages'], {
+            'normalize': {'calls': 2, 'seconds': 2.0, 'max_seconds': 1.5}
+        })
+
+    def test_increment_with_amount(self):
+        metrics = Metrics()
+
+        metrics.increment('names_added')
+        metrics.increment('names_added', 2)
+
+        self.assertEqual(metrics.snapshot()['counters'], {'names_added': 3})
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.record('normalize', 0.5)
+        metrics.increment('names_added')
+
+        metrics.reset()
+
+        self.assertEqual(metrics.snapshot(), {'stages': {}, 'counters': {}})
+
+
+class TestPostingStatistics(unittest.TestCase):
+
+    def test_posting_statistics(self):
+        sub_directory = {'TJN': {1: None, 2: None}, 'T': {1: None},
+                         'JN': dict.fromkeys(range(20))}
+
+        output = posting_statistics(sub_directory, buckets=(1, 2, 10),
+                                    largest=2)
+
+        self.assertEqual(output['histogram'], [
+            (1, 1), (2, 2), (10, 2), (float('inf'), 3)
+        ])
+        self.assertEqual(output['sum'], 23)
+        self.assertEqual(output['count'], 3)
+        self.assertEqual(output['largest'], [('JN', 20), ('TJN', 2)])
+
+
+class TestToPrometheus(unittest.TestCase):
+
+    def test_to_prometheus(self):
+        snapshot = {
+            'stages': {'normalize': {'calls': 2, 'seconds': 0.25,
+                                     'max_seconds': 0.125}},
+            'counters': {'names_added': 2},
+            'postings': {'strong': posting_statistics({'T': {1: None}},
+                                                      buckets=(1,))},
+        }
+
+        output = to_prometheus(snapshot).splitlines()
+
+        self.assertIn(
+            'name_matching_stage_seconds_total{stage="normalize"} 0.25',
+            output
+        )
+        self.assertIn('# TYPE name_matching_names_added_total counter',
+                      output)
+        self.assertIn('name_matching_names_added_total 2', output)
+        self.assertIn(
+            'name_matching_posting_length_bucket{index="strong",le="+Inf"} 1',
+            output
+        )
+        self.assertIn(
+            'name_matching_largest_posting_length{index="strong"} 1', output
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
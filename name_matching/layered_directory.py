@@ -0,0 +1,639 @@
+from itertools import count
+import os
+from threading import Lock, Thread
+
+from double_metaphone import DoubleMetaphoneMatcher, Threshold
+from frozen_index import FrozenIndex
+from name_lookup_directory import NameLookupDirectory
+from name_normalizer import NameNormalizer
+
+
+DEFAULT_MAX_DELTA_SIZE = 10000
+
+
+class LayeredNameLookupDirectory(object):
+    """The LayeredNameLookupDirectory class serves lookups from a
+    read-only snapshot of a NameLookupDirectory, see its snapshot
+    method, and from small mutable NameLookupDirectory deltas holding
+    the names added and removed since, in the manner of a log-structured
+    merge tree. Writes only ever touch the newest delta, so they are
+    visible to the next lookup without the snapshot being mutated.
+
+    Each layer, the snapshot followed by the deltas from the oldest to
+    the newest, comes with the tombstones of the name ids removed while
+    it was the newest one. A tombstone hides the name id in the older
+    layers, so that an updated name id only matches its new name.
+
+    Once max_delta_size writes were made to the newest delta, it is
+    frozen, a new delta takes the writes, and the snapshot and the
+    frozen deltas are merged into a new snapshot, by a background
+    thread unless disabled. The frozen deltas, which are small, are
+    first combined into dictionaries. The sorted key tables of the
+    snapshot are then streamed along with the combined metaphones into
+    the new snapshot, see FrozenIndex.merge, so that the snapshot is
+    copied array by array rather than turned into dictionaries. When a
+    path is given, each new snapshot is written to its own file and
+    memory-mapped, so that it does not add to the memory of the process.
+    The new snapshot is swapped in along with the deltas written to
+    since, in a single assignment, so that every lookup sees either the
+    layers before or after the merge. A merge still reads the whole
+    snapshot, so max_delta_size trades the frequency of the merges for
+    the number of layers probed by lookups.
+
+    Lookups take no lock and may run from any number of threads. Writes
+    are serialized by a per-instance lock. Name ids must be integers,
+    floats or strings so that they can be laid out in a snapshot, and
+    are checked when they are written. A failed merge leaves the layers
+    as they were, and the error of a background merge is raised by the
+    next write, by wait_for_merge or by close.
+
+    Parameters
+    ----------
+    combination_policy : CombinationPolicy, optional
+        The policy bounding the name combinations added to the layers.
+        By default every combination is added.
+    metaphone_cache_size : int, optional
+        The maximum number of double metaphones memoized by the
+        lookups, and by the adds of each delta. None disables the
+        caches.
+    max_delta_size : int, optional
+        The number of writes to the newest delta which triggers a merge.
+    background : bool, optional
+        Whether merges run in a background thread rather than in the
+        write which triggers them.
+    path : str, optional
+        The path the files of the merged snapshots are written to,
+        followed by a dot and a sequence number. The file of a snapshot
+        is removed once another snapshot replaces it, the lookups still
+        probing it keeping it mapped. None lays the snapshots out in
+        memory.
+
+    Raises
+    ------
+    ValueError
+        If max_delta_size is lower than 1.
+    """
+    def __init__(self, combination_policy=None, metaphone_cache_size=None,
+                 max_delta_size=DEFAULT_MAX_DELTA_SIZE, background=True,
+                 path=None):
+        if max_delta_size < 1:
+            raise ValueError('The maximum delta size must be at least 1.')
+
+        self.combination_policy = combination_policy
+        self.metaphone_cache_size = metaphone_cache_size
+        self.max_delta_size = max_delta_size
+        self.background = background
+        self.path = path
+        self.generation = 0
+        self._file_numbers = count()
+        self._snapshot_file = None
+        self._normalizer = NameNormalizer()
+        self._matcher = DoubleMetaphoneMatcher(metaphone_cache_size)
+        self._write_lock = Lock()
+        self._merge_lock = Lock()
+        self._merge_thread = None
+        self._merge_error = None
+        self._delta_writes = 0
+        self._layers = (
+            (self._new_directory().snapshot(), frozenset()),
+            self._new_layer(),
+        )
+
+    @property
+    def snapshot(self):
+        """The read-only NameLookupDirectory holding the names merged
+        so far."""
+        return self._layers[0][0]
+
+    def add(self, name, name_id):
+        """This method adds a given name and its name id to the newest
+        delta.
+
+        Parameters
+        ----------
+        name : str
+            A given name.
+        name_id : obj
+            The identifier of the name.
+
+        Raises
+        ------
+        ValueError
+            If the name id is neither an integer, a float nor a string.
+        Exception
+            The error of the last background merge, if it failed, in
+            which case the name is not added.
+        """
+        self._raise_merge_error()
+        FrozenIndex._check_ids((name_id,))
+        with self._write_lock:
+            self._layers[-1][0].add(name, name_id)
+            merge = self._count_writes(1)
+
+        if merge:
+            self._schedule_merge()
+
+    def add_names(self, names, name_ids):
+        """This method adds each of the given names and their name ids
+        to the newest delta.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            An iterable of names.
+        name_ids : Iterable of obj
+            An iterable of the names' identifiers, in the same order.
+
+        Raises
+        ------
+        ValueError
+            If a name id is neither an integer, a float nor a string,
+            the names before it being added.
+        Exception
+            The error of the last background merge, if it failed.
+        """
+        for name, name_id in zip(names, name_ids):
+            self.add(name, name_id)
+
+    def remove(self, name_id):
+        """This method removes a name id from the newest delta and
+        records its tombstone, which hides it in the older layers.
+
+        Parameters
+        ----------
+        name_id : obj
+            The identifier of the name.
+
+        Raises
+        ------
+        Exception
+            The error of the last background merge, if it failed, in
+            which case the name id is not removed.
+        """
+        self._raise_merge_error()
+        with self._write_lock:
+            directory, tombstones = self._layers[-1]
+            directory.remove(name_id)
+            tombstones.add(name_id)
+            merge = self._count_writes(1)
+
+        if merge:
+            self._schedule_merge()
+
+    def update(self, name_id, name):
+        """This method replaces the names of a name id by a new name,
+        added to the newest delta. The name id is hidden in the older
+        layers.
+
+        Parameters
+        ----------
+        name_id : obj
+            The identifier of the name.
+        name : str
+            The new name.
+
+        Raises
+        ------
+        ValueError
+            If the name id is neither an integer, a float nor a string.
+        Exception
+            The error of the last background merge, if it failed, in
+            which case the name id is not updated.
+        """
+        self._raise_merge_error()
+        FrozenIndex._check_ids((name_id,))
+        with self._write_lock:
+            directory, tombstones = self._layers[-1]
+            directory.update(name_id, name)
+            tombstones.add(name_id)
+            merge = self._count_writes(1)
+
+        if merge:
+            self._schedule_merge()
+
+    def lookup(self, name, threshold=Threshold.STRONG):
+        """This method returns the identifiers of the names of every
+        layer matching a given name, see NameLookupDirectory.lookup.
+
+        Parameters
+        ----------
+        name : str
+            A name to find the matches of.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the name.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+        Returns
+        -------
+        list of obj
+            Returns the deduplicated identifiers of the matching names.
+            Identifiers found by more probes are ranked first; ties
+            are kept in the order they were added.
+
+        Raises
+        ------
+        ValueError
+            If the value contained by the threshold parameter is
+            not implemented by the Threshold Enum class.
+        """
+        thresh = self._matcher._ensure_threshold_is_enum(threshold)
+
+        return self._lookup_normalized_name(
+            self._layers, self._normalizer.normalize_name(name), thresh
+        )
+
+    def lookup_many(self, names, threshold=Threshold.STRONG):
+        """This method returns the identifiers of the names of every
+        layer matching each of the given names. All of the names are
+        looked up in the same layers.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            An iterable of names to find the matches of.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the names.
+
+        Returns
+        -------
+        list of list of obj
+            Returns, for each of the names and in the same order, the
+            ranked identifiers of the matching names.
+
+        Raises
+        ------
+        ValueError
+            If the value contained by the threshold parameter is
+            not implemented by the Threshold Enum class.
+        """
+        thresh = self._matcher._ensure_threshold_is_enum(threshold)
+        layers = self._layers
+
+        results = []
+        lookups = {}
+        for name in names:
+            norm_name = self._normalizer.normalize_name(name)
+            if norm_name not in lookups:
+                lookups[norm_name] = self._lookup_normalized_name(
+                    layers, norm_name, thresh
+                )
+            results.append(list(lookups[norm_name]))
+
+        return results
+
+    def merge(self):
+        """This method freezes the newest delta and merges the snapshot
+        and the frozen deltas into a new snapshot, waiting for a merge
+        already running to end first. The writes made during the merge
+        go to a new delta, kept on top of the new snapshot.
+
+        If the merge fails, the newest delta is thawed again, unless it
+        was written to during the merge, in which case the frozen deltas
+        are kept and their writes still count towards the next merge.
+
+        Returns
+        -------
+        bool
+            Returns whether a new snapshot was swapped in. A merge is
+            abandoned if a snapshot was published while it ran.
+        """
+        with self._merge_lock:
+            with self._write_lock:
+                if len(self._layers) == 2 and self._delta_writes == 0:
+                    return False
+
+                self._layers += (self._new_layer(),)
+                delta_writes = self._delta_writes
+                self._delta_writes = 0
+                merged = self._layers[:-1]
+
+            snapshot_file = None
+            if self.path is not None:
+                snapshot_file = '{}.{}'.format(self.path,
+                                               next(self._file_numbers))
+            try:
+                snapshot = self._merge_layers(merged, snapshot_file)
+            except BaseException:
+                _remove_file(snapshot_file)
+                with self._write_lock:
+                    self._restore_layers(merged, delta_writes)
+                raise
+
+            with self._write_lock:
+                layers = self._layers
+                if any(layer is not merged_layer for layer, merged_layer
+                       in zip(layers, merged)):
+                    _remove_file(snapshot_file)
+                    return False
+
+                self._layers = ((snapshot, frozenset()),) + \
+                    layers[len(merged):]
+                self.generation += 1
+                _remove_file(self._snapshot_file)
+                self._snapshot_file = snapshot_file
+
+            return True
+
+    def wait_for_merge(self):
+        """This method waits for the merge running in the background, if
+        any.
+
+        Raises
+        ------
+        Exception
+            The error of the last background merge, if it failed.
+        """
+        thread = self._merge_thread
+        if thread is not None:
+            thread.join()
+        self._raise_merge_error()
+
+    def close(self):
+        """This method waits for the merge running in the background, if
+        any, see the wait_for_merge method.
+
+        Raises
+        ------
+        Exception
+            The error of the last background merge, if it failed.
+        """
+        self.wait_for_merge()
+
+    def publish(self, directory, keep_delta=False):
+        """This method swaps in a snapshot of another directory, such as
+        a directory rebuilt from a fresh extract while the lookups were
+        served by the previous snapshot.
+
+        Parameters
+        ----------
+        directory : NameLookupDirectory
+            The directory to snapshot.
+        keep_delta : bool, optional
+            Whether the deltas written to since the previous snapshot,
+            and their tombstones, are kept on top of the new snapshot
+            rather than dropped.
+
+        Raises
+        ------
+        ValueError
+            If a name id is neither an integer, a float nor a string.
+        """
+        snapshot = directory.snapshot()
+
+        with self._write_lock:
+            if keep_delta:
+                self._layers = ((snapshot, frozenset()),) + self._layers[1:]
+            else:
+                self._layers = ((snapshot, frozenset()), self._new_layer())
+                self._delta_writes = 0
+            self.generation += 1
+            _remove_file(self._snapshot_file)
+            self._snapshot_file = None
+
+    def load(self, path, mmap=True, verify=True, keep_delta=False):
+        """This method publishes the directory saved to a file, see the
+        publish method and NameLookupDirectory.load.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        mmap : bool, optional
+            Whether the file is memory-mapped rather than read into
+            memory.
+        verify : bool, optional
+            Whether the checksum of the file is verified.
+        keep_delta : bool, optional
+            Whether the deltas are kept on top of the loaded snapshot.
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold a directory, if its format
+            version is not supported or if its checksum does not
+            match its content.
+        """
+        directory = self._new_directory()
+        directory.load(path, mmap, verify)
+        self.publish(directory, keep_delta)
+
+    def save(self, path):
+        """This method merges the deltas into the snapshot and writes
+        the snapshot to a file, see NameLookupDirectory.save. The writes
+        made while saving are not saved.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        """
+        self.merge()
+        self.snapshot.save(path)
+
+    def stats(self):
+        """This method returns the state of the layers.
+
+        Returns
+        -------
+        dict {str: int}
+            Returns the generation of the snapshot, the number of
+            layers, the number of writes to the newest delta and the
+            number of tombstones of all of the layers.
+        """
+        layers = self._layers
+
+        return {
+            'generation': self.generation,
+            'layers': len(layers),
+            'delta_writes': self._delta_writes,
+            'tombstones': sum(len(tombstones) for _, tombstones in layers),
+        }
+
+    def _new_directory(self):
+        """Creates an empty directory using the layers' settings."""
+        return NameLookupDirectory(self.combination_policy,
+                                   self.metaphone_cache_size)
+
+    def _new_layer(self):
+        """Creates an empty delta and its tombstones."""
+        return (self._new_directory(), set())
+
+    def _count_writes(self, count):
+        """Counts writes to the newest delta, returning whether a merge
+        is due."""
+        self._delta_writes += count
+
+        return self._delta_writes >= self.max_delta_size
+
+    def _schedule_merge(self):
+        """Runs a merge, in a background thread unless disabled and
+        unless one is already running."""
+        if not self.background:
+            self.merge()
+            return
+
+        with self._write_lock:
+            thread = self._merge_thread
+            if thread is not None and thread.is_alive():
+                return
+
+            self._merge_thread = Thread(target=self._merge_in_background,
+                                        daemon=True)
+            self._merge_thread.start()
+
+    def _merge_in_background(self):
+        """Runs a merge, keeping its error for the next write."""
+        try:
+            self.merge()
+        except Exception as e:
+            self._merge_error = e
+
+    def _raise_merge_error(self):
+        """Raises the error of the last background merge once, if it
+        failed."""
+        error = self._merge_error
+        if error is not None:
+            self._merge_error = None
+            raise error
+
+    def _restore_layers(self, merged, delta_writes):
+        """Thaws the newest of the layers of a failed merge, along with
+        the writes it counted, unless the delta added by the merge was
+        written to or the layers were published over."""
+        layers = self._layers
+        if len(layers) <= len(merged) or \
+                any(layer is not merged_layer for layer, merged_layer
+                    in zip(layers, merged)):
+            return
+
+        if len(layers) == len(merged) + 1 and self._delta_writes == 0:
+            self._layers = merged
+            self._delta_writes = delta_writes
+        else:
+            self._delta_writes += delta_writes
+
+    def _lookup_normalized_name(self, layers, norm_name, threshold):
+        """This method probes the layers for the identifiers of the
+        names matching an already normalized name. A name id is counted
+        once per probe whatever the number of layers it is found in,
+        and skipped in the layers older than one of its tombstones.
+
+        Parameters
+        ----------
+        layers : tuple of tuple of NameLookupDirectory, set
+            The layers to probe, from the oldest to the newest.
+        norm_name : str
+            A normalized name.
+        threshold : Threshold
+            The threshold value to use for probing the layers.
+
+        Returns
+        -------
+        list of obj
+            Returns the ranked identifiers of the matching names.
+        """
+        if not norm_name:
+            return []
+
+        metaphone_tuple = self._matcher.double_metaphone(
+            norm_name.replace(' ', '')
+        )
+        probes = layers[0][0]._directory._probe_keys(metaphone_tuple,
+                                                     threshold)
+        newer_tombstones = [
+            [tombstones for _, tombstones in layers[i + 1:] if tombstones]
+            for i in range(len(layers))
+        ]
+
+        hits = {}
+        for key, metaphone in probes:
+            found = set()
+            for (directory, _), tombstones in zip(layers, newer_tombstones):
+                directory = directory._directory
+                for name_id in directory._name_ids(
+                    directory._lookup_dict[key].get(metaphone, ())
+                ):
+                    if name_id in found or \
+                            any(name_id in t for t in tombstones):
+                        continue
+
+                    found.add(name_id)
+                    hits[name_id] = hits.get(name_id, 0) + 1
+
+        # sorted is stable, so ties keep their insertion order
+        return sorted(hits, key=lambda name_id: -hits[name_id])
+
+    def _merge_layers(self, layers, path=None):
+        """This method merges layers into a new snapshot, skipping the
+        name ids hidden by the tombstones of newer layers. The deltas
+        are combined into dictionaries which are then merged into the
+        snapshot's FrozenIndex, see FrozenIndex.merge.
+
+        Parameters
+        ----------
+        layers : tuple of tuple of NameLookupDirectory, set
+            The layers to merge, from the oldest to the newest. Their
+            tombstones are no longer written to.
+        path : str, optional
+            The path of the file the new snapshot is written to. None
+            lays it out in memory.
+
+        Returns
+        -------
+        NameLookupDirectory
+            Returns the read-only snapshot of the merged layers.
+        """
+        lookup_dict = ({}, {})
+        skipped_combinations = {}
+        removed = set()
+        for i, (directory, tombstones) in enumerate(layers[1:], 1):
+            directory = directory._directory
+            newer_tombstones = [t for _, t in layers[i + 1:] if t]
+            removed.update(tombstones)
+            for key in (0, 1):
+                sub_directory = lookup_dict[key]
+                for metaphone, postings in \
+                        directory._lookup_dict[key].items():
+                    name_ids = [name_id for name_id
+                                in directory._name_ids(postings)
+                                if not any(name_id in t
+                                           for t in newer_tombstones)]
+                    if not name_ids:
+                        continue
+
+                    existing_postings = sub_directory.get(metaphone)
+                    if existing_postings is None:
+                        sub_directory[metaphone] = dict.fromkeys(name_ids)
+                    else:
+                        existing_postings.update(dict.fromkeys(name_ids))
+
+            for name_id in list(skipped_combinations):
+                if name_id in tombstones:
+                    del skipped_combinations[name_id]
+            skipped_combinations.update(directory._skipped_combinations)
+
+        snapshot = self._new_directory()
+        snapshot._directory._load_frozen_index(FrozenIndex.merge(
+            layers[0][0]._directory._frozen_index, lookup_dict,
+            skipped_combinations, removed, path
+        ))
+
+        return snapshot
+
+
+def _remove_file(path):
+    """Removes the file of a replaced snapshot, if any. The lookups still
+    probing it keep it mapped on the systems allowing it, and it is left
+    in place on the others."""
+    if path is None:
+        return
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,222 @@
+import os
+import tempfile
+import unittest
+
+from layered_directory import LayeredNameLookupDirectory
+from name_lookup_directory import NameLookupDirectory
+
+
+class TestLayeredNameLookupDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.names = ['Led Zeppelin', 'John Doe', 'Jane Doe', 'Janis Doe',
+                      'Jon Doe', 'Smith', 'Schmidt']
+        self.name_ids = [0, 1, 2, 3, 4, 'a', 'b']
+
+    def test_init_with_invalid_max_delta_size(self):
+        with self.assertRaises(ValueError) as _:
+            LayeredNameLookupDirectory(max_delta_size=0)
+
+    def test_lookup_with_merged_layers(self):
+        layered = LayeredNameLookupDirectory(max_delta_size=3,
+                                             background=False)
+        directory = NameLookupDirectory()
+
+        layered.add_names(self.names, self.name_ids)
+        directory.add_names(self.names, self.name_ids)
+
+        self.assertEqual(layered.stats(), {
+            'generation': 2, 'layers': 2, 'delta_writes': 1, 'tombstones': 0
+        })
+        for name in self.names:
+            for threshold in (0, 1, 2):
+                self.assertEqual(layered.lookup(name, threshold),
+                                 directory.lookup(name, threshold))
+
+    def test_lookup_with_tombstones(self):
+        layered = LayeredNameLookupDirectory(background=False)
+        layered.add_names(self.names, self.name_ids)
+        layered.merge()
+
+        layered.remove(2)
+        layered.update(1, 'Led Zeppelin')
+
+        self.assertEqual(layered.lookup('Jane Doe'), [4])
+        self.assertEqual(layered.lookup('Led Zeppelin'), [0, 1])
+        self.assertEqual(layered.stats()['tombstones'], 2)
+
+        layered.merge()
+
+        self.assertEqual(layered.lookup('Jane Doe'), [4])
+        self.assertEqual(layered.lookup('Led Zeppelin'), [0, 1])
+        self.assertEqual(layered.stats()['tombstones'], 0)
+
+    def test_merge_with_snapshot_files(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'snapshot')
+        layered = LayeredNameLookupDirectory(max_delta_size=2,
+                                             background=False, path=path)
+        expected = NameLookupDirectory()
+
+        layered.add_names(self.names, self.name_ids)
+        layered.update(1, 'Smith')
+        layered.remove(3)
+        expected.add_names(self.names, self.name_ids)
+        expected.update(1, 'Smith')
+        expected.remove(3)
+        layered.merge()
+
+        try:
+            self.assertEqual(os.listdir(directory), ['snapshot.4'])
+            for name in self.names:
+                for threshold in (0, 1, 2):
+                    self.assertEqual(layered.lookup(name, threshold),
+                                     expected.lookup(name, threshold))
+
+            layered.publish(expected)
+
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            del layered
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    def test_add_with_unsupported_ids(self):
+        layered = LayeredNameLookupDirectory(max_delta_size=2,
+                                             background=False)
+        layered.add('John Doe', 1)
+
+        with self.assertRaises(ValueError) as _:
+            layered.add('Jane Doe', (1, 2))
+        with self.assertRaises(ValueError) as _:
+            layered.update([1], 'Jane Doe')
+
+        layered.add('Jane Doe', 2)
+
+        self.assertEqual(layered.stats(), {
+            'generation': 1, 'layers': 2, 'delta_writes': 0, 'tombstones': 0
+        })
+        self.assertEqual(layered.lookup('Jane Doe'), [1, 2])
+
+    def test_merge_with_failure(self):
+        layered = LayeredNameLookupDirectory(max_delta_size=2,
+                                             background=False)
+        layered.add('John Doe', 1)
+        stats = layered.stats()
+        merge_layers = layered._merge_layers
+        layered._merge_layers = FailingMerge(merge_layers, 2)
+
+        for _ in range(2):
+            with self.assertRaises(OSError) as _:
+                layered.merge()
+
+            self.assertEqual(layered.stats(), stats)
+
+        layered.add('Jane Doe', 2)
+
+        self.assertEqual(layered.stats(), {
+            'generation': 1, 'layers': 2, 'delta_writes': 0, 'tombstones': 0
+        })
+        self.assertEqual(layered.snapshot.lookup('Jane Doe'), [1, 2])
+
+    def test_merge_in_background_with_failure(self):
+        layered = LayeredNameLookupDirectory(max_delta_size=2)
+        layered._merge_layers = FailingMerge(layered._merge_layers, 1)
+        layered.add_names(self.names[:2], self.name_ids[:2])
+
+        with self.assertRaises(OSError) as _:
+            layered.close()
+
+        self.assertEqual(layered.stats()['layers'], 2)
+        self.assertEqual(layered.stats()['delta_writes'], 2)
+
+        layered.add('Jane Doe', 2)
+        layered.close()
+
+        self.assertEqual(layered.stats()['generation'], 1)
+        self.assertEqual(layered.snapshot.lookup('Jane Doe'), [1, 2])
+
+    def test_add_with_failed_background_merge(self):
+        layered = LayeredNameLookupDirectory(max_delta_size=2)
+        layered._merge_layers = FailingMerge(layered._merge_layers, 1)
+        layered.add_names(self.names[:2], self.name_ids[:2])
+        layered._merge_thread.join()
+
+        with self.assertRaises(OSError) as _:
+            layered.add('Jane Doe', 2)
+
+        layered.add('Jane Doe', 2)
+        layered.close()
+
+        self.assertEqual(layered.lookup('Jane Doe'), [1, 2])
+
+    def test_lookup_many_with_duplicate_names(self):
+        layered = LayeredNameLookupDirectory()
+        layered.add_names(self.names, self.name_ids)
+
+        output = layered.lookup_many(['Jane Doe', 'jane  doe', 'Nobody'])
+
+        self.assertEqual(output, [[1, 2, 4], [1, 2, 4], []])
+
+    def test_merge_in_background(self):
+        layered = LayeredNameLookupDirectory(max_delta_size=2)
+        layered.add_names(self.names, self.name_ids)
+        layered.wait_for_merge()
+        layered.merge()
+
+        self.assertEqual(layered.stats()['layers'], 2)
+        self.assertEqual(layered.snapshot.lookup('Jane Doe'), [1, 2, 4])
+        self.assertEqual(layered.lookup('Schmidt'), ['b'])
+
+    def test_publish_with_rebuilt_directory(self):
+        layered = LayeredNameLookupDirectory(background=False)
+        layered.add('Jon Doe', 4)
+        rebuilt = NameLookupDirectory()
+        rebuilt.add_names(self.names[:4], self.name_ids[:4])
+
+        layered.publish(rebuilt, keep_delta=True)
+
+        self.assertEqual(layered.lookup('Jane Doe'), [1, 2, 4])
+
+        layered.publish(rebuilt)
+
+        self.assertEqual(layered.lookup('Jane Doe'), [1, 2])
+
+    def test_save_and_load_with_deltas(self):
+        layered = LayeredNameLookupDirectory(background=False)
+        layered.add_names(self.names, self.name_ids)
+        layered.remove('a')
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            layered.save(path)
+            loaded = LayeredNameLookupDirectory()
+            loaded.load(path)
+            loaded.add('Smith', 'c')
+
+            self.assertEqual(loaded.lookup('Smith'), ['c'])
+            self.assertEqual(loaded.lookup('Schmidt'), ['b'])
+            del loaded
+        finally:
+            os.remove(path)
+
+
+class FailingMerge(object):
+    """Wraps the _merge_layers method of a layered directory, making its
+    first calls fail."""
+
+    def __init__(self, merge_layers, failures):
+        self.merge_layers = merge_layers
+        self.failures = failures
+
+    def __call__(self, layers, path=None):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('No space left on device')
+
+        return self.merge_layers(layers, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
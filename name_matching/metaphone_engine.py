@@ -0,0 +1,484 @@
+import unicodedata
+
+
+VOWELS = frozenset('AEIOUY')
+SILENT_STARTERS = frozenset(['GN', 'KN', 'PN', 'WR', 'PS'])
+GERMANIC_STARTS = frozenset(['VAN ', 'VON '])
+
+# Letters following a 'C', a 'G', an 'S' or a 'T' for which the rules
+# depend on more than the letter itself; after any other letter these
+# are coded 'K', 'K', 'S' and 'T' and move one letter forward, an 'S'
+# moving two letters forward when doubled
+C_CONTEXTS = frozenset('HAZICKGQEY ')
+G_CONTEXTS = frozenset('HNLYEIG')
+S_CONTEXTS = frozenset('HILZCMNW')
+T_CONTEXTS = frozenset('ICHTD')
+
+# Letters coded the same way in every context, with the letter whose
+# doubling makes them skip the next letter
+SIMPLE_LETTERS = {
+    'B': ('P', 'B'),
+    'F': ('F', 'F'),
+    'K': ('K', 'K'),
+    'N': ('N', 'N'),
+    'Q': ('K', 'Q'),
+    'V': ('F', 'V'),
+}
+
+
+def _context_free_rules():
+    """This function builds the table of the codes and moves of the
+    letters whose rules only depend on the letter following them, when
+    they are neither the first nor the last letter of the word.
+
+    Returns
+    -------
+    dict {str: tuple of str, str, int}
+        Returns the primary and alternate codes and the move of a letter
+        mapped to the letter and the letter following it.
+    """
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    rules = {}
+    for c in letters:
+        for n in letters:
+            rule = None
+            if c in VOWELS or (c == 'H' and n not in VOWELS):
+                rule = (None, None, 1)
+            elif c in SIMPLE_LETTERS:
+                code, double = SIMPLE_LETTERS[c]
+                rule = (code, code, 2 if n == double else 1)
+            elif c == 'R':
+                rule = ('R', 'R', 2 if n == 'R' else 1)
+            elif c == 'S' and n not in S_CONTEXTS:
+                rule = ('S', 'S', 2 if n == 'S' else 1)
+            elif c == 'T' and n not in T_CONTEXTS:
+                rule = ('T', 'T', 1)
+            elif c == 'L' and n != 'L':
+                rule = ('L', 'L', 1)
+            elif c == 'M' and n != 'U':
+                rule = ('M', 'M', 2 if n == 'M' else 1)
+            elif c == 'D' and n != 'G':
+                rule = ('T', 'T', 2 if n in 'TD' else 1)
+            elif c == 'C' and n not in C_CONTEXTS:
+                rule = ('K', 'K', 1)
+            elif c == 'G' and n not in G_CONTEXTS:
+                rule = ('K', 'K', 1)
+            elif c == 'P':
+                rule = ('F', 'F', 2) if n == 'H' \
+                    else ('P', 'P', 2 if n in 'PB' else 1)
+            elif c == 'W' and n == 'R':
+                rule = ('R', 'R', 2)
+            elif c == 'Z' and n == 'H':
+                rule = ('J', 'J', 2)
+            elif c == 'X':
+                rule = ('KS', 'KS', 2 if n in 'CX' else 1)
+
+            if rule is not None:
+                rules[c + n] = rule
+
+    return rules
+
+
+# The letters following the last one are padding, so that the pairs of
+# letters of this table are never met at the end of a word
+CONTEXT_FREE_RULES = _context_free_rules()
+
+C_GREEK_ENDINGS = frozenset(['ORCHES', 'ARCHIT', 'ORCHID'])
+C_KH_FOLLOWERS = frozenset('LRNMBHFVW')
+C_CHORUS_STARTS = frozenset(['HOR', 'HYM', 'HIA', 'HEM'])
+C_CHARAC_STARTS = frozenset(['HARAC', 'HARIS'])
+C_ITALIAN_ENDINGS = frozenset(['CIO', 'CIE', 'CIA'])
+G_SOFT_STARTS = frozenset(['ES', 'EP', 'EB', 'EL', 'EY', 'IB', 'IL', 'IN',
+                           'IE', 'EI', 'ER'])
+G_HARD_WORDS = frozenset(['DANGER', 'RANGER', 'MANGER'])
+J_HARD_FOLLOWERS = frozenset('LTKSNMBZ')
+L_SPANISH_ENDINGS = frozenset(['ILLO', 'ILLA', 'ALLE'])
+S_GERMANIC_ENDINGS = frozenset(['HEIM', 'HOEK', 'HOLM', 'HOLZ'])
+S_DUTCH_ENDINGS = frozenset(['OO', 'ER', 'EN', 'UY', 'ED', 'EM'])
+W_SLAVIC_ENDINGS = frozenset(['EWSKI', 'EWSKY', 'OWSKI', 'OWSKY'])
+
+
+def double_metaphone(word):
+    """This function returns the primary and alternate double metaphones
+    of a word, identical to those of the metaphone package's
+    doublemetaphone function. The package's rules are applied by a
+    single loop over a padded buffer of the word, with the context of
+    each letter read from precompiled character classes, and ASCII words
+    skip the Unicode decomposition the package applies to every word.
+
+    The package's quirks are kept: a character without any rule, like a
+    digit or a letter outside of the Latin alphabet, repeats the code
+    and the move of the previous character.
+
+    Parameters
+    ----------
+    word : Union[str, bytes]
+        A word, or a name. Bytes are decoded from UTF-8.
+
+    Returns
+    -------
+    tuple of str, str
+        Returns the primary and the alternate metaphones of the word,
+        the alternate metaphone being empty when it is identical to the
+        primary metaphone.
+    """
+    if isinstance(word, bytes):
+        word = word.decode('utf-8', 'ignore')
+
+    if word.isascii():
+        upper = word.upper()
+    else:
+        word = word.replace('\xc7', 's').replace('\xe7', 's')
+        upper = ''.join([
+            c for c in unicodedata.normalize('NFD', word)
+            if unicodedata.category(c) != 'Mn'
+        ]).upper()
+
+    b = '--' + upper + '------'
+    start = 2
+    end = start + len(upper) - 1
+    slavo_germanic = 'W' in upper or 'K' in upper or 'CZ' in upper
+
+    primary = []
+    secondary = []
+    pos = start
+    if b[2:4] in SILENT_STARTERS:
+        pos += 1
+    if b[2] == 'X':
+        primary.append('S')
+        secondary.append('S')
+        pos += 1
+
+    # The codes appended to the primary and alternate metaphones and the
+    # number of letters moved forward, kept from a letter to the next
+    p = s = None
+    step = 1
+    while pos <= end:
+        rule = CONTEXT_FREE_RULES.get(b[pos:pos + 2]) \
+            if pos != start else None
+        if rule is not None:
+            p, s, step = rule
+            if p:
+                primary.append(p)
+                secondary.append(s)
+            pos += step
+            continue
+
+        c = b[pos]
+        if c in VOWELS:
+            p = s = 'A' if pos == start else None
+            step = 1
+        elif c == ' ':
+            pos += 1
+            continue
+        elif c in SIMPLE_LETTERS:
+            p, double = SIMPLE_LETTERS[c]
+            s = p
+            step = 2 if b[pos + 1] == double else 1
+        elif c == 'R':
+            if pos == end and not slavo_germanic \
+                    and b[pos - 2:pos] == 'IE' \
+                    and b[pos - 4:pos - 2] not in ('ME', 'MA'):
+                p, s = '', 'R'
+            else:
+                p = s = 'R'
+            step = 2 if b[pos + 1] == 'R' else 1
+        elif c == 'S':
+            if b[pos + 1] in S_CONTEXTS or pos == start or pos == end:
+                p, s, step = _s(b, pos, start, end, slavo_germanic)
+            else:
+                p = s = 'S'
+                step = 2 if b[pos + 1] == 'S' else 1
+        elif c == 'T':
+            if b[pos + 1] not in T_CONTEXTS:
+                p = s = 'T'
+                step = 1
+            elif b[pos:pos + 4] == 'TION' \
+                    or b[pos:pos + 3] in ('TIA', 'TCH'):
+                p = s = 'X'
+                step = 3
+            elif b[pos:pos + 2] == 'TH' or b[pos:pos + 3] == 'TTH':
+                if b[pos + 2:pos + 4] in ('OM', 'AM') \
+                        or b[start:start + 4] in GERMANIC_STARTS \
+                        or b[start:start + 3] == 'SCH':
+                    p = s = 'T'
+                else:
+                    p, s = '0', 'T'
+                step = 2
+            else:
+                p = s = 'T'
+                step = 2 if b[pos + 1] in 'TD' else 1
+        elif c == 'L':
+            p = s = 'L'
+            if b[pos + 1] == 'L':
+                if (pos == end - 2
+                        and b[pos - 1:pos + 3] in L_SPANISH_ENDINGS) \
+                        or ((b[end - 1:end + 1] in ('AS', 'OS')
+                             or b[end] in 'AO')
+                            and b[pos - 1:pos + 3] == 'ALLE'):
+                    s = ''
+                step = 2
+            else:
+                step = 1
+        elif c == 'M':
+            p = s = 'M'
+            step = 2 if (b[pos + 1:pos + 4] == 'UMB'
+                         and (pos + 1 == end or b[pos + 2:pos + 4] == 'ER')) \
+                or b[pos + 1] == 'M' else 1
+        elif c == 'D':
+            if b[pos:pos + 2] == 'DG':
+                if b[pos + 2] in 'IEY':
+                    p = s = 'J'
+                    step = 3
+                else:
+                    p = s = 'TK'
+                    step = 2
+            else:
+                p = s = 'T'
+                step = 2 if b[pos + 1] in 'TD' else 1
+        elif c == 'C':
+            if b[pos + 1] in C_CONTEXTS:
+                p, s, step = _c(b, pos, start)
+            else:
+                p = s = 'K'
+                step = 1
+        elif c == 'H':
+            if (pos == start or b[pos - 1] in VOWELS) \
+                    and b[pos + 1] in VOWELS:
+                p = s = 'H'
+                step = 2
+            else:
+                p = s = None
+                step = 1
+        elif c == 'G':
+            if b[pos + 1] in G_CONTEXTS:
+                p, s, step = _g(b, pos, start, slavo_germanic, p, s, step)
+            else:
+                p = s = 'K'
+                step = 1
+        elif c == 'P':
+            if b[pos + 1] == 'H':
+                p = s = 'F'
+                step = 2
+            else:
+                p = s = 'P'
+                step = 2 if b[pos + 1] in 'PB' else 1
+        elif c == 'J':
+            p, s, step = _j(b, pos, start, end, slavo_germanic)
+        elif c == 'W':
+            p, s, step = _w(b, pos, start, end)
+        elif c == 'Z':
+            if b[pos + 1] == 'H':
+                p = s = 'J'
+            elif b[pos + 1:pos + 3] in ('ZO', 'ZI', 'ZA') \
+                    or (slavo_germanic and pos > start
+                        and b[pos - 1] != 'T'):
+                p, s = 'S', 'TS'
+            else:
+                p = s = 'S'
+            step = 2 if b[pos + 1] in 'ZH' else 1
+        elif c == 'X':
+            if pos == end and (b[pos - 3:pos] in ('IAU', 'EAU')
+                               or b[pos - 2:pos] in ('AU', 'OU')):
+                p = s = None
+            else:
+                p = s = 'KS'
+            step = 2 if b[pos + 1] in 'CX' else 1
+
+        if p:
+            primary.append(p)
+        if s:
+            secondary.append(s)
+        pos += step
+
+    primary = ''.join(primary)
+    secondary = ''.join(secondary)
+
+    return primary, secondary if secondary != primary else ''
+
+
+def _c(b, pos, start):
+    """Returns the codes and the move of a 'C'."""
+    if pos > start + 1 and b[pos - 2] not in VOWELS \
+            and b[pos - 1:pos + 2] == 'ACH' and b[pos + 2] != 'I' \
+            and (b[pos + 2] != 'E'
+                 or b[pos - 2:pos + 4] in ('BACHER', 'MACHER')):
+        return 'K', 'K', 2
+    elif pos == start and b[start:start + 6] == 'CAESAR':
+        return 'S', 'S', 2
+    elif b[pos:pos + 4] == 'CHIA':
+        return 'K', 'K', 2
+    elif b[pos:pos + 2] == 'CH':
+        if pos > start and b[pos:pos + 4] == 'CHAE':
+            return 'K', 'X', 2
+        elif pos == start and (b[pos + 1:pos + 6] in C_CHARAC_STARTS
+                               or b[pos + 1:pos + 4] in C_CHORUS_STARTS) \
+                and b[start:start + 5] != 'CHORE':
+            return 'K', 'K', 2
+        elif b[start:start + 4] in GERMANIC_STARTS \
+                or b[start:start + 3] == 'SCH' \
+                or b[pos - 2:pos + 4] in C_GREEK_ENDINGS \
+                or b[pos + 2] in 'TS' \
+                or ((b[pos - 1] in 'AOUE' or pos == start)
+                    and b[pos + 2] in C_KH_FOLLOWERS):
+            return 'K', 'K', 2
+        elif pos > start:
+            if b[start:start + 2] == 'MC':
+                return 'K', 'K', 2
+            return 'X', 'K', 2
+        return 'X', 'X', 2
+    elif b[pos:pos + 2] == 'CZ' and b[pos - 2:pos + 2] != 'WICZ':
+        return 'S', 'X', 2
+    elif b[pos + 1:pos + 4] == 'CIA':
+        return 'X', 'X', 3
+    elif b[pos:pos + 2] == 'CC' and not (pos == start + 1
+                                         and b[start] == 'M'):
+        if b[pos + 2] in 'IEH' and b[pos + 2:pos + 4] != 'HU':
+            if (pos == start + 1 and b[start] == 'A') \
+                    or b[pos - 1:pos + 4] in ('UCCEE', 'UCCES'):
+                return 'KS', 'KS', 3
+            return 'X', 'X', 3
+        return 'K', 'K', 2
+    elif b[pos:pos + 2] in ('CK', 'CG', 'CQ'):
+        return 'K', 'K', 2
+    elif b[pos:pos + 2] in ('CI', 'CE', 'CY'):
+        if b[pos:pos + 3] in C_ITALIAN_ENDINGS:
+            return 'S', 'X', 2
+        return 'S', 'S', 2
+    elif b[pos + 1:pos + 3] in (' C', ' Q', ' G'):
+        return 'K', 'K', 3
+    elif b[pos + 1] in 'CKQ' and b[pos + 1:pos + 3] not in ('CE', 'CI'):
+        return 'K', 'K', 2
+
+    return 'K', 'K', 1
+
+
+def _g(b, pos, start, slavo_germanic, p, s, step):
+    """Returns the codes and the move of a 'G', which are those of the
+    previous letter in a few contexts without any rule."""
+    following = b[pos + 1]
+    if following == 'H':
+        if pos > start and b[pos - 1] not in VOWELS:
+            return 'K', 'K', 2
+        elif pos < start + 3:
+            if pos == start:
+                if b[pos + 2] == 'I':
+                    return 'J', 'J', 2
+                return 'K', 'K', 2
+        elif (pos > start + 1 and b[pos - 2] in 'BHD') \
+                or (pos > start + 2 and b[pos - 3] in 'BHD') \
+                or (pos > start + 3 and b[pos - 4] in 'BH'):
+            return None, None, 2
+        elif pos > start + 2 and b[pos - 1] == 'U' \
+                and b[pos - 3] in 'CGLRT':
+            return 'F', 'F', 2
+        elif pos > start and b[pos - 1] != 'I':
+            return 'K', 'K', 2
+
+        return p, s, step
+    elif following == 'N':
+        if pos == start + 1 and b[start] in VOWELS and not slavo_germanic:
+            return 'KN', 'N', 2
+        elif b[pos + 2:pos + 4] != 'EY' and not slavo_germanic:
+            return 'N', 'KN', 2
+        return 'KN', 'KN', 2
+    elif b[pos + 1:pos + 3] == 'LI' and not slavo_germanic:
+        return 'KL', 'L', 2
+    elif pos == start and (following == 'Y'
+                           or b[pos + 1:pos + 3] in G_SOFT_STARTS):
+        return 'K', 'J', 2
+    elif (b[pos + 1:pos + 3] == 'ER' or following == 'Y') \
+            and b[start:start + 6] not in G_HARD_WORDS \
+            and b[pos - 1] not in 'EI' \
+            and b[pos - 1:pos + 2] not in ('RGY', 'OGY'):
+        return 'K', 'J', 2
+    elif following in 'EIY' or b[pos - 1:pos + 3] in ('AGGI', 'OGGI'):
+        if b[start:start + 4] in GERMANIC_STARTS \
+                or b[start:start + 3] == 'SCH' \
+                or b[pos + 1:pos + 3] == 'ET':
+            return 'K', 'K', 2
+        elif b[pos + 1:pos + 5] == 'IER ':
+            return 'J', 'J', 2
+        return 'J', 'K', 2
+    elif following == 'G':
+        return 'K', 'K', 2
+
+    return 'K', 'K', 1
+
+
+def _j(b, pos, start, end, slavo_germanic):
+    """Returns the codes and the move of a 'J'."""
+    step = 2 if b[pos + 1] == 'J' else 1
+    if b[pos:pos + 4] == 'JOSE' or b[start:start + 4] == 'SAN ':
+        if (pos == start and b[pos + 4] == ' ') \
+                or b[start:start + 4] == 'SAN ':
+            return 'H', 'H', step
+        return 'J', 'H', step
+    elif pos == start:
+        return 'J', 'A', step
+    elif b[pos - 1] in VOWELS and not slavo_germanic \
+            and b[pos + 1] in 'AO':
+        return 'J', 'H', step
+    elif pos == end:
+        return 'J', ' ', step
+    elif b[pos + 1] not in J_HARD_FOLLOWERS and b[pos - 1] not in 'SKL':
+        return 'J', 'J', step
+
+    return None, None, step
+
+
+def _s(b, pos, start, end, slavo_germanic):
+    """Returns the codes and the move of an 'S'."""
+    if b[pos - 1:pos + 2] in ('ISL', 'YSL'):
+        return None, None, 1
+    elif pos == start and b[start:start + 5] == 'SUGAR':
+        return 'X', 'S', 1
+    elif b[pos:pos + 2] == 'SH':
+        if b[pos + 1:pos + 5] in S_GERMANIC_ENDINGS:
+            return 'S', 'S', 2
+        return 'X', 'X', 2
+    elif b[pos:pos + 3] in ('SIO', 'SIA') or b[pos:pos + 4] == 'SIAN':
+        if not slavo_germanic:
+            return 'S', 'X', 3
+        return 'S', 'S', 3
+    elif (pos == start and b[pos + 1] in 'MNLW') or b[pos + 1] == 'Z':
+        return 'S', 'X', 2 if b[pos + 1] == 'Z' else 1
+    elif b[pos:pos + 2] == 'SC':
+        if b[pos + 2] == 'H':
+            if b[pos + 3:pos + 5] in S_DUTCH_ENDINGS:
+                if b[pos + 3:pos + 5] in ('ER', 'EN'):
+                    return 'X', 'SK', 3
+                return 'SK', 'SK', 3
+            elif pos == start and b[start + 3] not in VOWELS \
+                    and b[start + 3] != 'W':
+                return 'X', 'S', 3
+            return 'X', 'X', 3
+        elif b[pos + 2] in 'IEY':
+            return 'S', 'S', 3
+        return 'SK', 'SK', 3
+    elif pos == end and b[pos - 2:pos] in ('AI', 'OI'):
+        return '', 'S', 1
+
+    return 'S', 'S', 2 if b[pos + 1] in 'SZ' else 1
+
+
+def _w(b, pos, start, end):
+    """Returns the codes and the move of a 'W'."""
+    if b[pos:pos + 2] == 'WR':
+        return 'R', 'R', 2
+    elif pos == start and (b[pos + 1] in VOWELS or b[pos:pos + 2] == 'WH'):
+        if b[pos + 1] in VOWELS:
+            return 'A', 'F', 1
+        return 'A', 'A', 1
+    elif (pos == end and b[pos - 1] in VOWELS) \
+            or b[pos - 1:pos + 4] in W_SLAVIC_ENDINGS \
+            or b[start:start + 3] == 'SCH':
+        return '', 'F', 1
+    elif b[pos:pos + 4] in ('WICZ', 'WITZ'):
+        return 'TS', 'FX', 4
+
+    return None, None, 1
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,61 @@
+import random
+import unittest
+
+from metaphone import doublemetaphone
+
+from benchmark import SyntheticNameGenerator
+from metaphone_engine import double_metaphone
+
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' * 3 + 'AEIOUY' * 4 + \
+    "  -'1ÇçéÑßØæ" + 'abcxyz'
+CONTEXTS = [
+    'SCH', 'CH', 'GH', 'GN', 'TH', 'WICZ', 'WITZ', 'JOSE', 'SAN ', 'VAN ',
+    'VON ', 'CAESAR', 'CHIA', 'CHAE', 'ACH', 'BACHER', 'ILLO', 'ALLE',
+    'IER ', 'AGGI', 'DANGER', 'SUGAR', 'ISL', 'SIAN', 'TION', 'TCH',
+    'EWSKI', 'EAU', 'UMB', 'MC', 'CC', 'CIA', 'ZH', 'ZO', 'DG', 'HEIM',
+    'KN', 'WR', 'PS', 'UCCES', 'HARAC', 'HOR', 'ORCHES', 'ER', 'IE', 'X',
+]
+
+
+class TestDoubleMetaphone(unittest.TestCase):
+
+    def test_double_metaphone_with_known_names(self):
+        self.assertEqual(double_metaphone('Schmidt'), ('XMT', 'SMT'))
+        self.assertEqual(double_metaphone('Xavier'), ('SF', 'SFR'))
+        self.assertEqual(double_metaphone('Gonzalez'), ('KNSLS', ''))
+
+    def test_double_metaphone_with_accents(self):
+        self.assertEqual(double_metaphone('François'),
+                         doublemetaphone('François'))
+        self.assertEqual(double_metaphone('Zoë'), doublemetaphone('Zoë'))
+
+    def test_double_metaphone_with_bytes(self):
+        self.assertEqual(double_metaphone(b'John'), ('JN', 'AN'))
+
+    def test_double_metaphone_with_empty_name(self):
+        self.assertEqual(double_metaphone(''), ('', ''))
+
+    def test_double_metaphone_with_unknown_characters(self):
+        for name in ['J1hn', "O'Brien", 'Jean-Luc', 'ß', '1']:
+            self.assertEqual(double_metaphone(name), doublemetaphone(name))
+
+    def test_double_metaphone_against_library(self):
+        rand = random.Random(0)
+        names = SyntheticNameGenerator(1, accent_density=0.2).names(2000)
+        for _ in range(5000):
+            name = ''.join(
+                rand.choice(CONTEXTS) if rand.random() < 0.5
+                else rand.choice(ALPHABET)
+                for _ in range(rand.randint(0, 6))
+            )
+            names.append(name.lower() if rand.random() < 0.5 else name)
+
+        mismatches = [name for name in names
+                      if double_metaphone(name) != doublemetaphone(name)]
+
+        self.assertEqual(mismatches, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
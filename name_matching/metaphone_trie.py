@@ -0,0 +1,180 @@
+class MetaphoneTrie(object):
+    """The MetaphoneTrie class holds a set of metaphones in a trie so
+    that the metaphones within a given edit distance of another one can
+    be found without comparing it with each of them.
+
+    A search walks the trie depth first while computing one row of the
+    Levenshtein distance matrix per node, from its parent's row. The
+    row of a node holds the distances between its prefix and each
+    prefix of the searched metaphone, so that the subtrie under a node
+    whose row is all above the maximum distance is skipped. The nodes
+    visited are thus bounded by the prefixes within the maximum
+    distance of the searched metaphone's prefixes, which depends on the
+    metaphone alphabet and the maximum distance rather than on the
+    number of metaphones held.
+
+    Nodes are dictionaries mapping characters to their child nodes. A
+    node ending a metaphone also maps the empty string to it, so that
+    the metaphone is shared with the directory rather than copied. A
+    node ending a metaphone without any child is the metaphone itself
+    rather than a dictionary, most metaphones ending in such a leaf.
+    """
+    _END = ''
+
+    def __init__(self, metaphones=()):
+        self._root = {}
+        self._size = 0
+        for metaphone in metaphones:
+            self.add(metaphone)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, metaphone):
+        node = self._root
+        for char in metaphone:
+            if not isinstance(node, dict):
+                return False
+            node = node.get(char)
+            if node is None:
+                return False
+
+        return isinstance(node, str) or MetaphoneTrie._END in node
+
+    def add(self, metaphone):
+        """This method adds a metaphone to the trie. Empty metaphones
+        are not added.
+
+        Parameters
+        ----------
+        metaphone : str
+            The metaphone to add.
+        """
+        if not metaphone:
+            return
+
+        node = self._root
+        for char in metaphone[:-1]:
+            child = node.get(char)
+            if child is None:
+                child = node[char] = {}
+            elif isinstance(child, str):
+                child = node[char] = {MetaphoneTrie._END: child}
+            node = child
+
+        child = node.get(metaphone[-1])
+        if child is None:
+            node[metaphone[-1]] = metaphone
+        elif isinstance(child, str) or MetaphoneTrie._END in child:
+            return
+        else:
+            child[MetaphoneTrie._END] = metaphone
+        self._size += 1
+
+    def remove(self, metaphone):
+        """This method removes a metaphone from the trie, along with the
+        nodes left without any metaphone.
+
+        Parameters
+        ----------
+        metaphone : str
+            The metaphone to remove.
+
+        Returns
+        -------
+        bool
+            Returns whether the metaphone was in the trie.
+        """
+        if not metaphone:
+            return False
+
+        path = []
+        node = self._root
+        for char in metaphone:
+            if not isinstance(node, dict):
+                return False
+            child = node.get(char)
+            if child is None:
+                return False
+            path.append((node, char))
+            node = child
+
+        if isinstance(node, str):
+            node = {}
+        elif node.pop(MetaphoneTrie._END, None) is None:
+            return False
+        self._size -= 1
+
+        # Empty nodes are removed and nodes only ending a metaphone
+        # become leaves again
+        while path:
+            parent, char = path.pop()
+            if not node:
+                del parent[char]
+            elif len(node) == 1 and MetaphoneTrie._END in node:
+                parent[char] = node[MetaphoneTrie._END]
+            else:
+                break
+            node = parent
+
+        return True
+
+    def search(self, metaphone, max_distance):
+        """This method returns the metaphones of the trie within a
+        given Levenshtein distance of a metaphone.
+
+        Parameters
+        ----------
+        metaphone : str
+            The metaphone to search for.
+        max_distance : int
+            The maximum number of character insertions, deletions and
+            substitutions.
+
+        Returns
+        -------
+        list of tuple of str, int
+            Returns the metaphones found and their distances, closest
+            first and then in alphabetical order.
+
+        Raises
+        ------
+        ValueError
+            If max_distance is negative.
+        """
+        if max_distance < 0:
+            raise ValueError('The maximum distance cannot be negative.')
+
+        end = MetaphoneTrie._END
+        columns = range(1, len(metaphone) + 1)
+        matches = []
+        stack = [(self._root, list(range(len(metaphone) + 1)))]
+        while stack:
+            node, previous_row = stack.pop()
+            for char, child in node.items():
+                if char == end:
+                    continue
+
+                row = [previous_row[0] + 1]
+                for i in columns:
+                    row.append(min(row[i - 1] + 1, previous_row[i] + 1,
+                                   previous_row[i - 1]
+                                   + (metaphone[i - 1] != char)))
+
+                if isinstance(child, str):
+                    if row[-1] <= max_distance:
+                        matches.append((child, row[-1]))
+                    continue
+
+                if row[-1] <= max_distance and end in child:
+                    matches.append((child[end], row[-1]))
+                if min(row) <= max_distance:
+                    stack.append((child, row))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+
+        return matches
+
+
+if __name__ == "__main__":
+    pass
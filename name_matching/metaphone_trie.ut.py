@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from metaphone_trie import MetaphoneTrie
+
+
+def levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        previous_row, row = row, [i]
+        for j in range(1, len(b) + 1):
+            row.append(min(row[j - 1] + 1, previous_row[j] + 1,
+                           previous_row[j - 1] + (char != b[j - 1])))
+
+    return row[-1]
+
+
+class TestMetaphoneTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = MetaphoneTrie(['JN', 'JNS', 'TJN', 'LTSPLN', 'J', ''])
+
+    def test_init_with_empty_metaphone(self):
+        self.assertEqual(len(self.trie), 5)
+        self.assertNotIn('', self.trie)
+        self.assertIn('JNS', self.trie)
+        self.assertNotIn('JNST', self.trie)
+
+    def test_search_with_max_distance(self):
+        output = self.trie.search('JN', 1)
+
+        self.assertEqual(output, [('JN', 0), ('J', 1), ('JNS', 1),
+                                  ('TJN', 1)])
+        self.assertEqual(self.trie.search('LTSPN', 0), [])
+
+    def test_search_with_negative_max_distance(self):
+        with self.assertRaises(ValueError) as _:
+            self.trie.search('JN', -1)
+
+    def test_remove_with_shared_prefix(self):
+        removed = self.trie.remove('JN')
+
+        self.assertTrue(removed)
+        self.assertFalse(self.trie.remove('JN'))
+        self.assertFalse(self.trie.remove('JNST'))
+        self.assertEqual(self.trie.search('JN', 1),
+                         [('J', 1), ('JNS', 1), ('TJN', 1)])
+
+        self.trie.remove('JNS')
+        self.trie.remove('J')
+
+        self.assertEqual(sorted(self.trie._root), ['L', 'T'])
+
+    def test_search_against_levenshtein(self):
+        rand = random.Random(0)
+        metaphones = {
+            ''.join(rand.choice('AFJKLMNPRSTX0')
+                    for _ in range(rand.randint(1, 7)))
+            for _ in range(2000)
+        }
+        trie = MetaphoneTrie(metaphones)
+
+        for metaphone in rand.sample(sorted(metaphones), 20) + ['KSTN']:
+            for max_distance in (0, 1, 2):
+                expected = sorted(
+                    (other, levenshtein(metaphone, other))
+                    for other in metaphones
+                    if levenshtein(metaphone, other) <= max_distance
+                )
+
+                output = trie.search(metaphone, max_distance)
+
+                self.assertEqual(sorted(output), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,24 +1,178 @@
-from itertools import combinations
+from array import array
+from collections import deque
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from heapq import nlargest
+from itertools import chain, islice
+import sys
+from threading import Lock
+from time import perf_counter
 
+from bounded_cache import BoundedCache
+from combination_policy import CombinationPolicy
+from component_index import MIN_FREE_ORDINALS, ComponentIndex
+from file_ingest import RecordFormat, RecordReader
+from frozen_index import FrozenIndex
+from instrumentation import posting_statistics, to_prometheus
+from metaphone_trie import MetaphoneTrie
 from name_normalizer import NameNormalizer
-from double_metaphone import DoubleMetaphoneMatcher
+from double_metaphone import (DoubleMetaphoneMatcher, MetaphoneBackend,
+                              PAIR_SCORES, Threshold)
+
+
+DEFAULT_CHUNKSIZE = 1000
+DEFAULT_BATCH_SIZE = 10000
+# Weights of the metaphone pair score, of the fraction of shared
+# combination keys and of the fraction of covered components
+SCORE_WEIGHTS = (0.5, 0.25, 0.25)
 
 
 class NameLookupDirectory(object):
     """The NameLookupDirectory class allows users to
     store add names in the goal of matching. Internally,
     the class uses the DoubleMetaphoneMatcher class to
-    produce name matches. Users can retrieve matched names
-    based on strong matches and weak matches by calling the
-    instance's strong_matches or weak_matches methods.
+    produce name matches. Users can query the directory for the
+    identifiers of names matching a given name by calling the
+    instance's lookup or lookup_many methods, or retrieve the whole
+    strong and weak match directories by calling the instance's
+    strong_matches or weak_matches methods.
+
+    Each instance holds its own directory. The directory shared by
+    every part of a process, which all instances used to share, is
+    returned by the default method.
+
+    Concurrency model: reads (lookup, lookup_many, strong_matches,
+    weak_matches and skipped_combinations) take no lock and may run
+    from any number of threads. Writes (add, add_names, remove, update,
+    load and swap) and save are serialized by a per-instance lock. A
+    read running while a name is being added or removed may see part
+    of that name's combinations. To publish many names at once, build
+    a new instance and swap it in: every read then sees either the
+    whole old or the whole new directory.
+
+    Parameters
+    ----------
+    combination_policy : CombinationPolicy, optional
+        The policy bounding the name combinations added to the
+        directory. By default every combination is added.
+    metaphone_cache_size : int, optional
+        The maximum number of double metaphones memoized by the
+        directory's DoubleMetaphoneMatcher, shared by adds and
+        lookups. None disables the cache.
+    metrics : Metrics, optional
+        Records the time spent normalizing names, generating their
+        combinations, producing their metaphones and inserting their
+        postings, along with the number of names added, combinations
+        generated and lookups made. None, the default, records nothing
+        and keeps the add and lookup paths free of any timing.
+    compact : bool, optional
+        Whether the directory is stored compactly: metaphones are
+        interned so that the strong and weak matches share them, name
+        ids are mapped to dense integers, postings are arrays of those
+        integers and empty alternate metaphones, which every name
+        without an alternate pronunciation shares, are not posted in
+        the weak matches. Lookups with the WEAK threshold of a name
+        without an alternate metaphone then return no identifiers.
+        Removing a name id costs a scan of its postings rather than
+        constant time per posting.
+    metaphone_backend : Union[MetaphoneBackend, str, Callable], optional
+        The implementation producing the double metaphones of the
+        directory's DoubleMetaphoneMatcher. See the
+        DoubleMetaphoneMatcher class for the available backends.
+    index_components : bool, optional
+        Whether each component of the added names is also posted in a
+        ComponentIndex under its primary metaphone, along with its
+        position, so that lookup_components can find the names sharing
+        some of a name's components. Paired with a combination policy
+        bounding the combinations to the complete name, it indexes long
+        names in linear rather than exponential space. The component
+        index is not saved to files.
+    approximate : bool, optional
+        Whether the distinct metaphones of the strong and weak matches
+        are also held in a MetaphoneTrie each, kept up to date as names
+        are added and removed and built again when a file is loaded,
+        so that lookup_approximate can find the names whose metaphones
+        are a few edits away from a name's.
+    normalizer_cache_size : int, optional
+        The maximum number of normalized names memoized by the
+        directory's NameNormalizer, keyed by the raw names, see the
+        NameNormalizer class. None, along with normalizer_cache_bytes,
+        disables the cache.
+    key_cache_size : int, optional
+        The maximum number of normalized names whose combinations and
+        their double metaphones are memoized, shared by adds, removals
+        and scored lookups. Along with the normalizer and metaphone
+        caches, a name added or looked up again then skips the whole
+        normalization and metaphone pipeline. None, along with
+        key_cache_bytes, disables the cache.
+    normalizer_cache_bytes : int, optional
+        The maximum number of bytes held by the normalized names
+        memoized by the directory's NameNormalizer. None means no
+        limit.
+    key_cache_bytes : int, optional
+        The maximum number of bytes held by the memoized combinations
+        and double metaphones. None means no limit. The caches bounded
+        in bytes report the bytes they hold in metrics_snapshot.
     """
 
     class _NameLookupDirectory(object):
 
-        def __init__(self):
-            self.normalizer = NameNormalizer()
-            self.metaphone_matcher = DoubleMetaphoneMatcher()
+        def __init__(self, combination_policy=None,
+                     metaphone_cache_size=None, metrics=None,
+                     compact=False, metaphone_backend=MetaphoneBackend.NATIVE,
+                     index_components=False, approximate=False,
+                     normalizer_cache_size=None, key_cache_size=None,
+                     normalizer_cache_bytes=None, key_cache_bytes=None):
+            self.normalizer = NameNormalizer(
+                cache_size=normalizer_cache_size,
+                cache_bytes=normalizer_cache_bytes
+            )
+            self.metaphone_matcher = DoubleMetaphoneMatcher(
+                metaphone_cache_size, backend=metaphone_backend
+            )
+            self.combination_policy = combination_policy \
+                if combination_policy is not None else CombinationPolicy()
+            self.compact = compact
+            self.index_components = index_components
+            self.approximate = approximate
+            self._key_cache = None
+            if key_cache_size is not None or key_cache_bytes is not None:
+                self._key_cache = BoundedCache(key_cache_size,
+                                               max_bytes=key_cache_bytes,
+                                               sizeof=_name_keys_size)
+            self._frozen_index = None
+            self.metrics = metrics
+            # Counts the writes to the postings, so that the statistics
+            # cached by metrics_snapshot are computed again after one
+            self._writes = 0
+            self._posting_stats = None
+            self._clear()
+
+        def _clear(self):
+            """Empties the directory. In compact mode, the name ids are
+            held by an id table mapping their dense integers, or
+            ordinals, to them, and the reverse index holds the
+            normalized names added under each ordinal, from which the
+            metaphones to remove are produced again. The ordinals of
+            removed name ids are assigned again, oldest first, once
+            more than MIN_FREE_ORDINALS of them are free, so that a
+            lookup still holding one of them is unlikely to map it to
+            the name id it is assigned to next."""
             self._lookup_dict = ({}, {})
+            self._metaphones_by_id = {}
+            self._skipped_combinations = {}
+            self._component_index = ComponentIndex() \
+                if self.index_components else None
+            self._key_tries = (MetaphoneTrie(), MetaphoneTrie()) \
+                if self.approximate else None
+            if self.compact:
+                self._ids = []
+                self._ordinals = {}
+                self._names = []
+                self._free_ordinals = deque()
+            else:
+                self._ids = self._ordinals = self._names = None
+                self._free_ordinals = None
 
         def strong_matches(self):
             """This method returns the name lookup directory
@@ -31,10 +185,10 @@ class NameLookupDirectory(object):
             Returns
             -------
             dict {str: List of obj}
-                Returns a dictionary where name ids are mapped
-                to matching metaphones.
+                Returns a copy of the dictionary where name ids are
+                mapped to matching metaphones.
             """
-            return self._lookup_dict[0]
+            return self._copy_postings(self._lookup_dict[0])
 
         def weak_matches(self):
             """This method returns the name lookup directory
@@ -47,66 +201,1364 @@ class NameLookupDirectory(object):
             Returns
             -------
             dict {str: List of obj}
-                Returns a dictionary where name ids are mapped
-                to matching metaphones.
+                Returns a copy of the dictionary where name ids are
+                mapped to matching metaphones.
+            """
+            return self._copy_postings(self._lookup_dict[1])
+
+        def skipped_combinations(self):
+            """This method returns the number of name combinations
+            that the combination policy kept from being added to the
+            directory, for each name id whose combinations were bounded.
+
+            Returns
+            -------
+            dict {obj: int}
+                Returns a dictionary where the number of skipped
+                combinations are mapped to name ids.
+            """
+            return dict(self._skipped_combinations)
+
+        def _copy_postings(self, sub_directory):
+            """Copies a sub name directory's postings into lists. The
+            items are snapshotted first so that a concurrent add cannot
+            change the sub name directory while it is being copied."""
+            return {
+                metaphone: list(self._name_ids(postings))
+                for metaphone, postings in list(sub_directory.items())
+            }
+
+        def _name_ids(self, postings):
+            """Returns a snapshot of the name ids of a posting, mapping
+            the ordinals of a compact directory back to name ids and
+            skipping those of name ids being removed."""
+            ids = self._ids
+            if ids is None:
+                return tuple(postings)
+
+            return tuple([name_id for name_id
+                          in [ids[ordinal] for ordinal in tuple(postings)]
+                          if name_id is not None])
+
+        def lookup(self, name, threshold=Threshold.STRONG):
+            """This method returns the identifiers of the names
+            matching a given name. The name is normalized and its
+            double metaphone is produced once, after which only the
+            directory entries corresponding to that metaphone are
+            probed given the leniency threshold:
+                - WEAK probes the weak matches with the alternate
+                  metaphone
+                - NORMAL probes the weak matches with the primary
+                  metaphone and the strong matches with the alternate
+                  metaphone
+                - STRONG probes the strong matches with the primary
+                  metaphone
+
+            Parameters
+            ----------
+            name : str
+                A name to find the matches of.
+            threshold : Union[Threshold, int, str], optional
+                The leniency threshold to allow when matching the name.
+                If the supplied parameter is not of the Threshold type,
+                values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+            Returns
+            -------
+            list of obj
+                Returns the deduplicated identifiers of the matching
+                names. Identifiers found by more probes are ranked
+                first; ties are kept in the order they were added to
+                the directory.
+
+            Raises
+            ------
+            ValueError
+                If the value contained by the threshold parameter is
+                not implemented by the Threshold Enum class.
+            """
+            thresh = self.metaphone_matcher._ensure_threshold_is_enum(
+                threshold
+            )
+
+            metrics = self.metrics
+            if metrics is None:
+                return self._lookup_normalized_name(
+                    self.normalizer.normalize_name(name), thresh
+                )
+
+            started = perf_counter()
+            name_ids = self._lookup_normalized_name(
+                self.normalizer.normalize_name(name), thresh
+            )
+            metrics.record('lookup', perf_counter() - started)
+            metrics.increment('lookups')
+
+            return name_ids
+
+        def lookup_many(self, names, threshold=Threshold.STRONG):
+            """This method returns the identifiers of the names
+            matching each of the given names. Names that normalize to
+            the same form are only looked up once.
+
+            Parameters
+            ----------
+            names : Iterable of str
+                An iterable of names to find the matches of.
+            threshold : Union[Threshold, int, str], optional
+                The leniency threshold to allow when matching the names.
+                If the supplied parameter is not of the Threshold type,
+                values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+            Returns
+            -------
+            list of list of obj
+                Returns, for each of the names and in the same order,
+                the ranked identifiers of the matching names as
+                returned by the lookup method.
+
+            Raises
+            ------
+            ValueError
+                If the value contained by the threshold parameter is
+                not implemented by the Threshold Enum class.
+            """
+            thresh = self.metaphone_matcher._ensure_threshold_is_enum(
+                threshold
+            )
+
+            metrics = self.metrics
+            started = perf_counter() if metrics is not None else None
+
+            results = []
+            lookups = {}
+            for name in names:
+                norm_name = self.normalizer.normalize_name(name)
+                if norm_name not in lookups:
+                    lookups[norm_name] = self._lookup_normalized_name(
+                        norm_name, thresh
+                    )
+                results.append(list(lookups[norm_name]))
+
+            if metrics is not None:
+                metrics.record('lookup_many', perf_counter() - started)
+                metrics.increment('lookups', len(results))
+
+            return results
+
+        def lookup_scored(self, name, k=10, max_posting_size=None,
+                          weights=SCORE_WEIGHTS):
+            """This method scores the names of the directory sounding
+            like a given name and returns the best scoring ones. A name
+            id's score is the weighted sum of:
+                - the score of the best matching pair of metaphones
+                  between the given full name and any combination
+                  posted for the name id, see the
+                  DoubleMetaphoneMatcher.score method. The name id's
+                  own full name is not stored, so a name id holding
+                  the given name as one of its combinations scores
+                  like an exact match here
+                - the fraction of the given name's combination keys,
+                  the primary metaphones of its combinations, under
+                  which the name id is posted as a strong match
+                - the fraction of the given name's components which
+                  are part of one of those shared combinations
+            Only the k best name ids are kept in a heap rather than all
+            of them being sorted.
+
+            Parameters
+            ----------
+            name : str
+                A name to find the matches of.
+            k : int, optional
+                The maximum number of name ids returned. None returns
+                every matching name id.
+            max_posting_size : int, optional
+                The combination keys shared by more name ids than this
+                are not counted, so that a common component like a
+                frequent surname does not turn every name id holding it
+                into a candidate. None means no limit.
+            weights : tuple of float, float, float, optional
+                The weights of the metaphone pair score, of the
+                fraction of shared combination keys and of the fraction
+                of covered components.
+
+            Returns
+            -------
+            list of tuple of obj, float
+                Returns the matching name ids and their scores, best
+                first. Ties are kept in the order the name ids were
+                met.
+            """
+            norm_name, name_key = self._normalize_for_combinations(name)
+            if not norm_name:
+                return []
+
+            bits = {}
+            for component in norm_name.split(' '):
+                bits.setdefault(component, 1 << len(bits))
+
+            name_combs, metaphone_tuples = self._name_keys(name_key)
+            lookup_dict = self._lookup_dict
+
+            # The full name comes first, its metaphones being compared
+            # with every pair of positions
+            pair_scores = {}
+            for (i, j), score in PAIR_SCORES:
+                metaphone = metaphone_tuples[0][i]
+                if not metaphone:
+                    continue
+
+                for name_id in self._name_ids(
+                    lookup_dict[j].get(metaphone, ())
+                ):
+                    if score > pair_scores.get(name_id, 0.0):
+                        pair_scores[name_id] = score
+
+            # Combinations sharing a primary metaphone are a single key
+            # covering all of their components
+            keys = {}
+            for comb, metaphone_tuple in zip(name_combs, metaphone_tuples):
+                if metaphone_tuple[0]:
+                    mask = keys.get(metaphone_tuple[0], 0)
+                    for component in comb:
+                        mask |= bits[component]
+                    keys[metaphone_tuple[0]] = mask
+
+            shared_keys = {}
+            covered = {}
+            for metaphone, mask in keys.items():
+                postings = lookup_dict[0].get(metaphone, ())
+                if max_posting_size is not None and \
+                        len(postings) > max_posting_size:
+                    continue
+
+                for name_id in self._name_ids(postings):
+                    shared_keys[name_id] = shared_keys.get(name_id, 0) + 1
+                    covered[name_id] = covered.get(name_id, 0) | mask
+
+            pair_weight, key_weight, coverage_weight = weights
+            scores = [
+                (name_id, pair_weight * pair_scores.get(name_id, 0.0)
+                 + key_weight * shared_keys.get(name_id, 0) / len(keys)
+                 + coverage_weight * bin(covered.get(name_id, 0)).count('1')
+                 / len(bits))
+                for name_id in dict.fromkeys(chain(pair_scores, shared_keys))
+            ]
+
+            if k is None:
+                return sorted(scores, key=lambda score: -score[1])
+
+            return nlargest(k, scores, key=lambda score: score[1])
+
+        def lookup_approximate(self, name, max_distance=1,
+                               threshold=Threshold.STRONG):
+            """This method returns the identifiers of the names whose
+            metaphones are within a given Levenshtein distance of the
+            metaphones of a given name, the sub name directories and
+            metaphones probed following the threshold like the lookup
+            method does. The metaphones within the distance are found
+            by searching the directory's metaphone tries, see the
+            MetaphoneTrie class, rather than by comparing the name's
+            metaphones with each of the directory's.
+
+            Parameters
+            ----------
+            name : str
+                A name to find the matches of.
+            max_distance : int, optional
+                The maximum number of character insertions, deletions
+                and substitutions between the metaphones.
+            threshold : Union[Threshold, int, str], optional
+                The leniency threshold to allow when matching the name.
+                If the supplied parameter is not of the Threshold type,
+                values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+            Returns
+            -------
+            list of tuple of obj, int
+                Returns the matching name ids and the distance of their
+                closest metaphone, closest first. Ties are kept in the
+                alphabetical order of the metaphones and then in the
+                order the name ids were added to the directory.
+
+            Raises
+            ------
+            ValueError
+                If the directory does not hold metaphone tries, if
+                max_distance is negative or if the value contained by
+                the threshold parameter is not implemented by the
+                Threshold Enum class.
+            """
+            if self._key_tries is None:
+                raise ValueError('The directory does not hold metaphone '
+                                 'tries.')
+            if max_distance < 0:
+                raise ValueError('The maximum distance cannot be negative.')
+            thresh = self.metaphone_matcher._ensure_threshold_is_enum(
+                threshold
+            )
+
+            metrics = self.metrics
+            started = perf_counter() if metrics is not None else None
+
+            norm_name = self.normalizer.normalize_name(name)
+            distances = {}
+            if norm_name:
+                metaphone_tuple = self.metaphone_matcher.double_metaphone(
+                    norm_name.replace(' ', '')
+                )
+                lookup_dict = self._lookup_dict
+                for key, metaphone in self._probe_keys(metaphone_tuple,
+                                                       thresh):
+                    if not metaphone:
+                        continue
+
+                    for match, distance in self._key_tries[key].search(
+                        metaphone, max_distance
+                    ):
+                        for name_id in self._name_ids(
+                            lookup_dict[key].get(match, ())
+                        ):
+                            if distance < distances.get(name_id,
+                                                        max_distance + 1):
+                                distances[name_id] = distance
+
+            if metrics is not None:
+                metrics.record('lookup_approximate',
+                               perf_counter() - started)
+                metrics.increment('lookups')
+
+            # sorted is stable, so ties keep the order they were met in
+            return sorted(distances.items(), key=lambda item: item[1])
+
+        def lookup_components(self, name, min_shared=None):
+            """This method returns the identifiers of the names holding
+            components that sound like at least min_shared of the
+            components of a given name, their primary metaphones being
+            the same. The postings of the component index are
+            intersected smallest first, see the ComponentIndex.query
+            method, rather than every subset of the name's components
+            being probed.
+
+            Parameters
+            ----------
+            name : str
+                A name to find the matches of.
+            min_shared : int, optional
+                The minimum number of the name's distinct component
+                metaphones a name must share. None requires all of
+                them.
+
+            Returns
+            -------
+            list of tuple of obj, tuple of int
+                Returns the matching name ids and the positions of
+                their matching components in the normalized names added
+                under them. Name ids sharing more components are ranked
+                first; ties are kept in the order they were added to
+                the directory.
+
+            Raises
+            ------
+            ValueError
+                If the directory does not index components or if
+                min_shared is lower than 1.
+            """
+            if self._component_index is None:
+                raise ValueError('The directory does not index components.')
+            if min_shared is not None and min_shared < 1:
+                raise ValueError('The minimum number of shared components '
+                                 'must be at least 1.')
+
+            metrics = self.metrics
+            started = perf_counter() if metrics is not None else None
+
+            norm_name = self.normalizer.normalize_name(name)
+            metaphones = set()
+            if norm_name:
+                for component in norm_name.split(' '):
+                    metaphones.add(
+                        self.metaphone_matcher.double_metaphone(component)[0]
+                    )
+                metaphones.discard('')
+
+            matches = self._component_index.query(
+                metaphones,
+                min_shared if min_shared is not None else len(metaphones)
+            )
+
+            if metrics is not None:
+                metrics.record('lookup_components', perf_counter() - started)
+                metrics.increment('lookups')
+
+            # sorted is stable, so ties keep their insertion order
+            return [
+                (name_id, positions)
+                for name_id, _, positions
+                in sorted(matches, key=lambda match: -match[1])
+            ]
+
+        def _lookup_normalized_name(self, norm_name, threshold):
+            """This method probes the directory for the identifiers
+            of the names matching an already normalized name.
+
+            Parameters
+            ----------
+            norm_name : str
+                A normalized name.
+            threshold : Threshold
+                The threshold value to use for probing the directory.
+
+            Returns
+            -------
+            list of obj
+                Returns the ranked identifiers of the matching names.
+            """
+            if not norm_name:
+                return []
+
+            metaphone_tuple = self.metaphone_matcher.double_metaphone(
+                norm_name.replace(' ', '')
+            )
+
+            # Postings are snapshotted as tuples so that a concurrent
+            # add cannot change them while they are being iterated
+            lookup_dict = self._lookup_dict
+            hits = {}
+            for key, metaphone in self._probe_keys(metaphone_tuple,
+                                                   threshold):
+                for name_id in self._name_ids(
+                    lookup_dict[key].get(metaphone, ())
+                ):
+                    hits[name_id] = hits.get(name_id, 0) + 1
+
+            # sorted is stable, so ties keep their insertion order
+            return sorted(hits, key=lambda name_id: -hits[name_id])
+
+        def _probe_keys(self, metaphone_tuple, threshold):
+            """This method returns the sub name directories and the
+            metaphones to probe them with so that the matches follow
+            the DoubleMetaphoneMatcher._compare_metaphones rules.
+
+            Parameters
+            ----------
+            metaphone_tuple : tuple of str, str
+                Corresponds to the double metaphone for a name.
+            threshold : Threshold
+                The threshold value to use for probing the directory.
+
+            Returns
+            -------
+            tuple of tuple of int, str
+                Returns pairs of sub name directory keys, 0 for strong
+                matches and 1 for weak matches, and metaphones.
+            """
+            if threshold == Threshold.WEAK:
+                return ((1, metaphone_tuple[1]),)
+            elif threshold == Threshold.NORMAL:
+                return ((1, metaphone_tuple[0]), (0, metaphone_tuple[1]))
+
+            return ((0, metaphone_tuple[0]),)
+
+        def find_duplicate_groups(self, threshold=Threshold.STRONG,
+                                  max_posting_size=None, min_size=2):
+            """This method groups the name ids whose names match given
+            a leniency threshold. Each posting of the directory is walked
+            once and the name ids posted under a same metaphone are
+            united, the groups being the connected components of the
+            resulting graph. As every name combination is posted, two
+            names sharing a single matching component end up in the same
+            group.
+                - WEAK unites the name ids of each weak match posting
+                - NORMAL unites each name id of the strong match posting
+                  of a metaphone with each name id of its weak match
+                  posting, following the NORMAL rule of
+                  DoubleMetaphoneMatcher._compare_metaphones
+                - STRONG unites the name ids of each strong match posting
+            As NORMAL matches are not transitive, two name ids sharing a
+            strong or a weak match posting do not match each other, so
+            NORMAL groups are only merged when each name id of one
+            matches each name id of the other. Postings of empty
+            metaphones, which do not carry any sound, are skipped.
+
+            Parameters
+            ----------
+            threshold : Union[Threshold, int, str], optional
+                The leniency threshold to allow when matching the names.
+                If the supplied parameter is not of the Threshold type,
+                values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+            max_posting_size : int, optional
+                Postings holding more name ids than this are skipped, so
+                that a single common metaphone does not merge thousands
+                of unrelated names. None means no limit.
+            min_size : int, optional
+                The minimum number of name ids of a returned group.
+
+            Returns
+            -------
+            list of list of obj
+                Returns the groups of name ids, largest first. The name
+                ids of a group are in the order they were first met.
+
+            Raises
+            ------
+            ValueError
+                If the value contained by the threshold parameter is not
+                implemented by the Threshold Enum class.
+            """
+            thresh = self.metaphone_matcher._ensure_threshold_is_enum(
+                threshold
+            )
+            lookup_dict = self._lookup_dict
+
+            if thresh == Threshold.NORMAL:
+                return [group for group
+                        in self._normal_duplicate_groups(max_posting_size)
+                        if len(group) >= min_size]
+
+            groups = _DisjointSets()
+            key = 0 if thresh == Threshold.STRONG else 1
+            postings = (
+                self._name_ids(name_ids)
+                for metaphone, name_ids in list(lookup_dict[key].items())
+                if metaphone
+            )
+
+            for name_ids in postings:
+                if max_posting_size is not None and \
+                        len(name_ids) > max_posting_size:
+                    continue
+
+                groups.union_all(name_ids)
+
+            return [group for group in groups.groups()
+                    if len(group) >= min_size]
+
+        def _normal_duplicate_groups(self, max_posting_size):
+            """This method groups the name ids matching at the NORMAL
+            threshold, see the find_duplicate_groups method. The pairs
+            of a name id of a strong match posting and of a name id of
+            the weak match posting of the same metaphone are walked in
+            the order they are met, and the groups of each pair are
+            merged if every name id of one is paired with every name id
+            of the other.
+
+            Parameters
+            ----------
+            max_posting_size : int
+                Postings holding more name ids than this are skipped.
+                None means no limit.
+
+            Returns
+            -------
+            list of list of obj
+                Returns the groups of name ids, largest first.
+            """
+            strong_matches, weak_matches = self._lookup_dict
+
+            pairs = []
+            matches = {}
+            for metaphone, name_ids in list(strong_matches.items()):
+                if not metaphone or metaphone not in weak_matches:
+                    continue
+
+                strong_ids = self._name_ids(name_ids)
+                weak_ids = self._name_ids(weak_matches.get(metaphone, ()))
+                if max_posting_size is not None and \
+                        max(len(strong_ids), len(weak_ids)) > max_posting_size:
+                    continue
+
+                for strong_id in strong_ids:
+                    for weak_id in weak_ids:
+                        if strong_id == weak_id:
+                            continue
+
+                        pairs.append((strong_id, weak_id))
+                        matches.setdefault(strong_id, set()).add(weak_id)
+                        matches.setdefault(weak_id, set()).add(strong_id)
+
+            groups = {}
+            for first, second in pairs:
+                first_group = groups.setdefault(first, [first])
+                second_group = groups.setdefault(second, [second])
+                if first_group is second_group or not all(
+                    other in matches[name_id]
+                    for name_id in first_group for other in second_group
+                ):
+                    continue
+
+                first_group.extend(second_group)
+                for name_id in second_group:
+                    groups[name_id] = first_group
+
+            distinct_groups = {id(group): group for group in groups.values()}
+
+            # sorted is stable, so ties keep the order they were met in
+            return sorted(distinct_groups.values(), key=len, reverse=True)
+
+        def metrics_snapshot(self):
+            """This method returns the metrics of the directory. The
+            stage timings and counters come from the directory's Metrics
+            instance, if any. The cache counters and the posting
+            statistics are computed from the directory itself when the
+            method is called, so that they cost nothing while names are
+            added. As the posting statistics walk every posting, they
+            are cached until the directory is written to, so that the
+            snapshots of an unchanged directory do not walk it again.
+
+            Returns
+            -------
+            dict
+                Returns the stage timings under 'stages', the counters
+                under 'counters', the counters of the metaphone,
+                normalizer and key caches under 'metaphone_cache',
+                'normalizer_cache' and 'key_cache' for those enabled,
+                and the histogram of the posting lengths and the largest
+                postings of the strong and weak matches under
+                'postings'.
+            """
+            if self.metrics is not None:
+                snapshot = self.metrics.snapshot()
+            else:
+                snapshot = {'stages': {}, 'counters': {}}
+
+            for cache, cache_info in (
+                ('metaphone_cache', self.metaphone_matcher.cache_info()),
+                ('normalizer_cache', self.normalizer.cache_info()),
+                ('key_cache', self._key_cache.stats()
+                 if self._key_cache is not None else None),
+            ):
+                if cache_info is not None:
+                    snapshot[cache] = cache_info
+
+            snapshot['postings'] = deepcopy(self._posting_statistics())
+
+            return snapshot
+
+        def _posting_statistics(self):
+            """Returns the statistics of the strong and weak match
+            postings, computed again only if the directory was written
+            to or replaced since they were last computed."""
+            writes, lookup_dict = self._writes, self._lookup_dict
+            cached = self._posting_stats
+            if cached is not None and cached[0] == writes and \
+                    cached[1] is lookup_dict:
+                return cached[2]
+
+            stats = {
+                'strong': posting_statistics(lookup_dict[0]),
+                'weak': posting_statistics(lookup_dict[1]),
+            }
+            self._posting_stats = (writes, lookup_dict, stats)
+
+            return stats
+
+        def memory_usage(self):
+            """This method estimates the memory held by each structure
+            of the directory, walking all of them. Objects shared by
+            several structures, like the metaphones interned in compact
+            mode, are only counted in the first structure they are met
+            in, in the order of the returned dictionary.
+
+            Returns
+            -------
+            dict {str: int}
+                Returns the number of bytes held by the strong and weak
+                matches, their postings and their metaphones, by the
+                name ids and the id table, by the reverse index used to
+                remove names, by the component index and the metaphone
+                tries, if any, and by the skipped combinations, along
+                with their total. A
+                directory loaded from a file reports the size of the
+                file's content instead.
+            """
+            if self._frozen_index is not None:
+                size = len(self._frozen_index._buffer)
+                return {'frozen_index': size, 'total': size}
+
+            seen = set()
+
+            def size(obj):
+                if id(obj) in seen:
+                    return 0
+                seen.add(id(obj))
+                return sys.getsizeof(obj)
+
+            usage = {}
+            for name, sub_directory in zip(('strong_matches',
+                                            'weak_matches'),
+                                           self._lookup_dict):
+                usage[name] = size(sub_directory) + sum(
+                    size(metaphone) + size(postings)
+                    for metaphone, postings in list(sub_directory.items())
+                )
+
+            if self.compact:
+                usage['name_ids'] = size(self._ids) + size(self._ordinals) \
+                    + size(self._free_ordinals) \
+                    + sum(size(name_id) for name_id in self._ordinals)
+                usage['reverse_index'] = size(self._names) + sum(
+                    size(names) + (sum(size(name) for name in names)
+                                   if isinstance(names, list) else 0)
+                    for names in self._names
+                )
+            else:
+                usage['name_ids'] = sum(
+                    size(name_id) for name_id in self._metaphones_by_id
+                )
+                usage['reverse_index'] = size(self._metaphones_by_id) + sum(
+                    size(metaphone_tuples) + sum(
+                        size(metaphone_tuple)
+                        for metaphone_tuple in metaphone_tuples
+                    )
+                    for metaphone_tuples in self._metaphones_by_id.values()
+                )
+
+            component_index = self._component_index
+            if component_index is not None:
+                usage['component_index'] = size(component_index._postings) \
+                    + sum(size(metaphone) + size(postings)
+                          + size(postings[0]) + size(postings[1])
+                          for metaphone, postings
+                          in list(component_index._postings.items())) \
+                    + size(component_index._ids) \
+                    + size(component_index._ordinals) \
+                    + size(component_index._free_ordinals) \
+                    + size(component_index._components) + sum(
+                        size(components)
+                        for components in component_index._components
+                    )
+
+            if self._key_tries is not None:
+                usage['metaphone_tries'] = 0
+                nodes = [trie._root for trie in self._key_tries]
+                while nodes:
+                    node = nodes.pop()
+                    usage['metaphone_tries'] += size(node)
+                    for child in list(node.values()):
+                        if isinstance(child, dict):
+                            nodes.append(child)
+                        else:
+                            usage['metaphone_tries'] += size(child)
+
+            usage['skipped_combinations'] = \
+                size(self._skipped_combinations)
+            usage['total'] = sum(usage.values())
+
+            return usage
+
+        def save(self, path):
+            """This method writes the directory to a file in a compact
+            binary layout, see the FrozenIndex class for its details.
+
+            Parameters
+            ----------
+            path : str
+                The path of the file.
+
+            Raises
+            ------
+            ValueError
+                If a name id is neither an integer, a float nor a string.
+            """
+            self._freeze().save(path)
+
+        def _freeze(self):
+            """Returns the directory laid out as a FrozenIndex, or the
+            FrozenIndex it was loaded from."""
+            if self._frozen_index is not None:
+                return self._frozen_index
+
+            lookup_dict = self._lookup_dict
+            if self.compact:
+                lookup_dict = tuple(
+                    {metaphone: self._name_ids(postings)
+                     for metaphone, postings in sub_directory.items()}
+                    for sub_directory in lookup_dict
+                )
+
+            return FrozenIndex.build(lookup_dict, self._skipped_combinations)
+
+        def load(self, path, mmap=True, verify=True):
+            """This method replaces the content of the directory with
+            the content of a file written by the save method. Once
+            loaded, the directory is read-only.
+
+            Parameters
+            ----------
+            path : str
+                The path of the file.
+            mmap : bool, optional
+                Whether the file is memory-mapped and probed in place
+                rather than read into memory.
+            verify : bool, optional
+                Whether the checksum of the file is verified.
+
+            Raises
+            ------
+            ValueError
+                If the file does not hold a directory, if its format
+                version is not supported or if its checksum does not
+                match its content.
+            """
+            self._load_frozen_index(FrozenIndex.load(path, mmap, verify))
+
+        def _load_frozen_index(self, frozen_index):
+            """Replaces the content of the directory with the content
+            of a FrozenIndex, making the directory read-only."""
+            self._frozen_index = frozen_index
+            self._lookup_dict = frozen_index.lookup_dict
+            self._metaphones_by_id = {}
+            self._ids = self._ordinals = self._names = None
+            self._free_ordinals = None
+            self._component_index = None
+            if self.approximate:
+                self._key_tries = tuple(
+                    MetaphoneTrie(sub_directory)
+                    for sub_directory in frozen_index.lookup_dict
+                )
+            self._skipped_combinations = frozen_index.skipped_combinations
+
+        def _ensure_writable(self):
+            """Raises a ValueError if the directory was loaded from a
+            file."""
+            if self._frozen_index is not None:
+                raise ValueError(
+                    'A directory loaded from a file is read-only.'
+                )
+
+        def add(self, name, name_id):
+            """This method will add a given name and its name id to
+            its lookup directory. Specifically, this method will
+            normalize and produce metaphones for the names before
+            adding them to the directory.
+
+            Adding a name costs one double metaphone computation and
+            two constant time posting insertions per name combination,
+            regardless of how many ids already share those metaphones.
+            The number of name combinations is bounded by the
+            directory's combination policy.
+
+            Parameters
+            ----------
+            name : str
+                A given name.
+            named_id : obj
+                The identifier of the name.
+
+            Raises
+            ------
+            ValueError
+                If the directory was loaded from a file.
+            """
+            self._ensure_writable()
+            self._writes += 1
+
+            if self.metrics is not None:
+                self._add_measured(name, name_id, self.metrics)
+                return
+
+            norm_name, name_key = self._normalize_for_combinations(name)
+            name_combs, metaphone_tuples = self._name_keys(name_key)
+
+            self._count_skipped_combinations(norm_name, name_combs, name_id)
+            if self.compact:
+                self._add_compact(metaphone_tuples, name_key, name_id)
+            else:
+                self._add_combinations_to_directory(metaphone_tuples,
+                                                    name_id)
+
+            if self._component_index is not None:
+                self._add_components(norm_name, name_id)
+
+            return
+
+        def _add_measured(self, name, name_id, metrics):
+            """This method adds a name like the add method does while
+            recording the time spent in each of its stages. The double
+            metaphones of all of the name's combinations are produced
+            before any of them is posted so that both stages can be
+            timed separately. When the key cache is enabled, the
+            combinations stage also holds the time spent producing the
+            metaphones, which are memoized along with the combinations.
+
+            Parameters
+            ----------
+            name : str
+                A given name.
+            name_id : obj
+                The identifier of the name.
+            metrics : Metrics
+                The metrics to record the stages and counters into.
+            """
+            started = perf_counter()
+            norm_name, name_key = self._normalize_for_combinations(name)
+            normalized = perf_counter()
+            if self._key_cache is None:
+                name_combs = self._name_key_combinations(name_key)
+                self._count_skipped_combinations(norm_name, name_combs,
+                                                 name_id)
+                combined = perf_counter()
+                metaphone_tuples = self._combination_metaphones(name_combs)
+                metaphoned = perf_counter()
+            else:
+                name_combs, metaphone_tuples = self._name_keys(name_key)
+                self._count_skipped_combinations(norm_name, name_combs,
+                                                 name_id)
+                combined = metaphoned = perf_counter()
+            if self.compact:
+                self._add_compact(metaphone_tuples, name_key, name_id)
+            else:
+                self._add_combinations_to_directory(metaphone_tuples,
+                                                    name_id)
+            if self._component_index is not None:
+                self._add_components(norm_name, name_id)
+            posted = perf_counter()
+
+            metrics.record('normalize', normalized - started)
+            metrics.record('combinations', combined - normalized)
+            metrics.record('metaphone', metaphoned - combined)
+            metrics.record('posting_insert', posted - metaphoned)
+            metrics.increment('names_added')
+            metrics.increment('combinations_generated', len(name_combs))
+            metrics.increment('combinations_skipped',
+                              self._skipped_combinations.get(name_id, 0))
+
+        def remove(self, name_id):
+            """This method removes a name id, along with every name
+            added under it, from the directory. The double metaphones
+            the name id was posted under are kept in a reverse index, so
+            that only the postings holding the name id are visited, each
+            in constant time. Metaphones left without any name id are
+            removed from the directory.
+
+            Parameters
+            ----------
+            name_id : obj
+                The identifier of the name.
+
+            Returns
+            -------
+            bool
+                Returns whether the name id was in the directory.
+
+            Raises
+            ------
+            ValueError
+                If the directory was loaded from a file.
+            """
+            return self._remove(name_id)
+
+        def _remove(self, name_id, keep_ordinal=False):
+            """Removes a name id, see the remove method. In a compact
+            directory, the name id keeps its ordinal if asked to."""
+            self._ensure_writable()
+            self._writes += 1
+
+            if self.compact:
+                if not self._remove_compact(name_id, keep_ordinal):
+                    return False
+            else:
+                metaphone_tuples = self._metaphones_by_id.pop(name_id, None)
+                if metaphone_tuples is None:
+                    return False
+
+                for key in (0, 1):
+                    sub_directory = self._lookup_dict[key]
+                    for metaphone in {m[key] for m in metaphone_tuples}:
+                        postings = sub_directory[metaphone]
+                        del postings[name_id]
+                        if not postings:
+                            del sub_directory[metaphone]
+                            if self._key_tries is not None:
+                                self._key_tries[key].remove(metaphone)
+
+            self._skipped_combinations.pop(name_id, None)
+            if self._component_index is not None:
+                self._component_index.remove(name_id)
+            if self.metrics is not None:
+                self.metrics.increment('names_removed')
+
+            return True
+
+        def _remove_compact(self, name_id, keep_ordinal=False):
+            """This method removes a name id from a compact directory.
+            The metaphones of the names added under its ordinal are
+            produced again to find the postings holding it. The ordinal
+            is only freed once it is out of every posting, so that
+            lookups never map it to a name id it is assigned to next.
+
+            Parameters
+            ----------
+            name_id : obj
+                The identifier of the name.
+            keep_ordinal : bool, optional
+                Whether the name id keeps its ordinal, to be added
+                again under it, rather than freeing it.
+
+            Returns
+            -------
+            bool
+                Returns whether the name id was in the directory.
+            """
+            ordinal = self._ordinals.get(name_id)
+            if ordinal is None:
+                return False
+
+            metaphone_tuples = set()
+            for name_key in self._names_of(ordinal):
+                metaphone_tuples.update(self._name_keys(name_key)[1])
+
+            for key in (0, 1):
+                sub_directory = self._lookup_dict[key]
+                for metaphone in {m[key] for m in metaphone_tuples}:
+                    postings = sub_directory.get(metaphone)
+                    if postings is None:
+                        continue
+
+                    postings.remove(ordinal)
+                    if not postings:
+                        del sub_directory[metaphone]
+                        if self._key_tries is not None:
+                            self._key_tries[key].remove(metaphone)
+
+            self._names[ordinal] = None
+            if not keep_ordinal:
+                del self._ordinals[name_id]
+                self._ids[ordinal] = None
+                self._free_ordinals.append(ordinal)
+
+            return True
+
+        def update(self, name_id, name):
+            """This method replaces the names added under a name id by
+            a new name. A name id that is not in the directory yet is
+            added to it. In a compact directory, the name id keeps its
+            ordinal.
+
+            Parameters
+            ----------
+            name_id : obj
+                The identifier of the name.
+            name : str
+                The new name.
+
+            Raises
+            ------
+            ValueError
+                If the directory was loaded from a file.
+            """
+            self._remove(name_id, keep_ordinal=True)
+            self.add(name, name_id)
+
+        def add_names(self, names, name_ids, workers=None,
+                      chunksize=DEFAULT_CHUNKSIZE):
+            """Given two list, one containing names and the other
+            of the ids corresponding to the names, this method will
+            add each of those names to its name lookup directory.
+
+            When more than one worker is requested, the names are split
+            into chunks whose normalization and metaphones are produced
+            by a pool of processes. Each chunk is indexed into a partial
+            directory which is merged into this one in the order of the
+            chunks, so that the directory is identical to the one that
+            adding the names one at a time would produce.
+
+            Parameters
+            ----------
+            names : Iterable of str
+                An iterable of names.
+            name_ids : Iterable of obj
+                An iterable of the corresponding name ids. The name ids
+                must be picklable when using more than one worker.
+            workers : int, optional
+                The number of worker processes to use. None or 1 adds
+                the names in the current process.
+            chunksize : int, optional
+                The number of names sent to a worker process at once.
+
+            Raises
+            ------
+            ValueError
+                If workers or chunksize are lower than 1, or if the
+                directory was loaded from a file.
+            """
+            self._ensure_writable()
+
+            if workers is not None and workers < 1:
+                raise ValueError('The number of workers must be at least 1.')
+            if chunksize < 1:
+                raise ValueError('The chunk size must be at least 1.')
+
+            if workers is None or workers == 1:
+                for name, named_id in zip(names, name_ids):
+                    self.add(name, named_id)
+
+                return
+
+            started = perf_counter()
+            self._add_names_in_parallel(zip(names, name_ids), workers,
+                                        chunksize)
+            if self.metrics is not None:
+                self.metrics.record('parallel_add',
+                                    perf_counter() - started)
+
+            return
+
+        def ingest_file(self, path, name_field, id_field,
+                        format=RecordFormat.CSV,
+                        batch_size=DEFAULT_BATCH_SIZE, id_type=None,
+                        workers=None, progress=None):
+            """This method streams the records of a CSV or JSON Lines
+            file into the directory, one batch of records at a time, so
+            that the file never has to fit in memory. See the
+            RecordReader class for the records that are skipped.
+
+            Parameters
+            ----------
+            path : str
+                The path of the file.
+            name_field : str
+                The field holding the names.
+            id_field : str
+                The field holding the name ids.
+            format : Union[RecordFormat, str], optional
+                The format of the file, CSV or JSONL.
+            batch_size : int, optional
+                The number of records read and added at once.
+            id_type : Callable, optional
+                Parses the name ids read from the file, int for
+                instance. None keeps them as they are read.
+            workers : int, optional
+                The number of worker processes to use. None or 1 adds
+                the names in the current process. Otherwise, a single
+                pool of processes indexes the whole file, each batch
+                being a chunk sent to a worker, see the add_names
+                method.
+            progress : Callable, optional
+                Called with the IngestStats of the ingestion after each
+                batch is added. With more than one worker, the rows of
+                the stats count the records read, which run up to two
+                batches per worker ahead of those added.
+
+            Returns
+            -------
+            IngestStats
+                Returns the number of rows ingested and skipped, the
+                number of bytes read and the time the ingestion took.
+
+            Raises
+            ------
+            ValueError
+                If the format is not implemented by the RecordFormat
+                Enum class, if batch_size or workers are lower than 1,
+                or if the directory was loaded from a file.
+            """
+            self._ensure_writable()
+
+            if workers is not None and workers < 1:
+                raise ValueError('The number of workers must be at least 1.')
+            if batch_size < 1:
+                raise ValueError('The batch size must be at least 1.')
+
+            reader = RecordReader(path, name_field, id_field, format,
+                                  id_type)
+            batches = reader.batches(batch_size)
+            if workers is None or workers == 1:
+                for names, name_ids in batches:
+                    self.add_names(names, name_ids)
+
+                    if progress is not None:
+                        progress(reader.stats)
+
+                return reader.stats
+
+            # Batches hold batch_size records, so that each chunk sent to
+            # a worker is one of them
+            started = perf_counter()
+            self._add_names_in_parallel(
+                chain.from_iterable(zip(names, name_ids)
+                                    for names, name_ids in batches),
+                workers, batch_size,
+                None if progress is None else lambda: progress(reader.stats)
+            )
+            if self.metrics is not None:
+                self.metrics.record('parallel_add', perf_counter() - started)
+
+            return reader.stats
+
+        def _add_names_in_parallel(self, records, workers, chunksize,
+                                   merged=None):
+            """This method indexes chunks of (name, name id) records in
+            a pool of worker processes and merges the resulting partial
+            directories in the order of the chunks. At most two chunks
+            per worker are pending at any time so that the records are
+            consumed lazily.
+
+            Parameters
+            ----------
+            records : Iterator of tuple of str, obj
+                An iterator of names and their corresponding name ids.
+            workers : int
+                The number of worker processes to use.
+            chunksize : int
+                The number of records sent to a worker process at once.
+            merged : Callable, optional
+                Called without arguments after each chunk is merged.
             """
-            return self._lookup_dict[1]
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_index_worker,
+                initargs=(self.combination_policy,
+                          self.metaphone_matcher.cache_size, self.compact,
+                          self.metaphone_matcher.backend,
+                          self.index_components)
+            ) as executor:
+                pending = deque()
+                while True:
+                    while len(pending) < 2 * workers:
+                        chunk = list(islice(records, chunksize))
+                        if not chunk:
+                            break
 
-        def add(self, name, name_id):
-            """This method will add a given name and its name id to
-            its lookup directory. Specifically, this method will
-            normalize and produce metaphones for the names before
-            adding them to the directory.
+                        pending.append((
+                            [name_id for _, name_id in chunk],
+                            executor.submit(_index_chunk, chunk)
+                        ))
+
+                    if not pending:
+                        break
+
+                    chunk_ids, future = pending.popleft()
+                    self._merge_partial_directory(chunk_ids,
+                                                  *future.result())
+                    if merged is not None:
+                        merged()
+
+            return
+
+        def _merge_partial_directory(self, name_ids, lookup_dict,
+                                     reverse_index, skipped_combinations,
+                                     component_index):
+            """This method merges a partial directory, produced by a
+            worker process for a chunk of names, into the directory.
+            Postings of the partial directory are appended to the
+            existing ones, skipping the name ids that are already
+            posted.
 
             Parameters
             ----------
-            name : str
-                A given name.
-            named_id : obj
-                The identifier of the name.
+            name_ids : list of obj
+                The name ids of the chunk of names.
+            lookup_dict : tuple of dict, dict
+                The strong and weak matches of the partial directory.
+            reverse_index : dict {obj: set of tuple of str, str}
+                The double metaphones each name id of the partial
+                directory was posted under or, for a compact directory,
+                its id table and the normalized names of its ordinals.
+            skipped_combinations : dict {obj: int}
+                The skipped combinations of the partial directory.
+            component_index : ComponentIndex
+                The component index of the partial directory, if any.
             """
-            norm_name = self.normalizer.normalize_name(name)
-            name_combs = self._generate_name_combinations(norm_name)
+            self._writes += 1
+            if self.compact:
+                self._merge_compact_directory(lookup_dict, *reverse_index)
+            else:
+                self._merge_postings(lookup_dict, reverse_index)
 
-            self._add_combinations_to_directory(name_combs, name_id)
+            for name_id in name_ids:
+                self._skipped_combinations.pop(name_id, None)
+            self._skipped_combinations.update(skipped_combinations)
 
-            return
+            if component_index is not None:
+                self._component_index.merge(component_index)
 
-        def add_names(self, names, name_ids):
-            """Given two list, one containing names and the other
-            of the ids corresponding to the names, this method will
-            add each of those names to its name lookup directory.
+            if self.metrics is not None:
+                self.metrics.increment('names_added', len(name_ids))
+                self.metrics.increment('combinations_skipped',
+                                       sum(skipped_combinations.values()))
+
+        def _merge_postings(self, lookup_dict, metaphones_by_id):
+            """Merges the postings and the reverse index of a partial
+            directory."""
+            for key in (0, 1):
+                sub_directory = self._lookup_dict[key]
+                for metaphone, postings in lookup_dict[key].items():
+                    existing_postings = sub_directory.get(metaphone)
+                    if existing_postings is None:
+                        sub_directory[metaphone] = postings
+                        if self._key_tries is not None:
+                            self._key_tries[key].add(metaphone)
+                    else:
+                        existing_postings.update(postings)
+
+            for name_id, metaphone_tuples in metaphones_by_id.items():
+                existing_tuples = self._metaphones_by_id.get(name_id)
+                if existing_tuples is None:
+                    self._metaphones_by_id[name_id] = metaphone_tuples
+                else:
+                    existing_tuples.update(metaphone_tuples)
+
+        def _merge_compact_directory(self, lookup_dict, ids, names):
+            """This method merges a compact partial directory, whose
+            ordinals are local to it, into the compact directory.
 
             Parameters
             ----------
-            names : Iterable of str
-                An iterable of names.
-            name_ids : Iterable of obj
-                An iterable of the corresponding name ids.
+            lookup_dict : tuple of dict, dict
+                The strong and weak matches of the partial directory.
+            ids : list of obj
+                The name ids of the partial directory's ordinals.
+            names : list
+                The name keys of the partial directory's ordinals, see
+                the _name_keys method.
             """
-            for name, named_id in zip(names, name_ids):
-                self.add(name, named_id)
+            ordinals = []
+            for name_id, name_keys in zip(ids, names):
+                ordinal, new = self._ordinal(name_id)
+                ordinals.append((ordinal, new))
+                for name_key in (name_keys if isinstance(name_keys, list)
+                                 else (name_keys,)):
+                    self._add_name_to_ordinal(ordinal, name_key)
 
-            return
+            for key in (0, 1):
+                sub_directory = self._lookup_dict[key]
+                for metaphone, postings in lookup_dict[key].items():
+                    existing_postings = sub_directory.get(metaphone)
+                    if existing_postings is None:
+                        sub_directory[sys.intern(metaphone)] = array(
+                            'q', [ordinals[local][0] for local in postings]
+                        )
+                        if self._key_tries is not None:
+                            self._key_tries[key].add(metaphone)
+                        continue
 
-        def _add_combinations_to_directory(self, name_combs, name_id):
-            """Given the name combinations for a name's components, this
-            method adds each of those combinations' double metaphones
-            to its name directory and seperate strong and weak matches.
+                    for local in postings:
+                        ordinal, new = ordinals[local]
+                        if new or ordinal not in existing_postings:
+                            existing_postings.append(ordinal)
+
+        def _add_combinations_to_directory(self, comb_metaphones, name_id):
+            """Given the double metaphones of the name combinations for
+            a name's components, this method adds each of them to its
+            name directory and seperate strong and weak matches.
 
             Parameters
             ----------
-            name_combs : list of tuple
-                Corresponds to the list of name combinations for a given
-                name.
+            comb_metaphones : Iterable of tuple of str, str
+                Corresponds to the double metaphones of the name
+                combinations for a given name.
             name_id : obj
                 Corresponds to the name's identifier.
             """
-            for comb in name_combs:
-                concat_name = ''.join(n for n in comb)
-                metaphone_tuple = self.metaphone_matcher.double_metaphone(
-                    concat_name
-                )
+            metaphone_tuples = self._metaphones_by_id.get(name_id)
+            if metaphone_tuples is None:
+                metaphone_tuples = self._metaphones_by_id[name_id] = set()
+
+            for metaphone_tuple in comb_metaphones:
+                metaphone_tuples.add(metaphone_tuple)
 
                 # Add strong match if not exists
                 self._add_name_id_using_metaphone(
@@ -126,6 +1578,9 @@ class NameLookupDirectory(object):
             key parameter.
             If the metaphone does not exist within the name sub-directory,
             a new entry is created with that name id.
+            Postings are insertion-ordered dictionaries whose keys are the
+            name ids, so that checking for and skipping an already posted
+            name id takes constant time.
 
             Parameters
             ----------
@@ -137,23 +1592,200 @@ class NameLookupDirectory(object):
                 Corresponds to the instance's sub name directory.
                 0 for strong matches, 1 for weak matches.
             """
-            if metaphone_tuple[key] in self._lookup_dict[key]:
-                if name_id not in self._lookup_dict[key][metaphone_tuple[key]]:
-                    self._lookup_dict[key][metaphone_tuple[key]].append(
-                        name_id
-                    )
+            postings = self._lookup_dict[key].get(metaphone_tuple[key])
+            if postings is None:
+                self._lookup_dict[key][metaphone_tuple[key]] = {name_id: None}
+                if self._key_tries is not None:
+                    self._key_tries[key].add(metaphone_tuple[key])
+            elif name_id not in postings:
+                postings[name_id] = None
+
+        def _add_components(self, norm_name, name_id):
+            """Posts a name id in the component index under the primary
+            metaphones of a normalized name's components."""
+            self._component_index.add(name_id, [
+                (metaphone, position)
+                for position, metaphone in enumerate(
+                    self.metaphone_matcher.double_metaphone(component)[0]
+                    for component in norm_name.split(' ')
+                )
+                if metaphone
+            ])
+
+        def _normalize_for_combinations(self, name):
+            """Returns a name normalized and its name key, see the
+            _name_keys method. The order its components were written in
+            is only kept if the combination policy depends on it."""
+            if not self.combination_policy.ordered:
+                norm_name = self.normalizer.normalize_name(name)
+                return norm_name, norm_name
+
+            norm_name, order = self.normalizer.normalize_name_in_order(name)
+
+            return norm_name, norm_name if order is None else \
+                (norm_name, order)
+
+        def _name_keys(self, name_key):
+            """This method returns the combinations of a normalized
+            name and their double metaphones, memoized by the key cache
+            when it is enabled.
+
+            Parameters
+            ----------
+            name_key : Union[str, tuple of str, tuple of int]
+                A normalized name, or a normalized name followed by the
+                positions of its components in the order they were
+                written in, see NameNormalizer.normalize_name_in_order.
+
+            Returns
+            -------
+            tuple of tuple of tuple, tuple of tuple of str, str
+                Returns the name combinations and their double
+                metaphones, in the same order.
+            """
+            if self._key_cache is None:
+                return self._compute_name_keys(name_key)
+
+            return self._key_cache.get_or_compute(name_key,
+                                                  self._compute_name_keys)
+
+        def _compute_name_keys(self, name_key):
+            """Returns the combinations of a name key and their double
+            metaphones as tuples, so that they can be shared."""
+            name_combs = self._name_key_combinations(name_key)
+
+            return (tuple(name_combs),
+                    tuple(self._combination_metaphones(name_combs)))
+
+        def _name_key_combinations(self, name_key):
+            """Returns the combinations of a name key, see the
+            _name_keys method."""
+            if isinstance(name_key, tuple):
+                return self._generate_name_combinations(*name_key)
+
+            return self._generate_name_combinations(name_key)
+
+        def _combination_metaphones(self, name_combs):
+            """Returns the double metaphones of name combinations."""
+            return [
+                self.metaphone_matcher.double_metaphone(''.join(comb))
+                for comb in name_combs
+            ]
+
+        def _add_compact(self, metaphone_tuples, name_key, name_id):
+            """This method posts the ordinal of a name id under the
+            double metaphones of a name's combinations in a compact
+            directory. Metaphones are interned when first posted, and
+            empty alternate metaphones are not posted. A new ordinal
+            can only already be at the end of a posting, so that the
+            whole posting is only scanned for name ids added before.
+
+            Parameters
+            ----------
+            metaphone_tuples : list of tuple of str, str
+                The double metaphones of the name's combinations.
+            name_key : Union[str, tuple of str, tuple of int]
+                The name key of the name, see the _name_keys method.
+            name_id : obj
+                The identifier of the name.
+            """
+            ordinal, new = self._ordinal(name_id)
+            self._add_name_to_ordinal(ordinal, name_key)
+
+            for key in (0, 1):
+                sub_directory = self._lookup_dict[key]
+                for metaphone_tuple in metaphone_tuples:
+                    metaphone = metaphone_tuple[key]
+                    if key == 1 and not metaphone:
+                        continue
+
+                    postings = sub_directory.get(metaphone)
+                    if postings is None:
+                        sub_directory[sys.intern(metaphone)] = array(
+                            'q', (ordinal,)
+                        )
+                        if self._key_tries is not None:
+                            self._key_tries[key].add(metaphone)
+                    elif postings[-1] != ordinal and \
+                            (new or ordinal not in postings):
+                        postings.append(ordinal)
+
+        def _ordinal(self, name_id):
+            """Returns the ordinal of a name id in a compact directory,
+            assigning it a free or the next one if it is new, and
+            whether it is out of every posting."""
+            ordinal = self._ordinals.get(name_id)
+            if ordinal is not None:
+                return ordinal, self._names[ordinal] is None
+
+            if len(self._free_ordinals) > MIN_FREE_ORDINALS:
+                ordinal = self._free_ordinals.popleft()
+                self._ids[ordinal] = name_id
             else:
-                self._lookup_dict[key][metaphone_tuple[key]] = [name_id]
+                ordinal = len(self._ids)
+                self._ids.append(name_id)
+                self._names.append(None)
+            self._ordinals[name_id] = ordinal
 
-        def _generate_name_combinations(self, name):
+            return ordinal, True
+
+        def _add_name_to_ordinal(self, ordinal, name_key):
+            """Records the name key of a name added under an ordinal,
+            keeping a single name key as it is and several in a list,
+            which is replaced rather than mutated."""
+            names = self._names[ordinal]
+            if names is None:
+                self._names[ordinal] = name_key
+            elif name_key not in self._names_of(ordinal):
+                self._names[ordinal] = list(self._names_of(ordinal)) + \
+                    [name_key]
+
+        def _names_of(self, ordinal):
+            """Returns the name keys of the names added under an
+            ordinal, see the _name_keys method."""
+            names = self._names[ordinal]
+            if names is None:
+                return ()
+
+            return names if isinstance(names, list) else (names,)
+
+        def _count_skipped_combinations(self, name, name_combs, name_id):
+            """This method records how many of a name's combinations
+            were not generated because of the combination policy.
+
+            Parameters
+            ----------
+            name : str
+                The normalized name the combinations were generated from.
+            name_combs : list of tuple
+                Corresponds to the list of name combinations generated
+                for the name.
+            name_id : obj
+                Corresponds to the name's identifier.
+            """
+            skipped = CombinationPolicy.count_all_combinations(
+                name.split(' ')
+            ) - len(name_combs)
+
+            if skipped > 0:
+                self._skipped_combinations[name_id] = skipped
+            else:
+                self._skipped_combinations.pop(name_id, None)
+
+        def _generate_name_combinations(self, name, order=None):
             """This method generates a combination of names based
             on a name's name components. It returns a list of tuples
-            where each tuple corresponds to a combination.
+            where each tuple corresponds to a combination, as allowed
+            by the directory's combination policy.
 
             Parameters
             ----------
             name : str
                 A name to obtain the combinations from.
+            order : tuple of int, optional
+                The positions of the name's components in the order
+                they were written in, see
+                NameNormalizer.normalize_name_in_order.
 
             Returns
             -------
@@ -163,23 +1795,75 @@ class NameLookupDirectory(object):
             """
             name_tuple = tuple(name.split(' '))
 
-            combs = []
-            combs.append(name_tuple)
+            return self.combination_policy.generate(name_tuple, order)
+
+    __default_instance = None
+    __default_lock = Lock()
 
-            i = len(name_tuple) - 1
-            while i > 0:
-                combs.extend(combinations(name_tuple, i))
+    def __init__(self, combination_policy=None, metaphone_cache_size=None,
+                 metrics=None, compact=False,
+                 metaphone_backend=MetaphoneBackend.NATIVE,
+                 index_components=False, approximate=False,
+                 normalizer_cache_size=None, key_cache_size=None,
+                 normalizer_cache_bytes=None, key_cache_bytes=None):
+        self._directory = NameLookupDirectory._NameLookupDirectory(
+            combination_policy, metaphone_cache_size, metrics, compact,
+            metaphone_backend, index_components, approximate,
+            normalizer_cache_size, key_cache_size, normalizer_cache_bytes,
+            key_cache_bytes
+        )
+        self._write_lock = Lock()
+
+    @staticmethod
+    def default():
+        """This method returns the directory shared by every part of
+        the process, creating it the first time it is called.
 
-                i -= 1
+        Returns
+        -------
+        NameLookupDirectory
+            Returns the process-wide default directory.
+        """
+        with NameLookupDirectory.__default_lock:
+            if NameLookupDirectory.__default_instance is None:
+                NameLookupDirectory.__default_instance = NameLookupDirectory()
 
-            return combs
+        return NameLookupDirectory.__default_instance
 
-    __directory_instance = None
+    def swap(self, other):
+        """This method atomically exchanges the content of the directory
+        with the content of another one, typically a freshly rebuilt
+        directory. Reads running on this directory during the exchange
+        see either its whole previous or its whole new content. Each
+        directory keeps its own metrics.
 
-    def __init__(self):
-        if NameLookupDirectory.__directory_instance is None:
-            NameLookupDirectory.__directory_instance = \
-                NameLookupDirectory._NameLookupDirectory()
+        Parameters
+        ----------
+        other : NameLookupDirectory
+            The directory to exchange contents with. It holds the
+            previous content of this directory once the method returns.
+        """
+        if other is self:
+            return
+
+        # Locks are always taken in the same order to avoid deadlocks
+        first, second = sorted((self, other), key=id)
+        with first._write_lock, second._write_lock:
+            self._directory, other._directory = \
+                other._directory, self._directory
+            self._directory.metrics, other._directory.metrics = \
+                other._directory.metrics, self._directory.metrics
+
+    def reload_normalization(self):
+        """This method parses the abbreviations and titles files of the
+        directory's NameNormalizer again, so that a running process
+        picks up their changes. Every normalizer using the same files,
+        including those of the other directories, normalizes the
+        following names with the new resources. The names already
+        added keep the combinations they were normalized into; update
+        them to normalize them again.
+        """
+        self._directory.normalizer.reload()
 
     def add(self, name, name_id):
         """This method will add a given name and its name id to
@@ -193,10 +1877,17 @@ class NameLookupDirectory(object):
             A given name.
         named_id : obj
             The identifier of the name.
+
+        Raises
+        ------
+        ValueError
+            If the directory was loaded from a file.
         """
-        NameLookupDirectory.__directory_instance.add(name, name_id)
+        with self._write_lock:
+            self._directory.add(name, name_id)
 
-    def add_names(self, names, name_ids):
+    def add_names(self, names, name_ids, workers=None,
+                  chunksize=DEFAULT_CHUNKSIZE):
         """Given two list, one containing names and the other
         of the ids corresponding to the names, this method will
         add each of those names to its name lookup directory.
@@ -206,11 +1897,116 @@ class NameLookupDirectory(object):
         names : Iterable of str
             An iterable of names.
         name_ids : Iterable of obj
-            An iterable of the corresponding name ids.
+            An iterable of the corresponding name ids. The name ids
+            must be picklable when using more than one worker.
+        workers : int, optional
+            The number of worker processes normalizing and producing
+            the metaphones of the names. None or 1 adds the names in
+            the current process.
+        chunksize : int, optional
+            The number of names sent to a worker process at once.
+
+        Raises
+        ------
+        ValueError
+            If workers or chunksize are lower than 1, or if the
+            directory was loaded from a file.
         """
-        NameLookupDirectory.__directory_instance.add_names(
-            names, name_ids
-        )
+        with self._write_lock:
+            self._directory.add_names(names, name_ids, workers, chunksize)
+
+    def remove(self, name_id):
+        """This method removes a name id, along with every name added
+        under it, from the directory. Only the postings holding the name
+        id are visited, and metaphones left without any name id are
+        removed from the directory.
+
+        Parameters
+        ----------
+        name_id : obj
+            The identifier of the name.
+
+        Returns
+        -------
+        bool
+            Returns whether the name id was in the directory.
+
+        Raises
+        ------
+        ValueError
+            If the directory was loaded from a file.
+        """
+        with self._write_lock:
+            return self._directory.remove(name_id)
+
+    def update(self, name_id, name):
+        """This method replaces the names added under a name id by a
+        new name. A name id that is not in the directory yet is added
+        to it.
+
+        Parameters
+        ----------
+        name_id : obj
+            The identifier of the name.
+        name : str
+            The new name.
+
+        Raises
+        ------
+        ValueError
+            If the directory was loaded from a file.
+        """
+        with self._write_lock:
+            self._directory.update(name_id, name)
+
+    def ingest_file(self, path, name_field, id_field,
+                    format=RecordFormat.CSV, batch_size=DEFAULT_BATCH_SIZE,
+                    id_type=None, workers=None, progress=None):
+        """This method streams the records of a CSV or JSON Lines
+        file into the directory, one batch of records at a time, so
+        that the file never has to fit in memory.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        name_field : str
+            The field holding the names.
+        id_field : str
+            The field holding the name ids.
+        format : Union[RecordFormat, str], optional
+            The format of the file, CSV or JSONL.
+        batch_size : int, optional
+            The number of records read and added at once.
+        id_type : Callable, optional
+            Parses the name ids read from the file, int for instance.
+            None keeps them as they are read.
+        workers : int, optional
+            The number of worker processes to use. None or 1 adds the
+            names in the current process. Otherwise, a single pool of
+            processes indexes the whole file, see the add_names method.
+        progress : Callable, optional
+            Called with the IngestStats of the ingestion after each
+            batch is added.
+
+        Returns
+        -------
+        IngestStats
+            Returns the number of rows ingested and skipped, the number
+            of bytes read and the time the ingestion took.
+
+        Raises
+        ------
+        ValueError
+            If the format is not implemented by the RecordFormat Enum
+            class, if batch_size or workers are lower than 1, or if the
+            directory was loaded from a file.
+        """
+        with self._write_lock:
+            return self._directory.ingest_file(
+                path, name_field, id_field, format, batch_size, id_type,
+                workers, progress
+            )
 
     def strong_matches(self):
         """This method returns the name lookup directory
@@ -226,7 +2022,7 @@ class NameLookupDirectory(object):
             Returns a dictionary where name ids are mapped
             to matching metaphones.
         """
-        return NameLookupDirectory.__directory_instance.strong_matches()
+        return self._directory.strong_matches()
 
     def weak_matches(self):
         """This method returns the name lookup directory
@@ -242,7 +2038,444 @@ class NameLookupDirectory(object):
             Returns a dictionary where name ids are mapped
             to matching metaphones.
         """
-        return NameLookupDirectory.__directory_instance.weak_matches()
+        return self._directory.weak_matches()
+
+    def find_duplicate_groups(self, threshold=Threshold.STRONG,
+                              max_posting_size=None, min_size=2):
+        """This method groups the name ids whose names match given
+        a leniency threshold, by walking each posting of the directory
+        once and uniting the name ids posted under a same metaphone. At
+        the NORMAL threshold, only the name ids of the strong and weak
+        match postings of a metaphone are united, see
+        _NameLookupDirectory.find_duplicate_groups.
+
+        Parameters
+        ----------
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the names.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+        max_posting_size : int, optional
+            Postings holding more name ids than this are skipped, so
+            that a single common metaphone does not merge thousands
+            of unrelated names. None means no limit.
+        min_size : int, optional
+            The minimum number of name ids of a returned group.
+
+        Returns
+        -------
+        list of list of obj
+            Returns the groups of name ids, largest first.
+
+        Raises
+        ------
+        ValueError
+            If the value contained by the threshold parameter is not
+            implemented by the Threshold Enum class.
+        """
+        return self._directory.find_duplicate_groups(
+            threshold, max_posting_size, min_size
+        )
+
+    def metrics_snapshot(self):
+        """This method returns the metrics of the directory: the stage
+        timings and counters recorded by its Metrics instance, if any,
+        the counters of its caches and the histogram of its posting
+        lengths along with its largest postings.
+
+        Returns
+        -------
+        dict
+            Returns the metrics of the directory, see the
+            metrics_snapshot method of the _NameLookupDirectory class.
+        """
+        return self._directory.metrics_snapshot()
+
+    def metrics_prometheus(self, prefix='name_matching'):
+        """This method returns the metrics of the directory in the
+        Prometheus text exposition format.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            The prefix of the metric names.
+
+        Returns
+        -------
+        str
+            Returns the metrics of the directory.
+        """
+        return to_prometheus(self.metrics_snapshot(), prefix)
+
+    def memory_usage(self):
+        """This method estimates the memory held by each structure of
+        the directory: its strong and weak matches, its name ids, its
+        reverse index and its skipped combinations.
+
+        Returns
+        -------
+        dict {str: int}
+            Returns the number of bytes held by each structure along
+            with their total.
+        """
+        return self._directory.memory_usage()
+
+    def save(self, path):
+        """This method writes the directory to a file in a compact
+        binary layout which can be memory-mapped back by the load
+        method.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+
+        Raises
+        ------
+        ValueError
+            If a name id is neither an integer, a float nor a string.
+        """
+        with self._write_lock:
+            self._directory.save(path)
+
+    def load(self, path, mmap=True, verify=True):
+        """This method replaces the content of the directory with
+        the content of a file written by the save method. Once
+        loaded, the directory is read-only.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        mmap : bool, optional
+            Whether the file is memory-mapped and probed in place,
+            sharing its pages with the other processes loading it,
+            rather than read into memory.
+        verify : bool, optional
+            Whether the checksum of the file is verified.
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold a directory, if its format
+            version is not supported or if its checksum does not
+            match its content.
+        """
+        with self._write_lock:
+            self._directory.load(path, mmap, verify)
+
+    def snapshot(self):
+        """This method returns a read-only copy of the directory whose
+        strong and weak matches are laid out in memory like in a file
+        written by the save method, see the FrozenIndex class. Its
+        lookups binary search sorted arrays rather than probing
+        dictionaries, and the changes later made to the directory do
+        not affect it. The snapshot of a loaded directory shares its
+        content.
+
+        Returns
+        -------
+        NameLookupDirectory
+            Returns the read-only copy of the directory.
+
+        Raises
+        ------
+        ValueError
+            If a name id is neither an integer, a float nor a string.
+        """
+        with self._write_lock:
+            frozen_index = self._directory._freeze()
+
+        directory = self._directory
+        snapshot = NameLookupDirectory(
+            directory.combination_policy,
+            directory.metaphone_matcher.cache_size,
+            metaphone_backend=directory.metaphone_matcher.backend,
+            approximate=directory.approximate
+        )
+        snapshot._directory._load_frozen_index(frozen_index)
+
+        return snapshot
+
+    def skipped_combinations(self):
+        """This method returns the number of name combinations
+        that the combination policy kept from being added to the
+        directory, for each name id whose combinations were bounded.
+
+        Returns
+        -------
+        dict {obj: int}
+            Returns a dictionary where the number of skipped
+            combinations are mapped to name ids.
+        """
+        return self._directory.skipped_combinations()
+
+    def lookup(self, name, threshold=Threshold.STRONG):
+        """This method returns the identifiers of the names
+        matching a given name. The name is normalized and its
+        double metaphone is produced once, after which only the
+        directory entries corresponding to that metaphone are
+        probed given the leniency threshold.
+
+        Parameters
+        ----------
+        name : str
+            A name to find the matches of.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the name.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+        Returns
+        -------
+        list of obj
+            Returns the deduplicated identifiers of the matching
+            names, ranked by the number of probes they were found by.
+
+        Raises
+        ------
+        ValueError
+            If the value contained by the threshold parameter is
+            not implemented by the Threshold Enum class.
+        """
+        return self._directory.lookup(
+            name, threshold
+        )
+
+    def lookup_scored(self, name, k=10, max_posting_size=None,
+                      weights=SCORE_WEIGHTS):
+        """This method scores the names of the directory sounding like
+        a given name and returns the k best scoring ones. Scores combine
+        which metaphones of the given full name match one of the name
+        ids' posted combinations, how many combination keys the names
+        share and the fraction of the given name's components those
+        shared combinations cover.
+
+        Parameters
+        ----------
+        name : str
+            A name to find the matches of.
+        k : int, optional
+            The maximum number of name ids returned. None returns every
+            matching name id.
+        max_posting_size : int, optional
+            The combination keys shared by more name ids than this are
+            not counted. None means no limit.
+        weights : tuple of float, float, float, optional
+            The weights of the metaphone pair score, of the fraction of
+            shared combination keys and of the fraction of covered
+            components.
+
+        Returns
+        -------
+        list of tuple of obj, float
+            Returns the matching name ids and their scores, best first.
+        """
+        return self._directory.lookup_scored(name, k, max_posting_size,
+                                             weights)
+
+    def lookup_approximate(self, name, max_distance=1,
+                           threshold=Threshold.STRONG):
+        """This method returns the identifiers of the names whose
+        metaphones are within a given Levenshtein distance of the
+        metaphones of a given name.
+
+        Parameters
+        ----------
+        name : str
+            A name to find the matches of.
+        max_distance : int, optional
+            The maximum number of character insertions, deletions and
+            substitutions between the metaphones.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the name.
+
+        Returns
+        -------
+        list of tuple of obj, int
+            Returns the matching name ids and the distance of their
+            closest metaphone, closest first.
+
+        Raises
+        ------
+        ValueError
+            If the directory does not hold metaphone tries, if
+            max_distance is negative or if the value contained by the
+            threshold parameter is not implemented by the Threshold
+            Enum class.
+        """
+        return self._directory.lookup_approximate(name, max_distance,
+                                                  threshold)
+
+    def lookup_components(self, name, min_shared=None):
+        """This method returns the identifiers of the names holding
+        components that sound like at least min_shared of the
+        components of a given name.
+
+        Parameters
+        ----------
+        name : str
+            A name to find the matches of.
+        min_shared : int, optional
+            The minimum number of the name's distinct component
+            metaphones a name must share. None requires all of them.
+
+        Returns
+        -------
+        list of tuple of obj, tuple of int
+            Returns the matching name ids, those sharing more components
+            first, and the positions of their matching components in
+            their normalized names.
+
+        Raises
+        ------
+        ValueError
+            If the directory does not index components or if min_shared
+            is lower than 1.
+        """
+        return self._directory.lookup_components(name, min_shared)
+
+    def lookup_many(self, names, threshold=Threshold.STRONG):
+        """This method returns the identifiers of the names
+        matching each of the given names.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            An iterable of names to find the matches of.
+        threshold : Union[Threshold, int, str], optional
+            The leniency threshold to allow when matching the names.
+            If the supplied parameter is not of the Threshold type,
+            values must be 0/WEAK, 1/NORMAL, or 2/STRONG.
+
+        Returns
+        -------
+        list of list of obj
+            Returns, for each of the names and in the same order,
+            the ranked identifiers of the matching names.
+
+        Raises
+        ------
+        ValueError
+            If the value contained by the threshold parameter is
+            not implemented by the Threshold Enum class.
+        """
+        return self._directory.lookup_many(
+            names, threshold
+        )
+
+
+class _DisjointSets(object):
+    """The _DisjointSets class is a union-find structure over hashable
+    elements, using union by size and path halving."""
+
+    def __init__(self):
+        self._parents = {}
+        self._sizes = {}
+
+    def find(self, element):
+        """Returns the representative of an element's set, adding the
+        element as a singleton if it is not known yet."""
+        parents = self._parents
+        if element not in parents:
+            parents[element] = element
+            self._sizes[element] = 1
+            return element
+
+        while parents[element] != element:
+            parents[element] = parents[parents[element]]
+            element = parents[element]
+
+        return element
+
+    def union_all(self, elements):
+        """Unites the sets of all of the elements."""
+        elements = iter(elements)
+        for first in elements:
+            root = self.find(first)
+            break
+        else:
+            return
+
+        for element in elements:
+            other = self.find(element)
+            if other == root:
+                continue
+
+            if self._sizes[root] < self._sizes[other]:
+                root, other = other, root
+            self._parents[other] = root
+            self._sizes[root] += self._sizes.pop(other)
+
+    def groups(self):
+        """Returns the elements of each set, largest set first."""
+        groups = {}
+        for element in self._parents:
+            groups.setdefault(self.find(element), []).append(element)
+
+        return sorted(groups.values(), key=len, reverse=True)
+
+
+_worker_directory = None
+
+
+def _name_keys_size(name_key, name_keys):
+    """Returns the number of bytes held by a cached name key, its
+    combinations and their double metaphones, along with the tuples
+    holding them. Components shared by several combinations are counted
+    once per combination."""
+    size = sys.getsizeof(name_key) + sys.getsizeof(name_keys)
+    if isinstance(name_key, tuple):
+        size += sum(sys.getsizeof(item) for item in name_key)
+    for keys in name_keys:
+        size += sys.getsizeof(keys) + sum(
+            sys.getsizeof(key) + sum(sys.getsizeof(item) for item in key)
+            for key in keys
+        )
+
+    return size
+
+
+def _init_index_worker(combination_policy, metaphone_cache_size, compact,
+                       metaphone_backend, index_components):
+    """Creates the directory used by a worker process to index chunks."""
+    global _worker_directory
+    _worker_directory = NameLookupDirectory._NameLookupDirectory(
+        combination_policy, metaphone_cache_size, compact=compact,
+        metaphone_backend=metaphone_backend,
+        index_components=index_components
+    )
+
+
+def _index_chunk(chunk):
+    """This function indexes a chunk of names in a worker process.
+
+    Parameters
+    ----------
+    chunk : list of tuple of str, obj
+        A list of names and their corresponding name ids.
+
+    Returns
+    -------
+    tuple of tuple of dict, dict, obj, dict and ComponentIndex
+        Returns the strong and weak matches of the chunk's partial
+        directory, its reverse index, see the _merge_partial_directory
+        method, its skipped combinations and its component index.
+    """
+    directory = _worker_directory
+    for name, name_id in chunk:
+        directory.add(name, name_id)
+
+    if directory.compact:
+        reverse_index = (directory._ids, directory._names)
+    else:
+        reverse_index = directory._metaphones_by_id
+    partial_directory = (directory._lookup_dict, reverse_index,
+                         directory._skipped_combinations,
+                         directory._component_index)
+    directory._clear()
+
+    return partial_directory
 
 
 if __name__ == "__main__":
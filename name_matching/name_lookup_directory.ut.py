@@ -1,6 +1,16 @@
+from json import dump
+import os
+import sys
+import tempfile
+import threading
 import unittest
+from unittest import mock
 
-from component_matcher import NameLookupDirectory
+from combination_policy import CombinationPolicy
+from double_metaphone import Threshold
+from instrumentation import Metrics, posting_statistics
+from name_lookup_directory import MIN_FREE_ORDINALS, NameLookupDirectory
+from name_normalizer import NameNormalizer
 
 
 class Test_NameLookupDirectory(unittest.TestCase):
@@ -55,6 +65,15 @@ class Test_NameLookupDirectory(unittest.TestCase):
 
         self.assertTrue(integrity_test)
 
+    def test_add_name_id_using_metaphone_with_repeated_name_ids(self):
+        metaphone = ('METAPHONESTRONG', 'METAPHONEWEAK')
+
+        for name_id in [3, 1, 3, 2, 1]:
+            self.lookup._add_name_id_using_metaphone(metaphone, name_id, 0)
+        strong_matches = self.lookup.strong_matches()
+
+        self.assertEqual(strong_matches[metaphone[0]], [3, 1, 2])
+
     def test_add_combinations_to_directory_and_check_if_all_metaphones_are_present(self):
         self.lookup.add_names(self.names, self.name_ids)
 
@@ -65,6 +84,737 @@ class Test_NameLookupDirectory(unittest.TestCase):
             self.assertTrue(metaphones[0] in strong_matches)
             self.assertTrue(metaphones[1] in weak_matches)
 
+    def test_lookup_with_strong_threshold(self):
+        self.lookup.add_names(self.names, self.name_ids)
+
+        output = self.lookup.lookup('Jane Doe')
+
+        self.assertEqual(output, [1, 2])
+
+    def test_lookup_with_unknown_name(self):
+        self.lookup.add_names(self.names, self.name_ids)
+
+        output = self.lookup.lookup('Robert Plant')
+
+        self.assertEqual(output, [])
+
+    def test_lookup_with_empty_name(self):
+        self.lookup.add_names(self.names, self.name_ids)
+
+        output = self.lookup.lookup(None)
+
+        self.assertEqual(output, [])
+
+    def test_lookup_with_normal_threshold_probing_alternate_metaphones(self):
+        self.lookup.add_names(['Smith', 'Schmidt'], [10, 11])
+
+        strong_output = self.lookup.lookup('Schmidt', Threshold.STRONG)
+        normal_output = self.lookup.lookup('Schmidt', 'normal')
+
+        self.assertEqual(strong_output, [11])
+        self.assertEqual(normal_output, [10])
+
+    def test_lookup_with_invalid_threshold(self):
+        with self.assertRaises(ValueError) as _:
+            self.lookup.lookup('Jane Doe', 'foo')
+
+    def test_lookup_many_with_repeated_names(self):
+        self.lookup.add_names(self.names, self.name_ids)
+
+        names = ['Janis Doe', 'Led Zeppelin', 'JANIS  DOE']
+        output = self.lookup.lookup_many(names)
+
+        self.assertEqual(output, [[3], [0], [3]])
+
+    def test_add_with_bounded_combination_policy(self):
+        policy = CombinationPolicy(max_combinations=2)
+        lookup = NameLookupDirectory._NameLookupDirectory(policy)
+
+        lookup.add_names(['Led Zeppelin', 'John Paul Jones', 'Plant'],
+                         [0, 1, 2])
+
+        self.assertEqual(lookup.skipped_combinations(), {0: 1, 1: 5})
+        self.assertEqual(lookup.lookup('John Paul Jones'), [1])
+        self.assertEqual(lookup.lookup('Paul'), [])
+
+    def test_add_with_first_last_combination_policy(self):
+        policy = CombinationPolicy('first_last')
+        for compact in (False, True):
+            lookup = NameLookupDirectory._NameLookupDirectory(
+                policy, compact=compact, key_cache_size=8
+            )
+
+            lookup.add_names(['Zoe Anne Smith', 'Anne Smith'], [0, 1])
+
+            self.assertEqual(lookup.lookup('Smith Zoe'), [0])
+            self.assertEqual(lookup.lookup('Zoe Anne'), [])
+            self.assertEqual(lookup.lookup_scored('Zoe Anne Smith')[0][0], 0)
+
+            lookup.remove(0)
+            lookup.remove(1)
+
+            self.assertEqual(lookup.strong_matches(), {})
+            self.assertEqual(lookup.weak_matches(), {})
+
+    def test_add_with_default_combination_policy(self):
+        self.lookup.add_names(self.names, self.name_ids)
+
+        self.assertEqual(self.lookup.skipped_combinations(), {})
+
+    def test_add_names_with_workers_matching_serial_ingest(self):
+        policy = CombinationPolicy(max_combinations=3)
+        names = self.names + ['John Paul Jones', 'Jon Doe', 'Plant']
+        name_ids = self.name_ids + [4, 2, 0]
+        serial = NameLookupDirectory._NameLookupDirectory(policy)
+        parallel = NameLookupDirectory._NameLookupDirectory(policy)
+
+        serial.add_names(names, name_ids)
+        parallel.add_names(iter(names), iter(name_ids), workers=2,
+                           chunksize=2)
+
+        self.assertEqual(list(parallel.strong_matches().items()),
+                         list(serial.strong_matches().items()))
+        self.assertEqual(list(parallel.weak_matches().items()),
+                         list(serial.weak_matches().items()))
+        self.assertEqual(parallel.skipped_combinations(),
+                         serial.skipped_combinations())
+
+    def test_add_names_with_invalid_workers(self):
+        with self.assertRaises(ValueError) as _:
+            self.lookup.add_names(self.names, self.name_ids, workers=0)
+
+    def test_save_and_load_with_memory_mapped_file(self):
+        self.lookup.add_names(self.names, self.name_ids)
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+
+        try:
+            self.lookup.save(path)
+            loaded = NameLookupDirectory._NameLookupDirectory()
+            loaded.load(path, mmap=True)
+
+            self.assertEqual(loaded.strong_matches(),
+                             self.lookup.strong_matches())
+            self.assertEqual(loaded.weak_matches(),
+                             self.lookup.weak_matches())
+            self.assertEqual(loaded.lookup('Jane Doe'), [1, 2])
+            with self.assertRaises(ValueError) as _:
+                loaded.add('Robert Plant', 4)
+        finally:
+            os.remove(path)
+
+
+class TestNameLookupDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.names = ['Led Zeppelin', 'John Doe', 'Jane Doe', 'Janis Doe']
+        self.name_ids = [0, 1, 2, 3]
+
+    def test_init_with_independent_instances(self):
+        directory1 = NameLookupDirectory()
+        directory2 = NameLookupDirectory()
+
+        directory1.add_names(self.names, self.name_ids)
+
+        self.assertEqual(directory1.lookup('Jane Doe'), [1, 2])
+        self.assertEqual(directory2.lookup('Jane Doe'), [])
+
+    def test_add_names_with_metaphone_cache(self):
+        directory = NameLookupDirectory(metaphone_cache_size=100)
+
+        directory.add_names(self.names, self.name_ids)
+        cache_info = directory._directory.metaphone_matcher.cache_info()
+
+        self.assertEqual(directory.lookup('Jane Doe'), [1, 2])
+        self.assertGreater(cache_info['hits'], 0)
+
+    def test_remove_with_shared_metaphones(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names, self.name_ids)
+
+        removed = directory.remove(1)
+        removed_again = directory.remove(1)
+
+        self.assertTrue(removed)
+        self.assertFalse(removed_again)
+        self.assertEqual(directory.lookup('John Doe'), [2])
+        self.assertEqual(directory.strong_matches()['T'], [2, 3])
+        self.assertNotIn(1, directory._directory._metaphones_by_id)
+
+    def test_remove_with_empty_postings(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names, self.name_ids)
+
+        directory.remove(0)
+
+        self.assertNotIn('LTSPLN', directory.strong_matches())
+        self.assertNotIn('LT', directory.strong_matches())
+        self.assertEqual(directory.weak_matches()[''], [1, 2, 3])
+
+    def test_update_with_new_name(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names, self.name_ids)
+
+        directory.update(0, 'Jon Doe')
+        directory.update(4, 'Jimmy Page')
+
+        self.assertEqual(directory.lookup('John Doe'), [1, 2, 0])
+        self.assertEqual(directory.lookup('Led Zeppelin'), [])
+        self.assertEqual(directory.lookup('Jimmy Page'), [4])
+
+    def test_remove_with_parallel_ingest(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names, self.name_ids, workers=2,
+                            chunksize=1)
+
+        directory.remove(2)
+
+        self.assertEqual(directory.lookup('Jane Doe'), [1])
+
+    def test_remove_with_loaded_directory(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names, self.name_ids)
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            directory.save(path)
+            loaded = NameLookupDirectory()
+            loaded.load(path)
+
+            with self.assertRaises(ValueError) as _:
+                loaded.remove(1)
+            del loaded
+        finally:
+            os.remove(path)
+
+    def test_lookup_with_compact_directory(self):
+        names = self.names + ['Smith', 'Schmidt', 'Jon Doe', 'Jane Doe']
+        name_ids = self.name_ids + ['a', 'b', 4, 2]
+        directory = NameLookupDirectory()
+        compact = NameLookupDirectory(compact=True)
+
+        directory.add_names(names, name_ids)
+        compact.add_names(names, name_ids)
+
+        for name in names:
+            for threshold in ['normal', 'strong']:
+                self.assertEqual(compact.lookup(name, threshold),
+                                 directory.lookup(name, threshold))
+        self.assertEqual(compact.lookup('Schmidt', 'weak'), ['b'])
+        self.assertEqual(compact.lookup('Led Zeppelin', 'weak'), [])
+        self.assertEqual(compact.strong_matches(),
+                         directory.strong_matches())
+        self.assertNotIn('', compact.weak_matches())
+        self.assertEqual(compact.find_duplicate_groups(),
+                         directory.find_duplicate_groups())
+
+    def test_add_names_with_compact_workers_matching_serial_ingest(self):
+        names = self.names * 3 + ['Jon Doe']
+        name_ids = list(range(12)) + [1]
+        serial = NameLookupDirectory(compact=True)
+        parallel = NameLookupDirectory(compact=True)
+
+        serial.add_names(names, name_ids)
+        parallel.add_names(names, name_ids, workers=2, chunksize=5)
+
+        self.assertEqual(parallel.strong_matches(), serial.strong_matches())
+        self.assertEqual(parallel.weak_matches(), serial.weak_matches())
+
+    def test_update_with_compact_directory(self):
+        directory = NameLookupDirectory(compact=True)
+        directory.add_names(self.names, self.name_ids)
+
+        removed = directory.remove(0)
+        directory.update(1, 'Jimmy Page')
+
+        self.assertTrue(removed)
+        self.assertEqual(directory.lookup('Led Zeppelin'), [])
+        self.assertEqual(directory.lookup('Jane Doe'), [2])
+        self.assertEqual(directory.lookup('Jimmy Page'), [1])
+        self.assertNotIn('LTSPLN', directory.strong_matches())
+
+    def test_update_with_compact_directory_reusing_ordinals(self):
+        directory = NameLookupDirectory(compact=True)
+        directory.add_names(self.names, self.name_ids)
+
+        for _ in range(3):
+            directory.update(1, 'Jimmy Page')
+            directory.update(2, 'Jane Doe')
+        for name_id in range(10, 12 + MIN_FREE_ORDINALS):
+            directory.add('Robert Plant', name_id)
+            directory.remove(name_id)
+        size = len(directory._directory._ids)
+        directory.add('John Bonham', 4)
+
+        self.assertEqual(size, len(self.names) + MIN_FREE_ORDINALS + 1)
+        self.assertEqual(len(directory._directory._ids), size)
+        self.assertEqual(directory.lookup('Jane Doe'), [2])
+        self.assertEqual(directory.lookup('John Bonham'), [4])
+        self.assertEqual(directory.lookup('Robert Plant'), [])
+
+    def test_save_with_compact_directory(self):
+        directory = NameLookupDirectory(compact=True)
+        directory.add_names(self.names, ['a', 'b', 'c', 'd'])
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            directory.save(path)
+            loaded = NameLookupDirectory()
+            loaded.load(path, mmap=False)
+
+            self.assertEqual(loaded.lookup('Jane Doe'), ['b', 'c'])
+            self.assertEqual(loaded.strong_matches(),
+                             directory.strong_matches())
+        finally:
+            os.remove(path)
+
+    def test_memory_usage_with_compact_directory(self):
+        names = ['{} Doe'.format(i) for i in range(200)]
+        directory = NameLookupDirectory()
+        compact = NameLookupDirectory(compact=True)
+
+        directory.add_names(names, range(1000, 1200))
+        compact.add_names(names, range(1000, 1200))
+        usage = directory.memory_usage()
+        compact_usage = compact.memory_usage()
+
+        self.assertEqual(usage['total'], sum(
+            size for structure, size in usage.items() if structure != 'total'
+        ))
+        self.assertLess(compact_usage['weak_matches'],
+                        usage['weak_matches'])
+        self.assertLess(compact_usage['total'], usage['total'])
+
+    def test_lookup_scored_with_k(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names + ['Jon Smith', 'Doe'],
+                            self.name_ids + [4, 5])
+
+        output = directory.lookup_scored('Jane Doe', k=3)
+        all_output = directory.lookup_scored('Jane Doe', k=None)
+
+        self.assertEqual(output[:2], [(1, 1.0), (2, 1.0)])
+        self.assertEqual([name_id for name_id, _ in all_output],
+                         [1, 2, 3, 5, 4])
+        self.assertAlmostEqual(all_output[2][1], 0.25 / 3 + 0.25 / 2)
+        self.assertEqual(output, all_output[:3])
+
+    def test_lookup_scored_with_max_posting_size(self):
+        directory = NameLookupDirectory(compact=True)
+        directory.add_names(self.names + ['Jon Smith', 'Doe'],
+                            self.name_ids + [4, 5])
+
+        output = directory.lookup_scored('Jane Doe', max_posting_size=3)
+
+        self.assertEqual([name_id for name_id, _ in output], [1, 2, 4])
+        self.assertAlmostEqual(output[0][1], 0.5 + 0.25 * 2 / 3 + 0.25)
+        self.assertAlmostEqual(output[2][1], 0.25 / 3 + 0.25 / 2)
+
+    def test_lookup_components_with_min_shared(self):
+        directory = NameLookupDirectory(
+            combination_policy=CombinationPolicy(max_combinations=1),
+            index_components=True
+        )
+        directory.add_names(self.names + ['Jon Smith', 'Doe'],
+                            self.name_ids + [4, 5])
+
+        output = directory.lookup_components('Jane Smith')
+        one_output = directory.lookup_components('Jane Smith', 1)
+
+        self.assertEqual(directory.lookup('Jon'), [])
+        self.assertEqual(output, [(4, (0, 1))])
+        self.assertEqual(one_output, [(4, (0, 1)), (1, (1,)), (2, (1,))])
+
+    def test_lookup_components_with_workers_and_remove(self):
+        names = self.names * 3 + ['Jon Doe']
+        name_ids = list(range(12)) + [1]
+        serial = NameLookupDirectory(index_components=True)
+        parallel = NameLookupDirectory(index_components=True)
+
+        serial.add_names(names, name_ids)
+        parallel.add_names(names, name_ids, workers=2, chunksize=5)
+        output = parallel.lookup_components('Jane Doe')
+        parallel.remove(1)
+
+        self.assertEqual(output, serial.lookup_components('Jane Doe'))
+        self.assertEqual([name_id for name_id, _ in output],
+                         [1, 2, 5, 6, 9, 10])
+        self.assertNotIn(1, [name_id for name_id, _
+                             in parallel.lookup_components('Jane Doe')])
+        self.assertIn('component_index', parallel.memory_usage())
+
+    def test_lookup_components_with_invalid_parameters(self):
+        directory = NameLookupDirectory(index_components=True)
+
+        with self.assertRaises(ValueError) as _:
+            directory.lookup_components('Jane Doe', 0)
+        with self.assertRaises(ValueError) as _:
+            NameLookupDirectory().lookup_components('Jane Doe')
+
+    def test_lookup_approximate_with_typo(self):
+        directory = NameLookupDirectory(approximate=True)
+        directory.add_names(self.names, self.name_ids)
+
+        output = directory.lookup_approximate('Led Zeppelim')
+        exact_output = directory.lookup_approximate('Jane Doe', 0)
+
+        self.assertEqual(directory.lookup('Led Zeppelim'), [])
+        self.assertEqual(output, [(0, 1)])
+        self.assertEqual(exact_output, [(1, 0), (2, 0)])
+
+    def test_lookup_approximate_with_compact_remove(self):
+        directory = NameLookupDirectory(compact=True, approximate=True)
+        directory.add_names(self.names, self.name_ids)
+
+        directory.remove(0)
+
+        self.assertEqual(directory.lookup_approximate('Led Zeppelim'), [])
+        self.assertIn('metaphone_tries', directory.memory_usage())
+
+    def test_lookup_approximate_with_workers_and_loaded_directory(self):
+        directory = NameLookupDirectory(approximate=True)
+        directory.add_names(self.names, self.name_ids, workers=2,
+                            chunksize=2)
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            directory.save(path)
+            loaded = NameLookupDirectory(approximate=True)
+            loaded.load(path)
+
+            output = loaded.lookup_approximate('Janis Do', 1, 'weak')
+        finally:
+            os.remove(path)
+
+        self.assertEqual(output,
+                         directory.lookup_approximate('Janis Do', 1, 'weak'))
+        self.assertEqual(output, [(3, 0), (1, 1), (2, 1)])
+
+    def test_lookup_approximate_with_invalid_parameters(self):
+        directory = NameLookupDirectory(approximate=True)
+
+        with self.assertRaises(ValueError) as _:
+            directory.lookup_approximate('Jane Doe', -1)
+        with self.assertRaises(ValueError) as _:
+            directory.lookup_approximate('Jane Doe', 1, 'foo')
+        with self.assertRaises(ValueError) as _:
+            NameLookupDirectory().lookup_approximate('Jane Doe')
+
+    def test_metrics_snapshot_with_metrics(self):
+        metrics = Metrics()
+        directory = NameLookupDirectory(metaphone_cache_size=100,
+                                        metrics=metrics)
+
+        directory.add_names(self.names, self.name_ids)
+        directory.lookup_many(['Jane Doe', 'John Doe'])
+        snapshot = directory.metrics_snapshot()
+
+        self.assertEqual(snapshot['counters'], {
+            'names_added': 4, 'combinations_generated': 12,
+            'combinations_skipped': 0, 'lookups': 2
+        })
+        self.assertEqual(snapshot['stages']['posting_insert']['calls'], 4)
+        self.assertGreater(snapshot['metaphone_cache']['hits'], 0)
+        self.assertEqual(snapshot['postings']['strong']['largest'][0],
+                         ('T', 3))
+        self.assertIn('name_matching_lookups_total 2',
+                      directory.metrics_prometheus().splitlines())
+
+    def test_metrics_snapshot_without_metrics(self):
+        directory = NameLookupDirectory()
+
+        directory.add_names(self.names, self.name_ids)
+        snapshot = directory.metrics_snapshot()
+
+        self.assertEqual(snapshot['stages'], {})
+        self.assertEqual(snapshot['counters'], {})
+        self.assertNotIn('metaphone_cache', snapshot)
+        self.assertEqual(snapshot['postings']['strong']['count'],
+                         len(directory.strong_matches()))
+
+    def test_metrics_snapshot_with_cached_posting_statistics(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names[:2], self.name_ids[:2])
+
+        def postings():
+            return posting_statistics(directory.strong_matches())
+
+        with mock.patch('name_lookup_directory.posting_statistics',
+                        side_effect=posting_statistics) as statistics:
+            first = directory.metrics_snapshot()
+            first['postings']['strong']['count'] = -1
+            second = directory.metrics_snapshot()
+            calls = statistics.call_count
+            directory.add('Jane Doe', 2)
+            third = directory.metrics_snapshot()
+            expected = postings()
+            directory.remove(0)
+            fourth = directory.metrics_snapshot()
+
+        self.assertEqual(calls, 2)
+        self.assertEqual(statistics.call_count, 6)
+        self.assertNotEqual(second['postings']['strong']['count'], -1)
+        self.assertEqual(third['postings']['strong'], expected)
+        self.assertEqual(fourth['postings']['strong'], postings())
+
+    def test_metrics_snapshot_with_normalizer_and_key_caches(self):
+        metrics = Metrics()
+        directory = NameLookupDirectory(compact=True, metrics=metrics,
+                                        normalizer_cache_size=10,
+                                        key_cache_size=10)
+        uncached = NameLookupDirectory(compact=True)
+
+        for target in (directory, uncached):
+            target.add_names(self.names * 2, self.name_ids * 2)
+            target.update(1, 'Jane Doe')
+        output = directory.lookup_scored('Jane Doe', k=None)
+        snapshot = directory.metrics_snapshot()
+
+        self.assertEqual(directory.strong_matches(),
+                         uncached.strong_matches())
+        self.assertEqual(output, uncached.lookup_scored('Jane Doe', k=None))
+        self.assertEqual(snapshot['key_cache']['hits'], 7)
+        self.assertEqual(snapshot['normalizer_cache']['hits'], 6)
+        self.assertIn('name_matching_key_cache_hits_total 7',
+                      directory.metrics_prometheus().splitlines())
+
+    def test_metrics_snapshot_with_caches_bounded_in_bytes(self):
+        directory = NameLookupDirectory(normalizer_cache_bytes=2000,
+                                        key_cache_bytes=5000)
+
+        directory.add_names(['Jane Doe {}'.format(chr(97 + i))
+                             for i in range(26)], range(26))
+        snapshot = directory.metrics_snapshot()
+
+        for cache in ('normalizer_cache', 'key_cache'):
+            self.assertLessEqual(snapshot[cache]['bytes'],
+                                 snapshot[cache]['max_bytes'])
+            self.assertGreater(snapshot[cache]['evictions'], 0)
+        self.assertIsNone(snapshot['key_cache']['max_entries'])
+        self.assertIn('name_matching_key_cache_bytes',
+                      directory.metrics_prometheus())
+
+    def test_find_duplicate_groups_with_strong_threshold(self):
+        directory = NameLookupDirectory()
+        directory.add_names(['Jane Doe', 'Led Zeppelin', 'John Doe',
+                             'Janis Joplin', 'Jimmy Page', 'Page'],
+                            [0, 1, 2, 3, 4, 5])
+
+        output = directory.find_duplicate_groups()
+
+        self.assertEqual(output, [[0, 2], [4, 5]])
+
+    def test_find_duplicate_groups_with_max_posting_size(self):
+        directory = NameLookupDirectory()
+        directory.add_names(['Jane Doe', 'John Doe', 'Jim Doe', 'Jim Beam'],
+                            [0, 1, 2, 3])
+
+        output = directory.find_duplicate_groups(max_posting_size=2,
+                                                 min_size=1)
+
+        self.assertEqual(output, [[0, 1], [2, 3]])
+
+    def test_find_duplicate_groups_with_normal_threshold(self):
+        directory = NameLookupDirectory()
+        directory.add_names(['Smith', 'Schmidt', 'Smyth', 'Jones'],
+                            [0, 1, 2, 3])
+
+        normal_output = directory.find_duplicate_groups('normal')
+        strong_output = directory.find_duplicate_groups(Threshold.STRONG)
+
+        self.assertEqual(normal_output, [[1, 0]])
+        self.assertEqual(strong_output, [[0, 2]])
+
+    def test_find_duplicate_groups_with_normal_matching_pairs(self):
+        names = ['Smith', 'Schmidt', 'Smyth', 'John', 'Jon', 'Anne', 'Ian',
+                 'Gene', 'Jean']
+        for compact in (False, True):
+            directory = NameLookupDirectory(compact=compact)
+            directory.add_names(names, range(len(names)))
+
+            groups = directory.find_duplicate_groups('normal')
+
+            self.assertEqual(groups, [[1, 0], [5, 3], [6, 4]])
+            for group in groups:
+                for name_id in group:
+                    for other in group:
+                        if other != name_id:
+                            self.assertIn(other, directory.lookup(
+                                names[name_id], Threshold.NORMAL
+                            ))
+
+    def test_ingest_file_with_jsonl_file(self):
+        directory = NameLookupDirectory()
+        handle, path = tempfile.mkstemp()
+        with os.fdopen(handle, 'w') as f:
+            for name, name_id in zip(self.names, self.name_ids):
+                f.write('{{"id": {}, "name": "{}"}}\n'.format(name_id, name))
+            f.write('{"name": "Robert Plant"}\n')
+        progress = []
+
+        try:
+            stats = directory.ingest_file(path, 'name', 'id', format='jsonl',
+                                          batch_size=3,
+                                          progress=progress.append)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(directory.lookup('Jane Doe'), [1, 2])
+        self.assertEqual((stats.rows, stats.rows_skipped), (4, 1))
+        self.assertEqual(len(progress), 2)
+
+    def test_ingest_file_with_workers(self):
+        directory = NameLookupDirectory()
+        serial = NameLookupDirectory()
+        handle, path = tempfile.mkstemp()
+        with os.fdopen(handle, 'w') as f:
+            f.write('id,name\n')
+            for name, name_id in zip(self.names * 3, range(12)):
+                f.write('{},{}\n'.format(name_id, name))
+        progress = []
+
+        try:
+            pools = []
+            add_names_in_parallel = directory._directory._add_names_in_parallel
+            directory._directory._add_names_in_parallel = \
+                lambda *args: pools.append(args) or \
+                add_names_in_parallel(*args)
+            stats = directory.ingest_file(
+                path, 'name', 'id', batch_size=2, id_type=int, workers=2,
+                progress=lambda stats: progress.append(stats.rows)
+            )
+            serial.ingest_file(path, 'name', 'id', id_type=int)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(len(pools), 1)
+        self.assertEqual(len(progress), 6)
+        self.assertEqual(stats.rows, 12)
+        self.assertEqual(directory.strong_matches(), serial.strong_matches())
+
+    def test_default_with_shared_instance(self):
+        self.assertIs(NameLookupDirectory.default(),
+                      NameLookupDirectory.default())
+
+    def test_swap_with_rebuilt_directory(self):
+        live = NameLookupDirectory()
+        live.add('John Doe', 1)
+        rebuilt = NameLookupDirectory()
+        rebuilt.add_names(self.names, self.name_ids)
+
+        live.swap(rebuilt)
+
+        self.assertEqual(live.lookup('Janis Doe'), [3])
+        self.assertEqual(rebuilt.strong_matches(), {
+            'TJN': [1], 'T': [1], 'JN': [1]
+        })
+
+    def test_reload_normalization_with_two_directories(self):
+        path = tempfile.mkdtemp()
+        abbreviations = os.path.join(path, 'abbreviations.json')
+        titles = os.path.join(path, 'titles.json')
+        with open(abbreviations, 'w') as f:
+            dump({'abbreviations': {}}, f)
+        with open(titles, 'w') as f:
+            dump([], f)
+
+        try:
+            directory1 = NameLookupDirectory()
+            directory2 = NameLookupDirectory()
+            for directory in (directory1, directory2):
+                directory._directory.normalizer = NameNormalizer(
+                    abbreviations, titles
+                )
+                directory.add('Led Zeppelin', 0)
+            before = directory2.lookup('Sir Led Zeppelin')
+            with open(titles, 'w') as f:
+                dump(['sir'], f)
+            directory1.reload_normalization()
+            after = directory2.lookup('Sir Led Zeppelin')
+        finally:
+            os.remove(abbreviations)
+            os.remove(titles)
+            os.rmdir(path)
+
+        self.assertEqual((before, after), ([], [0]))
+
+    def test_snapshot_with_later_writes(self):
+        directory = NameLookupDirectory()
+        directory.add_names(self.names, self.name_ids)
+
+        snapshot = directory.snapshot()
+        directory.remove(2)
+        directory.add('Jane Doe', 4)
+
+        self.assertEqual(snapshot.lookup('Jane Doe'), [1, 2])
+        self.assertEqual(directory.lookup('Jane Doe'), [1, 4])
+        with self.assertRaises(ValueError) as _:
+            snapshot.add('Jane Doe', 5)
+
+    def test_lookup_with_concurrent_rebuilds(self):
+        live = NameLookupDirectory()
+        live.add_names(self.names, self.name_ids)
+        errors = []
+        results = []
+
+        def query():
+            try:
+                for _ in range(200):
+                    results.append(live.lookup('Jane Doe'))
+            except Exception as e:
+                errors.append(e)
+
+        def rebuild():
+            for i in range(20):
+                rebuilt = NameLookupDirectory()
+                rebuilt.add_names(self.names + ['Jon Doe'] * 50,
+                                  self.name_ids + list(range(i, i + 50)))
+                live.swap(rebuilt)
+                live.add('Joan Doe', 100 + i)
+
+        threads = [threading.Thread(target=query) for _ in range(4)]
+        threads.append(threading.Thread(target=rebuild))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(result[:2] == [1, 2] for result in results))
+
+    def test_lookup_with_concurrent_removes(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        for compact in (False, True):
+            directory = NameLookupDirectory(compact=compact)
+            directory.add_names(['Jane Doe'] * 2000, range(2000))
+            errors = []
+            results = []
+            done = threading.Event()
+
+            def query():
+                try:
+                    while not done.is_set():
+                        results.append(directory.lookup('Jane Doe'))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=query) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for name_id in range(200):
+                directory.remove(name_id)
+                directory.update(name_id + 1, 'Jane Doe')
+                directory.add('Jane Doe', name_id + 1000)
+            done.set()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertFalse(any(None in result for result in results))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,28 +1,223 @@
+from itertools import islice
 from json import load
+import os
 import re
+import sys
+from threading import Lock
+from types import MappingProxyType
 
 from unidecode import unidecode
 
+from bounded_cache import BoundedCache, Eviction
 
-class NameNormalizer(object):
-    """The NameNormalizer class is used to cleanse names before they
-    are compared.
+
+DEFAULT_BATCH_SIZE = 1024
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+LOWER_NAME_SPLITTER = re.compile(r'[a-z]+')
+
+
+class NormalizationResources(object):
+    """The NormalizationResources class holds the immutable titles and
+    abbreviations used by NameNormalizer instances. Resources loaded
+    from the same files are parsed once per modification of the files
+    and shared by every normalizer using them.
+
+    Parameters
+    ----------
+    abbreviations : dict {str: str}
+        The expanded forms of name abbreviations.
+    titles : Iterable of str
+        The titles removed from names.
     """
-    ABBREVIATIONS = 'abbreviations.json'
-    TITLES = 'titles.json'
-    NAME_SPLITTER = re.compile(r'[A-Za-z]+')
+    # The entry of each pair of files is a list of their modification
+    # times and their resources, updated in place when they are parsed
+    # again so that every normalizer holding it sees the new resources
+    __loaded = {}
+    __lock = Lock()
+
+    def __init__(self, abbreviations, titles):
+        self.abbreviations = MappingProxyType(dict(abbreviations))
+        self.titles = frozenset(titles)
+        self._compile_lookups()
+
+    @staticmethod
+    def load(abbreviations_path, titles_path, force=False):
+        """This method returns the resources parsed from an abbreviations
+        file and a titles file. The files are only parsed again when they
+        were modified since they were last parsed, or when forced.
+
+        Parameters
+        ----------
+        abbreviations_path : str
+            The path of the JSON abbreviations file.
+        titles_path : str
+            The path of the JSON titles file.
+        force : bool, optional
+            Whether the files are parsed even if they were not modified.
+
+        Returns
+        -------
+        NormalizationResources
+            Returns the resources shared by the normalizers using the
+            same files.
+        """
+        return NormalizationResources._shared(abbreviations_path,
+                                              titles_path, force)[1]
 
-    def __init__(self, abbreviations=ABBREVIATIONS, titles=TITLES):
-        abbreviations_dict = NameNormalizer.__load(abbreviations)
-        self.abbreviations = abbreviations_dict['abbreviations']
-        self.titles = set(NameNormalizer.__load(titles))
+    @staticmethod
+    def _shared(abbreviations_path, titles_path, force=False):
+        """This method returns the entry of an abbreviations file and a
+        titles file, a list of their modification times and of their
+        resources, parsing them as the load method does. The entry is
+        the same for every caller and is updated in place whenever the
+        files are parsed again.
+
+        Parameters
+        ----------
+        abbreviations_path : str
+            The path of the JSON abbreviations file.
+        titles_path : str
+            The path of the JSON titles file.
+        force : bool, optional
+            Whether the files are parsed even if they were not modified.
+
+        Returns
+        -------
+        list
+            Returns the shared entry of the files.
+        """
+        paths = (os.path.abspath(abbreviations_path),
+                 os.path.abspath(titles_path))
+        mtimes = tuple(os.stat(path).st_mtime_ns for path in paths)
+
+        with NormalizationResources.__lock:
+            loaded = NormalizationResources.__loaded.get(paths)
+            if loaded is None:
+                loaded = NormalizationResources.__loaded[paths] = [None, None]
+            if force or loaded[0] != mtimes:
+                abbreviations = NormalizationResources.__load(paths[0])
+                loaded[1] = NormalizationResources(
+                    abbreviations['abbreviations'],
+                    NormalizationResources.__load(paths[1])
+                )
+                loaded[0] = mtimes
+
+            return loaded
 
     @staticmethod
     def __load(file_path):
-        """Loads JSON files during the object's instantiation."""
+        """Loads JSON files."""
         with open(file_path, 'r') as f:
             return load(f)
 
+    def _compile_lookups(self):
+        """This method precompiles the titles and abbreviations used by
+        the fused normalization. Name components only ever are lower
+        case letters, so the titles and abbreviations which are not
+        cannot match them and are left out.
+        """
+        is_component = LOWER_NAME_SPLITTER.fullmatch
+
+        self.component_titles = frozenset(
+            title for title in self.titles
+            if isinstance(title, str) and is_component(title)
+        )
+        self.component_abbreviations = MappingProxyType({
+            abbreviation: expansion
+            for abbreviation, expansion in self.abbreviations.items()
+            if is_component(abbreviation)
+        })
+
+
+class NameNormalizer(object):
+    """The NameNormalizer class is used to cleanse names before they
+    are compared. The default abbreviations and titles files are the
+    ones of the package's directory, whatever the current working
+    directory. The parsed files are shared by every normalizer using
+    them, see the NormalizationResources class, and each name is
+    normalized with the resources last parsed from them.
+
+    Parameters
+    ----------
+    abbreviations : str, optional
+        The path of the JSON abbreviations file.
+    titles : str, optional
+        The path of the JSON titles file.
+    fused : bool, optional
+        Whether the normalization steps are fused into a single pass.
+    cache_size : int, optional
+        The maximum number of normalized names memoized by the
+        normalize_name method, keyed by the raw names. None, along
+        with cache_bytes, disables the cache.
+    cache_bytes : int, optional
+        The maximum number of bytes held by the memoized names. None
+        means no limit.
+    cache_eviction : Union[Eviction, str], optional
+        The eviction policy of the cache, LRU or CLOCK.
+
+    Raises
+    ------
+    ValueError
+        If cache_size or cache_bytes are lower than 1 or if the
+        eviction policy is not implemented by the Eviction Enum class.
+    """
+    ABBREVIATIONS = os.path.join(PACKAGE_DIRECTORY, 'abbreviations.json')
+    TITLES = os.path.join(PACKAGE_DIRECTORY, 'titles.json')
+    NAME_SPLITTER = re.compile(r'[A-Za-z]+')
+    LOWER_NAME_SPLITTER = LOWER_NAME_SPLITTER
+
+    def __init__(self, abbreviations=ABBREVIATIONS, titles=TITLES,
+                 fused=True, cache_size=None, cache_bytes=None,
+                 cache_eviction=Eviction.LRU):
+        self._paths = (abbreviations, titles)
+        self._shared = NormalizationResources._shared(abbreviations, titles)
+        self.fused = fused
+        self._cache = None
+        self._cached_resources = None
+        if cache_size is not None or cache_bytes is not None:
+            self._cache = BoundedCache(cache_size, cache_eviction,
+                                       cache_bytes, _entry_size)
+
+    @property
+    def _resources(self):
+        """The resources last parsed from the normalizer's files."""
+        return self._shared[1]
+
+    @property
+    def abbreviations(self):
+        """The immutable expanded forms of name abbreviations."""
+        return self._resources.abbreviations
+
+    @property
+    def titles(self):
+        """The immutable titles removed from names."""
+        return self._resources.titles
+
+    def reload(self):
+        """This method parses the normalizer's abbreviations and titles
+        files again and swaps them in for every normalizer using the
+        same files, so that a long-running process picks up their
+        changes. Names being normalized concurrently use either the
+        previous or the new resources.
+        """
+        NormalizationResources.load(*self._paths, force=True)
+
+    def cache_info(self):
+        """This method returns the counters of the normalizer's cache.
+
+        Returns
+        -------
+        dict {str: int}
+            Returns the number of hits, misses and evictions of the
+            cache along with its number of entries and its capacity,
+            see the BoundedCache.stats method, or None if the cache is
+            disabled.
+        """
+        if self._cache is None:
+            return None
+
+        return self._cache.stats()
+
     def normalize_name(self, name):
         """This method is designed to cleanse a name so that it may be
         compared with others in a normalized way. The cleansing process:
@@ -33,6 +228,16 @@ class NameNormalizer(object):
             - expands name abbreviations to their full form
             - concatenates the components into a string
 
+        Unless the normalizer was created with fused set to False, the
+        steps are fused into a single pass which skips re-encoding pure
+        ASCII names and produces the same output.
+
+        When the normalizer's cache is enabled, the normalized names are
+        memoized, keyed by the raw names and by the titles and
+        abbreviations they were normalized with. The names cached
+        before the resources were reloaded are thus never returned, and
+        they are dropped once a name is normalized with the new ones.
+
         Parameters
         ----------
         str
@@ -47,6 +252,79 @@ class NameNormalizer(object):
         if name is None or not isinstance(name, str):
             return ''
 
+        cache = self._cache
+        if cache is None:
+            return self._normalize_name(name)
+
+        resources = self._resources
+        if resources is not self._cached_resources:
+            self._cached_resources = resources
+            cache.clear()
+
+        key = (name, resources)
+        norm_name = cache.get(key)
+        if norm_name is None:
+            norm_name = self._normalize_name(name)
+            # A name normalized while the resources were reloaded is
+            # not cached, as they may have been mixed
+            if self._resources is resources:
+                cache.put(key, norm_name)
+
+        return norm_name
+
+    def normalize_name_in_order(self, name):
+        """This method normalizes a name like the normalize_name method
+        does, without its cache, and also returns the order its
+        components were written in, so that the combinations of
+        adjacent components can be taken in that order.
+
+        Parameters
+        ----------
+        name : str
+            Corresponds to a name.
+
+        Returns
+        -------
+        str, tuple of int
+            Returns the normalized name followed by the positions of its
+            components in it, in the order they were written in. The
+            positions are None if the components were written in the
+            normalized order.
+        """
+        if name is None or not isinstance(name, str):
+            return '', None
+
+        if not name.isascii():
+            name = unidecode(name)
+
+        resources = self._resources
+        titles = resources.component_titles
+        abbreviations = resources.component_abbreviations
+        names = [
+            name for name in
+            NameNormalizer.LOWER_NAME_SPLITTER.findall(name.lower())
+            if name not in titles
+        ]
+        written = sorted(range(len(names)), key=names.__getitem__)
+
+        norm_name = ' '.join([
+            abbreviations.get(names[i], names[i]) for i in written
+        ])
+        if all(i == position for position, i in enumerate(written)):
+            return norm_name, None
+
+        order = [0] * len(written)
+        for position, i in enumerate(written):
+            order[i] = position
+
+        return norm_name, tuple(order)
+
+    def _normalize_name(self, name):
+        """Normalizes a name without caching, see the normalize_name
+        method."""
+        if self.fused:
+            return self._normalize_name_fused(name)
+
         name = self._normalize_unicode_to_ascii(name)
 
         name = self._to_lower(name)
@@ -61,6 +339,211 @@ class NameNormalizer(object):
 
         return ' '.join(name for name in names)
 
+    def normalize_names(self, names, batch_size=DEFAULT_BATCH_SIZE):
+        """This method lazily normalizes an iterable of names. The
+        names are consumed in batches within which repeated names are
+        only normalized once and the names needing to be re-encoded in
+        ASCII are re-encoded together. The normalizer's cache is not
+        used, so that bulk normalization does not evict the names that
+        are looked up repeatedly.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            Corresponds to an iterable of names.
+        batch_size : int, optional
+            The number of names normalized together.
+
+        Yields
+        ------
+        str
+            The normalized form of each name, in the same order as the
+            names. See the normalize_name method for details.
+
+        Raises
+        ------
+        ValueError
+            If batch_size is lower than 1.
+        """
+        if batch_size < 1:
+            raise ValueError('The batch size must be at least 1.')
+
+        names = iter(names)
+        while True:
+            batch = list(islice(names, batch_size))
+            if not batch:
+                return
+
+            yield from self._normalize_batch(batch)
+
+    def normalize_array(self, names, batch_size=DEFAULT_BATCH_SIZE):
+        """This method normalizes an array of names and returns an
+        array of the same type holding their normalized forms. NumPy
+        arrays of objects or unicode strings, of any shape, and Arrow
+        string arrays or chunked arrays are supported. Missing values
+        are normalized to empty strings.
+
+        Parameters
+        ----------
+        names : Union[numpy.ndarray, pyarrow.Array, pyarrow.ChunkedArray]
+            Corresponds to an array of names.
+        batch_size : int, optional
+            The number of names normalized together.
+
+        Returns
+        -------
+        Union[numpy.ndarray, pyarrow.Array, pyarrow.ChunkedArray]
+            An array of the same type and shape as the names parameter
+            holding the normalized names.
+
+        Raises
+        ------
+        ValueError
+            If the names parameter is not a supported array or if
+            batch_size is lower than 1.
+        """
+        module = type(names).__module__.split('.')[0]
+
+        if module == 'numpy':
+            return self._normalize_numpy_array(names, batch_size)
+        elif module == 'pyarrow':
+            return self._normalize_arrow_array(names, batch_size)
+
+        raise ValueError('Only NumPy and Arrow arrays can be normalized.')
+
+    def _normalize_numpy_array(self, names, batch_size):
+        """Normalizes a NumPy array of objects or unicode strings."""
+        import numpy
+
+        if names.dtype.kind not in ('O', 'U'):
+            raise ValueError(
+                'Only NumPy arrays of objects or strings can be normalized.'
+            )
+
+        normalized = list(self.normalize_names(
+            names.ravel().tolist(), batch_size
+        ))
+        dtype = object if names.dtype.kind == 'O' else str
+
+        return numpy.array(normalized, dtype=dtype).reshape(names.shape)
+
+    def _normalize_arrow_array(self, names, batch_size):
+        """Normalizes an Arrow string array or chunked array."""
+        import pyarrow
+
+        if isinstance(names, pyarrow.ChunkedArray):
+            return pyarrow.chunked_array(
+                [self._normalize_arrow_array(chunk, batch_size)
+                 for chunk in names.chunks],
+                type=names.type
+            )
+
+        if not isinstance(names, pyarrow.Array) or not (
+                pyarrow.types.is_string(names.type)
+                or pyarrow.types.is_large_string(names.type)):
+            raise ValueError(
+                'Only Arrow arrays of strings can be normalized.'
+            )
+
+        normalized = []
+        for offset in range(0, len(names), batch_size):
+            normalized.extend(self._normalize_batch(
+                names.slice(offset, batch_size).to_pylist()
+            ))
+
+        return pyarrow.array(normalized, type=names.type)
+
+    def _normalize_batch(self, batch):
+        """This method normalizes a batch of names, normalizing each
+        distinct name once. When fused, the distinct names which are not
+        pure ASCII are re-encoded by a single unidecode call.
+
+        Parameters
+        ----------
+        batch : list of str
+            Corresponds to a batch of names.
+
+        Returns
+        -------
+        list of str
+            The normalized form of each name of the batch.
+        """
+        distinct_names = list(dict.fromkeys(
+            name for name in batch if isinstance(name, str)
+        ))
+
+        if self.fused:
+            ascii_names = self._batch_to_ascii(distinct_names)
+            normalized = {
+                name: self._normalize_ascii_name(ascii_name)
+                for name, ascii_name in zip(distinct_names, ascii_names)
+            }
+        else:
+            normalized = {
+                name: self._normalize_name(name) for name in distinct_names
+            }
+
+        return [
+            normalized[name] if isinstance(name, str) else ''
+            for name in batch
+        ]
+
+    def _batch_to_ascii(self, names):
+        """This method re-encodes names in ASCII, joining those that are
+        not pure ASCII with NUL characters so that unidecode is called
+        once for all of them. NUL characters are left untouched by
+        unidecode, so the result can be split back into names.
+        """
+        ascii_names = list(names)
+        non_ascii = [
+            i for i, name in enumerate(names) if not name.isascii()
+        ]
+        if not non_ascii:
+            return ascii_names
+
+        if any('\x00' in names[i] for i in non_ascii):
+            for i in non_ascii:
+                ascii_names[i] = unidecode(names[i])
+        else:
+            decoded = unidecode('\x00'.join(names[i] for i in non_ascii))
+            for i, name in zip(non_ascii, decoded.split('\x00')):
+                ascii_names[i] = name
+
+        return ascii_names
+
+    def _normalize_name_fused(self, name):
+        """This method normalizes a name in a single pass, without the
+        intermediate generators of the normalization steps.
+
+        Parameters
+        ----------
+        name : str
+            Corresponds to a name.
+
+        Returns
+        -------
+        str
+            A string representing the normalized form of the name.
+        """
+        if not name.isascii():
+            name = unidecode(name)
+
+        return self._normalize_ascii_name(name)
+
+    def _normalize_ascii_name(self, name):
+        """Normalizes a name already re-encoded in ASCII in one pass."""
+        names = NameNormalizer.LOWER_NAME_SPLITTER.findall(name.lower())
+        names.sort()
+
+        resources = self._resources
+        titles = resources.component_titles
+        abbreviations = resources.component_abbreviations
+
+        return ' '.join([
+            abbreviations.get(name, name)
+            for name in names if name not in titles
+        ])
+
     def _expand_name_abbreviations(self, name_components):
         """This method yields a generator of values corresponding
         to the expanded forms of name abbreviations or the name
@@ -78,9 +561,10 @@ class NameNormalizer(object):
             name components were in abbreviated form or the name
             component otherwise.
         """
+        abbreviations = self.abbreviations
         for name in name_components:
-            if name in self.abbreviations:
-                yield self.abbreviations[name]
+            if name in abbreviations:
+                yield abbreviations[name]
             else:
                 yield name
 
@@ -104,8 +588,9 @@ class NameNormalizer(object):
         str
             A name component if it is not a title.
         """
+        titles = self.titles
         for name in name_components:
-            if name not in self.titles:
+            if name not in titles:
                 yield name
 
     def _split_name_into_components(self, name):
@@ -118,5 +603,12 @@ class NameNormalizer(object):
         return name.lower()
 
 
+def _entry_size(key, norm_name):
+    """Returns the number of bytes held by a cached name and its
+    normalized form, the resources being shared by every entry."""
+    return sys.getsizeof(key) + sys.getsizeof(key[0]) + \
+        sys.getsizeof(norm_name)
+
+
 if __name__ == '__main__':
     pass
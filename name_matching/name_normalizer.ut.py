@@ -1,6 +1,20 @@
+from json import dump
+import os
+import random
+import tempfile
 import unittest
 
-from name_normalizer import NameNormalizer
+from name_normalizer import NameNormalizer, NormalizationResources
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 
 class TestNameNormalizer(unittest.TestCase):
@@ -30,6 +44,19 @@ class TestNameNormalizer(unittest.TestCase):
 
         self.assertEqual(output, name)
 
+    def test_normalize_name_in_order_with_unsorted_components(self):
+        name = 'DR. Zoé Max Anne'
+
+        output = self.normalizer.normalize_name_in_order(name)
+
+        self.assertEqual(output, ('anne max zoe', (2, 1, 0)))
+        self.assertEqual(output[0], self.normalizer.normalize_name(name))
+
+    def test_normalize_name_in_order_with_sorted_components(self):
+        output = self.normalizer.normalize_name_in_order('Jane Mr Smith')
+
+        self.assertEqual(output, ('jane smith', None))
+
     def test_expand_name_abbreviations_with_abbreviated_name(self):
         expected_name = ['Maximilien', 'Herbert']
 
@@ -122,6 +149,259 @@ class TestNameNormalizer(unittest.TestCase):
 
         self.assertEqual(output, name)
 
+    def test_normalize_name_with_fused_and_staged_normalizers(self):
+        staged = NameNormalizer(fused=False)
+        corpus = self._generate_corpus(20000)
+
+        for name in corpus:
+            self.assertEqual(self.normalizer.normalize_name(name),
+                             staged.normalize_name(name))
+
+    def test_normalize_name_with_fused_and_staged_custom_normalizers(self):
+        directory = tempfile.mkdtemp()
+        abbreviations = os.path.join(directory, 'abbreviations.json')
+        titles = os.path.join(directory, 'titles.json')
+        with open(abbreviations, 'w') as f:
+            dump({'abbreviations': {'jr': 'junior', 'st': 'Saint',
+                                    'Wm': 'William'}}, f)
+        with open(titles, 'w') as f:
+            dump(['sir', 'Sir', 'dr.', 'DAME'], f)
+
+        try:
+            fused = NameNormalizer(abbreviations, titles)
+            staged = NameNormalizer(abbreviations, titles, fused=False)
+            corpus = self._generate_corpus(5000) + ['Sir Wm St. John Jr']
+
+            for name in corpus:
+                self.assertEqual(fused.normalize_name(name),
+                                 staged.normalize_name(name))
+            self.assertEqual(fused.normalize_name('Sir Wm St. John Jr'),
+                             'john junior Saint wm')
+        finally:
+            os.remove(abbreviations)
+            os.remove(titles)
+            os.rmdir(directory)
+
+    def test_normalize_names_with_repeated_and_invalid_names(self):
+        corpus = self._generate_corpus(3000)
+        names = corpus + [None, 7, 'Jöhn\x00Doe'] + corpus[:100]
+        expected = [self.normalizer.normalize_name(name) for name in names]
+
+        output = self.normalizer.normalize_names(iter(names), batch_size=64)
+
+        self.assertEqual(list(output), expected)
+
+    def test_normalize_names_with_staged_normalizer(self):
+        staged = NameNormalizer(fused=False)
+
+        output = list(staged.normalize_names(['DR. Maximilien De Trünst']))
+
+        self.assertEqual(output, ['de maximilien trunst'])
+
+    def test_normalize_names_with_invalid_batch_size(self):
+        with self.assertRaises(ValueError) as _:
+            list(self.normalizer.normalize_names(['Jane'], batch_size=0))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_normalize_array_with_numpy_unicode_array(self):
+        names = numpy.array([['Jane Doe', 'Dr. Björk'], ['Jane Doe', '']])
+
+        output = self.normalizer.normalize_array(names, batch_size=3)
+
+        self.assertEqual(output.dtype.kind, 'U')
+        self.assertEqual(output.tolist(), [['doe jane', 'bjork'],
+                                           ['doe jane', '']])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_normalize_array_with_numpy_object_array(self):
+        names = numpy.array(['Jane Doe', None], dtype=object)
+
+        output = self.normalizer.normalize_array(names)
+
+        self.assertEqual(output.dtype, object)
+        self.assertEqual(output.tolist(), ['doe jane', ''])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_normalize_array_with_numpy_numeric_array(self):
+        with self.assertRaises(ValueError) as _:
+            self.normalizer.normalize_array(numpy.arange(3))
+
+    @unittest.skipIf(pyarrow is None, 'Arrow is not installed.')
+    def test_normalize_array_with_arrow_array(self):
+        names = pyarrow.array(['Jane Doe', None, 'Accentué Björk'],
+                              type=pyarrow.large_string())
+
+        output = self.normalizer.normalize_array(names)
+
+        self.assertEqual(output.type, pyarrow.large_string())
+        self.assertEqual(output.to_pylist(), ['doe jane', '',
+                                              'accentue bjork'])
+
+    @unittest.skipIf(pyarrow is None, 'Arrow is not installed.')
+    def test_normalize_array_with_arrow_chunked_array(self):
+        names = pyarrow.chunked_array([['Jane Doe'], ['Mr John', 'Doe']])
+
+        output = self.normalizer.normalize_array(names)
+
+        self.assertEqual(output.num_chunks, 2)
+        self.assertEqual(output.to_pylist(), ['doe jane', 'john', 'doe'])
+
+    def test_normalize_array_with_list(self):
+        with self.assertRaises(ValueError) as _:
+            self.normalizer.normalize_array(['Jane Doe'])
+
+    def test_init_with_shared_resources(self):
+        normalizer = NameNormalizer()
+
+        self.assertIs(normalizer._resources, self.normalizer._resources)
+        with self.assertRaises(TypeError) as _:
+            normalizer.abbreviations['jr'] = 'junior'
+
+    def test_init_from_another_working_directory(self):
+        cwd = os.getcwd()
+        os.chdir(tempfile.gettempdir())
+
+        try:
+            normalizer = NameNormalizer()
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(normalizer.normalize_name('Dr. Jane Doe'),
+                         'doe jane')
+
+    def test_reload_with_modified_resources(self):
+        directory = tempfile.mkdtemp()
+        abbreviations = os.path.join(directory, 'abbreviations.json')
+        titles = os.path.join(directory, 'titles.json')
+        with open(abbreviations, 'w') as f:
+            dump({'abbreviations': {}}, f)
+        with open(titles, 'w') as f:
+            dump([], f)
+
+        try:
+            normalizer = NameNormalizer(abbreviations, titles)
+            before = normalizer.normalize_name('Sir Jon')
+            with open(titles, 'w') as f:
+                dump(['sir'], f)
+            normalizer.reload()
+            after = normalizer.normalize_name('Sir Jon')
+            shared = NameNormalizer(abbreviations, titles)
+        finally:
+            os.remove(abbreviations)
+            os.remove(titles)
+            os.rmdir(directory)
+
+        self.assertEqual((before, after), ('jon sir', 'jon'))
+        self.assertIs(shared._resources, normalizer._resources)
+
+    def test_reload_with_other_normalizer(self):
+        directory = tempfile.mkdtemp()
+        abbreviations = os.path.join(directory, 'abbreviations.json')
+        titles = os.path.join(directory, 'titles.json')
+        with open(abbreviations, 'w') as f:
+            dump({'abbreviations': {}}, f)
+        with open(titles, 'w') as f:
+            dump([], f)
+
+        try:
+            normalizer = NameNormalizer(abbreviations, titles)
+            other = NameNormalizer(abbreviations, titles, fused=False)
+            before = other.normalize_name('Dr John')
+            with open(titles, 'w') as f:
+                dump(['dr'], f)
+            normalizer.reload()
+            after = other.normalize_name('Dr John')
+        finally:
+            os.remove(abbreviations)
+            os.remove(titles)
+            os.rmdir(directory)
+
+        self.assertEqual((before, after), ('dr john', 'john'))
+        self.assertIs(other._resources, normalizer._resources)
+
+    def test_normalize_name_with_cache(self):
+        normalizer = NameNormalizer(cache_size=2)
+
+        output = [normalizer.normalize_name(name)
+                  for name in ['Dr. Jöhn', 'Dr. Jöhn', 'Jane', None]]
+
+        self.assertEqual(output, ['john', 'john', 'jane', ''])
+        self.assertEqual(normalizer.cache_info()['hits'], 1)
+        self.assertEqual(normalizer.cache_info()['misses'], 2)
+        self.assertIsNone(NameNormalizer().cache_info())
+
+    def test_normalize_name_with_cache_bytes(self):
+        normalizer = NameNormalizer(cache_bytes=1000)
+
+        for i in range(100):
+            normalizer.normalize_name('Jane Doe {}'.format(i))
+
+        self.assertLessEqual(normalizer.cache_info()['bytes'], 1000)
+        self.assertGreater(normalizer.cache_info()['evictions'], 0)
+
+    def test_reload_with_cache(self):
+        directory = tempfile.mkdtemp()
+        abbreviations = os.path.join(directory, 'abbreviations.json')
+        titles = os.path.join(directory, 'titles.json')
+        with open(abbreviations, 'w') as f:
+            dump({'abbreviations': {}}, f)
+        with open(titles, 'w') as f:
+            dump([], f)
+
+        try:
+            normalizer = NameNormalizer(abbreviations, titles, cache_size=10)
+            other = NameNormalizer(abbreviations, titles, cache_size=10)
+            before = normalizer.normalize_name('Sir Jon')
+            other.normalize_name('Sir Jon')
+            with open(titles, 'w') as f:
+                dump(['sir'], f)
+            normalizer.reload()
+            after = normalizer.normalize_name('Sir Jon')
+            other_after = other.normalize_name('Sir Jon')
+        finally:
+            os.remove(abbreviations)
+            os.remove(titles)
+            os.rmdir(directory)
+
+        self.assertEqual((before, after, other_after),
+                         ('jon sir', 'jon', 'jon'))
+        self.assertEqual(normalizer.cache_info()['entries'], 1)
+        self.assertEqual(other.cache_info()['entries'], 1)
+        self.assertEqual(other.cache_info()['hits'], 0)
+
+    def test_load_with_forced_parsing(self):
+        resources = NormalizationResources.load(NameNormalizer.ABBREVIATIONS,
+                                                NameNormalizer.TITLES,
+                                                force=True)
+
+        self.assertIn('dr', resources.component_titles)
+
+    def _generate_corpus(self, size):
+        """Generates names mixing accents, punctuation, titles and
+        abbreviations."""
+        rand = random.Random(7)
+        alphabet = 'abcdefghijklmnopqrstuvwxyz' \
+            'ABCDEFGHIJKLMNOPQRSTUVWXYZ' \
+            'àâäçéèêëîïôöùûüÿñæœßøåÆØÅÉÑ' \
+            "-'.,  \t"
+        words = ['Dr.', 'MR', 'mme', 'Prof', 'Max', 'jr', 'St.', 'sir',
+                 'Wm', 'Sir', 'de', 'von', 'O\'Neil', '李', 'Иван', '']
+
+        corpus = []
+        for _ in range(size):
+            components = []
+            for _ in range(rand.randint(0, 6)):
+                if rand.random() < 0.3:
+                    components.append(rand.choice(words))
+                else:
+                    components.append(''.join(
+                        rand.choice(alphabet)
+                        for _ in range(rand.randint(1, 9))
+                    ))
+            corpus.append(' '.join(components))
+
+        return corpus
+
 
 if __name__ == "__main__":
     unittest.main()